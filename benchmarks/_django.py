@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+from typing import Mapping
+
+import django
+
+
+def setup(database: Path | None = None, options: Mapping[str, Any] = {}) -> None:
+    """Configure Django against a fresh, migrated test database.
+
+    If a path is given, use the database file there instead, so that several
+    processes can share it. The file is created and migrated if it doesn't exist.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "toy_settings.settings")
+
+    if database is None:
+        django.setup()
+
+        from django.db import connection
+
+        connection.creation.create_test_db(verbosity=0)
+        return
+
+    from django.conf import settings
+
+    settings.DATABASES["default"].update(NAME=database, OPTIONS=dict(options))
+    # don't load a checkpoint taken from some other database
+    settings.SETTINGS_CHECKPOINT_PATH = database.with_suffix(".checkpoint.json")
+    migrate = not database.exists()
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
@@ -0,0 +1,88 @@
+"""
+Prebuilt databases of generated histories, for benchmarks to start from.
+
+Each database is built once, in a process of its own, and cached under
+$XDG_CACHE_HOME. To build (or find) them ahead of time:
+
+    python -m benchmarks.fixtures small medium large
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import time
+from pathlib import Path
+
+from benchmarks import _django
+from testing import datasets
+
+SIZES = {"small": 10_000, "medium": 100_000, "large": 1_000_000}
+
+# Bump to rebuild cached databases after changing how histories are generated.
+GENERATOR_VERSION = 1
+
+MIGRATIONS = Path(__file__).parent.parent / "toy_settings/django_back_end/migrations"
+
+
+def cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "toy-settings" / "datasets"
+
+
+def _latest_migration() -> str:
+    return max(path.stem for path in MIGRATIONS.glob("[0-9]*.py"))
+
+
+def _build(database: Path, size: int, seed: int) -> None:
+    _django.setup(database)
+    datasets.bulk_insert(datasets.generate(size, seed=seed))
+
+
+def path(name: str, seed: int = 0) -> Path:
+    """Get the cached database of a standard size, building it if need be.
+
+    Databases are cached for each seed and schema.
+    """
+    cached = (
+        cache_dir()
+        / f"{name}-{seed}-v{GENERATOR_VERSION}-{_latest_migration()}.sqlite3"
+    )
+    if not cached.exists():
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        building = cached.with_name(f".{cached.name}.{os.getpid()}")
+        building.unlink(missing_ok=True)
+
+        process = multiprocessing.get_context("spawn").Process(
+            target=_build, args=(building, SIZES[name], seed)
+        )
+        process.start()
+        process.join()
+        if process.exitcode:
+            raise RuntimeError(f"Failed to build the {name} database")
+        os.replace(building, cached)
+
+    return cached
+
+
+def copy(name: str, destination: Path, seed: int = 0) -> None:
+    """Copy a database of a standard size, to use without changing the cache."""
+    shutil.copyfile(path(name, seed), destination)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="+", choices=SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name in args.names:
+        start = time.perf_counter()
+        cached = path(name, args.seed)
+        print(f"{name}: {cached} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Load the services layer with concurrent writers and readers.
+
+Each worker picks a random key and reads it, or sets, changes, or unsets it,
+as fast as it can. Workers are spread over processes and threads, and share a
+database file, which is created afresh for each SQLite journal mode:
+
+    python -m benchmarks.load --processes 4 --threads 2 --journal-mode delete wal
+
+The database starts empty, or with a copy of one of the prebuilt datasets in
+`benchmarks.fixtures`:
+
+    python -m benchmarks.load --dataset medium --keys 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import multiprocessing
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from typing import Iterator
+from typing import NamedTuple
+
+import attrs
+
+from benchmarks import _django
+from benchmarks import fixtures
+from toy_settings.application import unit_of_work
+from toy_settings.domain import events
+
+OPERATIONS = ("read", "set", "change", "unset")
+
+
+class Sample(NamedTuple):
+    operation: str
+    outcome: str
+    seconds: float
+    stale: int
+
+
+@attrs.frozen
+class Options:
+    processes: int
+    threads: int
+    duration: float
+    keys: int
+    reads: float
+    transaction_mode: str
+    dataset: str | None = None
+
+
+def _database_options(journal_mode: str, transaction_mode: str) -> dict[str, Any]:
+    return {
+        "init_command": f"PRAGMA journal_mode={journal_mode};",
+        "transaction_mode": transaction_mode,
+    }
+
+
+def _prepare(database: Path, journal_mode: str, transaction_mode: str) -> None:
+    _django.setup(database, _database_options(journal_mode, transaction_mode))
+
+
+@attrs.define
+class CountingCommitter(unit_of_work.Committer):
+    """Count the events that could not be recorded because the state was stale."""
+
+    committer: unit_of_work.Committer
+    stale: int = 0
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        with self.committer.atomic():
+            yield
+
+    def handle(self, event: events.Event) -> None:
+        try:
+            self.committer.handle(event)
+        except unit_of_work.StaleState:
+            self.stale += 1
+            raise
+
+    def remember(self, idempotency_key: str, fingerprint: str) -> None:
+        self.committer.remember(idempotency_key, fingerprint)
+
+
+def _write(toy_settings: Any, operation: str, key: str) -> None:
+    from django.utils import timezone
+
+    if operation == "set":
+        toy_settings.set(key, "0", timestamp=timezone.now(), by="load")
+    elif operation == "change":
+        toy_settings.change(key, "1", timestamp=timezone.now(), by="load")
+    else:
+        toy_settings.unset(key, timestamp=timezone.now(), by="load")
+
+
+def _run_thread(options: Options, deadline: float, samples: list[Sample]) -> None:
+    from django.db import connection
+    from tenacity import RetryError
+
+    from toy_settings import config
+    from toy_settings.application import services
+    from toy_settings.views import MAX_WAIT_SECONDS
+
+    repo = config.get_repository()
+    committer = CountingCommitter(config.get_committer())
+    toy_settings = services.ToySettings(state=repo, committer=committer)
+
+    while (start := time.perf_counter()) < deadline:
+        key = f"KEY_{random.randrange(options.keys)}"
+        if random.random() < options.reads:
+            operation = "read"
+        else:
+            operation = random.choice(OPERATIONS[1:])
+
+        committer.stale = 0
+        try:
+            if operation == "read":
+                repo.current_value(key)
+            else:
+                toy_settings.retry(
+                    lambda: _write(toy_settings, operation, key),
+                    max_wait_seconds=MAX_WAIT_SECONDS,
+                )
+        except (services.AlreadySet, services.NotSet):
+            outcome = "rejected"
+        except RetryError:
+            outcome = "retry failed"
+        except Exception as exc:
+            outcome = type(exc).__name__
+        else:
+            outcome = "ok"
+
+        samples.append(
+            Sample(operation, outcome, time.perf_counter() - start, committer.stale)
+        )
+
+    connection.close()
+
+
+def _run_process(
+    database: Path,
+    journal_mode: str,
+    options: Options,
+    ready: Any,
+    results: Any,
+) -> None:
+    _django.setup(database, _database_options(journal_mode, options.transaction_mode))
+
+    samples: list[Sample] = []
+    ready.wait()
+    deadline = time.perf_counter() + options.duration
+    threads = [
+        threading.Thread(target=_run_thread, args=(options, deadline, samples))
+        for _ in range(options.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(samples)
+
+
+def run(journal_mode: str, options: Options) -> list[Sample]:
+    """Run the workers against a new database, and collect what they did."""
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Path(tmp) / "db.sqlite3"
+        if options.dataset is not None:
+            fixtures.copy(options.dataset, database)
+        prepare = context.Process(
+            target=_prepare, args=(database, journal_mode, options.transaction_mode)
+        )
+        prepare.start()
+        prepare.join()
+
+        ready = context.Barrier(options.processes)
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_run_process,
+                args=(database, journal_mode, options, ready, results),
+            )
+            for _ in range(options.processes)
+        ]
+        for process in processes:
+            process.start()
+        samples = [sample for _ in processes for sample in results.get()]
+        for process in processes:
+            process.join()
+
+    return samples
+
+
+def _percentiles(latencies: list[float]) -> tuple[float, float, float]:
+    if len(latencies) < 2:
+        return latencies[0], latencies[0], latencies[0]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def report(samples: list[Sample], duration: float) -> str:
+    lines = [
+        f"{'operation':<10} {'count':>8} {'ops/s':>9}"
+        f" {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}"
+    ]
+    for operation in (*OPERATIONS, "all"):
+        latencies = [
+            sample.seconds
+            for sample in samples
+            if operation in ("all", sample.operation)
+        ]
+        if not latencies:
+            continue
+        p50, p95, p99 = _percentiles(latencies)
+        lines.append(
+            f"{operation:<10} {len(latencies):>8} {len(latencies) / duration:>9.1f}"
+            f" {p50 * 1000:>9.2f} {p95 * 1000:>9.2f} {p99 * 1000:>9.2f}"
+        )
+
+    outcomes = collections.Counter(sample.outcome for sample in samples)
+    lines.append(
+        f"stale retries: {sum(sample.stale for sample in samples)}"
+        f"  retry failures: {outcomes.pop('retry failed', 0)}"
+        f"  rejected: {outcomes.pop('rejected', 0)}"
+    )
+    outcomes.pop("ok", None)
+    if outcomes:
+        lines.append(
+            "errors: "
+            + ", ".join(f"{error}: {count}" for error, count in outcomes.items())
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--keys", type=int, default=10)
+    parser.add_argument(
+        "--reads", type=float, default=0.5, help="fraction of operations that read"
+    )
+    parser.add_argument(
+        "--journal-mode",
+        nargs="+",
+        default=["delete", "wal"],
+        choices=["delete", "truncate", "persist", "memory", "wal", "off"],
+    )
+    parser.add_argument(
+        "--transaction-mode",
+        default="DEFERRED",
+        choices=["DEFERRED", "IMMEDIATE", "EXCLUSIVE"],
+    )
+    parser.add_argument(
+        "--dataset", choices=fixtures.SIZES, help="start from a prebuilt database"
+    )
+    args = parser.parse_args()
+
+    options = Options(
+        processes=args.processes,
+        threads=args.threads,
+        duration=args.duration,
+        keys=args.keys,
+        reads=args.reads,
+        transaction_mode=args.transaction_mode,
+        dataset=args.dataset,
+    )
+    for journal_mode in args.journal_mode:
+        print(
+            f"journal_mode={journal_mode} transaction_mode={options.transaction_mode}"
+            f" processes={options.processes} threads={options.threads}"
+            f" dataset={options.dataset or 'none'}"
+        )
+        print(report(run(journal_mode, options), options.duration))
+        print()
+
+
+if __name__ == "__main__":
+    main()
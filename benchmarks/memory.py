@@ -0,0 +1,188 @@
+"""
+Measure the memory taken by decoded events and the settings projected from them.
+
+For histories of increasing size, loads every key's events through `DjangoRepo`,
+projects the current settings from them, and catches up the long-lived
+projection of the current settings. Each stage is traced on its own with
+`tracemalloc`, and reports its peak memory and the memory it retains (in the
+objects it returns), per event and per key, and where the retained memory of the
+largest history was allocated:
+
+    python -m benchmarks.memory --events 1000 10000 100000 --keys 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+
+import attrs
+
+from benchmarks import _django
+from testing import datasets
+
+if TYPE_CHECKING:
+    from toy_settings.django_back_end.projection import CurrentSettings
+
+MB = 1024 * 1024
+
+# Allocations made by the tracing itself, or by importing modules on first use.
+IGNORED = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+@attrs.frozen
+class Measurement:
+    stage: str
+    events: int
+    keys: int
+    peak: int
+    retained: int
+    snapshot: tracemalloc.Snapshot
+
+    def row(self) -> str:
+        return (
+            f"{self.events:>9} {self.keys:>6} {self.stage:<10}"
+            f" {self.peak / MB:>10.2f} {self.retained / MB:>14.2f}"
+            f" {self.peak / self.events:>13.0f} {self.retained / self.events:>17.0f}"
+            f" {self.retained / self.keys:>15.0f}"
+        )
+
+
+HEADER = (
+    f"{'events':>9} {'keys':>6} {'stage':<10}"
+    f" {'peak (MB)':>10} {'retained (MB)':>14}"
+    f" {'peak B/event':>13} {'retained B/event':>17} {'retained B/key':>15}"
+)
+
+
+def measure(
+    stage: str, events: int, keys: int, run: Callable[[], Any], frames: int
+) -> tuple[Measurement, Any]:
+    """
+    Trace the allocations made by `run`.
+
+    Returns the measurement and what `run` returned, which must be kept until
+    after the measurement is taken for its memory to count as retained.
+    """
+    gc.collect()
+    tracemalloc.start(frames)
+    try:
+        result = run()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED)
+    finally:
+        tracemalloc.stop()
+    return Measurement(stage, events, keys, peak, retained, snapshot), result
+
+
+def profile(count: int, keys: int, seed: int, frames: int) -> list[Measurement]:
+    """Record a history of `count` events, and measure each stage of reading it."""
+    from django.core.management import call_command
+
+    from toy_settings.django_back_end import models
+    from toy_settings.django_back_end.queries import DjangoRepo
+    from toy_settings.domain import projections
+
+    call_command("flush", interactive=False, verbosity=0)
+    datasets.bulk_insert(datasets.generate(count, seed=seed, keys=keys))
+    # only keys that have events take up memory
+    used_keys = list(
+        models.Event.objects.order_by("key").values_list("key", flat=True).distinct()
+    )
+
+    repo = DjangoRepo()
+    loaded, history = measure(
+        "events",
+        count,
+        len(used_keys),
+        lambda: [event for key in used_keys for event in repo.events_for_key(key)],
+        frames,
+    )
+    replayed, _ = measure(
+        "replay",
+        count,
+        len(used_keys),
+        lambda: projections.current_settings(history),
+        frames,
+    )
+    caught_up, _ = measure(
+        "projection", count, len(used_keys), _caught_up_projection, frames
+    )
+    return [loaded, replayed, caught_up]
+
+
+def _caught_up_projection() -> CurrentSettings:
+    """
+    Catch up a new projection of the current settings, and return it.
+
+    The projection is what stays in memory, rather than the values read from it.
+    """
+    from toy_settings.django_back_end import projection
+
+    current_settings = projection.CurrentSettings()
+    current_settings.values()
+    return current_settings
+
+
+def top_sites(measurement: Measurement, limit: int) -> str:
+    lines = [
+        f"top allocation sites of memory retained by {measurement.stage}"
+        f" ({measurement.events} events):"
+    ]
+    for statistic in measurement.snapshot.statistics("traceback")[:limit]:
+        frame = statistic.traceback[0]
+        lines.append(
+            f"  {statistic.size / MB:>8.2f} MB {statistic.count:>9} blocks"
+            f"  {frame.filename}:{frame.lineno}"
+        )
+        for caller in list(statistic.traceback)[1:]:
+            lines.append(f"{'':>34}{caller.filename}:{caller.lineno}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--events", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--top", type=int, default=10, help="allocation sites to show for each stage"
+    )
+    parser.add_argument(
+        "--frames", type=int, default=1, help="frames of each allocation site to show"
+    )
+    args = parser.parse_args()
+
+    _django.setup()
+
+    from django.conf import settings
+
+    # don't count the queries Django logs in debug mode
+    settings.DEBUG = False
+
+    print(HEADER)
+    measurements: list[Measurement] = []
+    for count in args.events:
+        measurements = profile(count, args.keys, args.seed, args.frames)
+        for measurement in measurements:
+            print(measurement.row())
+
+    for measurement in measurements:
+        print()
+        print(top_sites(measurement, args.top))
+
+
+if __name__ == "__main__":
+    main()
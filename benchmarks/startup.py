@@ -0,0 +1,106 @@
+"""
+Measure the first read of all settings in a freshly started worker.
+
+Compares replaying the whole history with loading a checkpoint and replaying
+only the events recorded since it was taken:
+
+    python -m benchmarks.startup --events 1000 10000 100000 --tail 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator
+
+from benchmarks import _django
+
+
+def _history(count: int, keys: int, start: int = 0) -> Iterator[tuple[str, int]]:
+    # each key is set once and then changed over and over
+    for n in range(start, start + count):
+        yield f"KEY_{n % keys}", n // keys
+
+
+def _record(history: Iterator[tuple[str, int]]) -> None:
+    from django.db import transaction
+    from django.utils import timezone
+
+    from toy_settings.django_back_end import models
+    from toy_settings.django_back_end import storage
+    from toy_settings.domain import events
+
+    new_events: list[events.Event] = [
+        (
+            events.Set(index=0, timestamp=timezone.now(), key=key, value="0", by="me")
+            if index == 0
+            else events.Changed(
+                index=index,
+                timestamp=timezone.now(),
+                key=key,
+                new_value=str(index),
+                by="me",
+            )
+        )
+        for key, index in history
+    ]
+    with transaction.atomic():
+        stored = models.Event.objects.bulk_create(
+            storage.to_row(event) for event in new_events
+        )
+        models.Sequence.objects.bulk_create(
+            models.Sequence(event=evt, key=event.key, index=event.index)
+            for evt, event in zip(stored, new_events)
+        )
+
+
+def _time_first_read(checkpoint_path: Path | None) -> float:
+    from toy_settings.django_back_end import checkpoints
+    from toy_settings.django_back_end import projection
+
+    start = time.perf_counter()
+    current_settings = projection.CurrentSettings()
+    if checkpoint_path is not None:
+        current_settings.reset(checkpoints.load(checkpoint_path))
+    current_settings.values()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--events", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--tail", type=int, default=100)
+    parser.add_argument("--keys", type=int, default=100)
+    args = parser.parse_args()
+
+    _django.setup()
+
+    from django.core.management import call_command
+
+    from toy_settings.django_back_end import checkpoints
+    from toy_settings.django_back_end import projection
+
+    print(f"{'events':>10} {'full replay (ms)':>18} {'checkpoint (ms)':>18}")
+    for count in args.events:
+        call_command("flush", interactive=False, verbosity=0)
+        _record(_history(count - args.tail, args.keys))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint_path = Path(tmp) / "checkpoint.json"
+            checkpoints.save(projection.CurrentSettings().checkpoint(), checkpoint_path)
+            _record(_history(args.tail, args.keys, start=count - args.tail))
+
+            full_replay = _time_first_read(None)
+            from_checkpoint = _time_first_read(checkpoint_path)
+
+        print(
+            f"{count:>10} {full_replay * 1000:>18.1f} {from_checkpoint * 1000:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
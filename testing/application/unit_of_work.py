@@ -12,14 +12,21 @@ from toy_settings.domain import events
 @attrs.define
 class MemoryCommitter(unit_of_work.Committer):
     committed: list[events.Event] = attrs.field(init=False, factory=list)
+    idempotency_keys: dict[str, str] = attrs.field(init=False, factory=dict)
     uncommitted_events: list[events.Event] = attrs.field(init=False)
+    uncommitted_keys: dict[str, str] = attrs.field(init=False)
 
     @contextmanager
     def atomic(self) -> Iterator[None]:
         self.uncommitted_events: list[events.Event] = []
+        self.uncommitted_keys: dict[str, str] = {}
         yield
         self.committed.extend(self.uncommitted_events)
-        del self.uncommitted_events
+        self.idempotency_keys.update(self.uncommitted_keys)
+        del self.uncommitted_events, self.uncommitted_keys
 
     def handle(self, event: events.Event) -> None:
         self.uncommitted_events.append(event)
+
+    def remember(self, idempotency_key: str, fingerprint: str) -> None:
+        self.uncommitted_keys[idempotency_key] = fingerprint
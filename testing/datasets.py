@@ -0,0 +1,204 @@
+"""
+Generate large, realistic histories of events, the same every time for a seed.
+
+Keys are picked with Zipf-distributed popularity, so a few keys see most of the
+changes, as they do in practice. Histories can be inserted straight into the
+database in bulk, or written to (and read from) newline-delimited JSON.
+"""
+
+from __future__ import annotations
+
+import datetime
+import itertools
+import json
+import random
+from typing import IO
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+import attrs
+
+from toy_settings import serialization
+from toy_settings.domain import events
+
+if TYPE_CHECKING:
+    from django.db.models import Model
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+BATCH_SIZE = 10_000
+
+
+@attrs.frozen
+class Mix:
+    """
+    How often each kind of event is chosen.
+
+    A key that isn't set can only be set, and a key that is set can't be set
+    again (it is changed instead), so the generated history only follows the mix
+    as far as the keys allow.
+    """
+
+    set: float = 0.1
+    change: float = 0.85
+    unset: float = 0.05
+
+
+def generate(
+    size: int,
+    *,
+    seed: int = 0,
+    keys: int = 1000,
+    actors: int = 10,
+    mix: Mix = Mix(),
+    zipf: float = 1.1,
+    interval: datetime.timedelta = datetime.timedelta(seconds=1),
+) -> Iterator[events.Event]:
+    """
+    Generate a history of `size` events, in the order they were recorded.
+
+    The key ranked `r` in popularity is picked with a weight of `1 / r ** zipf`.
+    Events are `interval` apart, starting at `START`.
+    """
+    rng = random.Random(seed)
+    names = [f"KEY_{rank}" for rank in range(keys)]
+    popularity = list(
+        itertools.accumulate(1 / rank**zipf for rank in range(1, keys + 1))
+    )
+    kinds = list(itertools.accumulate([mix.set, mix.change, mix.unset]))
+    next_index: dict[str, int] = {}
+    is_set: set[str] = set()
+
+    generated = 0
+    while generated < size:
+        chunk = min(BATCH_SIZE, size - generated)
+        picked_keys = rng.choices(names, cum_weights=popularity, k=chunk)
+        picked_kinds = rng.choices("scu", cum_weights=kinds, k=chunk)
+        for key, kind in zip(picked_keys, picked_kinds):
+            index = next_index.get(key, 0)
+            next_index[key] = index + 1
+            timestamp = START + interval * generated
+            by = f"actor-{rng.randrange(actors)}"
+            generated += 1
+
+            if key not in is_set:
+                is_set.add(key)
+                value = str(rng.randrange(1_000_000))
+                yield events.Set(index, timestamp, key, by, value=value)
+            elif kind == "u":
+                is_set.remove(key)
+                yield events.Unset(index, timestamp, key, by)
+            else:
+                value = str(rng.randrange(1_000_000))
+                yield events.Changed(index, timestamp, key, by, new_value=value)
+
+
+def write_ndjson(history: Iterable[events.Event], file: IO[str]) -> None:
+    """Write events as newline-delimited JSON, one event per line."""
+    for event in history:
+        data = serialization.unstructure_event(event)
+        file.write(json.dumps(data, separators=(",", ":")))
+        file.write("\n")
+
+
+def read_ndjson(file: IO[str]) -> Iterator[events.Event]:
+    """Read events written by `write_ndjson`."""
+    for line in file:
+        yield serialization.structure_event(json.loads(line))
+
+
+def _insert(
+    cursor: Any,
+    model: type[Model],
+    fields: list[str],
+    rows: list[tuple[Any, ...]],
+    verb: str = "INSERT",
+) -> None:
+    quote = cursor.db.ops.quote_name
+    columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    cursor.executemany(
+        f"{verb} INTO {quote(model._meta.db_table)} ({columns})"
+        f" VALUES ({placeholders})",
+        rows,
+    )
+
+
+def bulk_insert(history: Iterable[events.Event], batch_size: int = BATCH_SIZE) -> int:
+    """
+    Record a history in the database, a batch at a time.
+
+    Rows are inserted with plain SQL (SQLite's), skipping the ORM and the checks
+    made when recording events one by one, and the read models are brought up
+    to date after each batch. Returns the number of events recorded.
+    """
+    from django.db import connection
+    from django.db import transaction
+    from django.db.models import Max
+
+    from toy_settings.django_back_end import models
+    from toy_settings.django_back_end import read_models
+    from toy_settings.django_back_end import storage
+
+    position = max(
+        models.Event.objects.aggregate(position=Max("pk"))["position"] or 0,
+        models.ArchivedEvent.objects.aggregate(position=Max("pk"))["position"] or 0,
+    )
+    recorded = 0
+    iterator = iter(history)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        values: dict[str, models.Value] = {}
+        event_rows = []
+        sequence_rows = []
+        for event in batch:
+            position += 1
+            data = models.Event.payload_converter.unstructure(event)
+            value_hash = None
+            if value_field := models.VALUE_FIELDS.get(type(event)):
+                value = storage.encode_value(data.pop(value_field))
+                values[value.hash] = value
+                value_hash = value.hash
+            event_type, event_type_version = models.EVENT_TYPES[type(event)]
+            event_rows.append(
+                (
+                    position,
+                    event_type,
+                    event_type_version,
+                    event.key,
+                    event.by,
+                    connection.ops.adapt_datetimefield_value(event.timestamp),
+                    json.dumps(data),
+                    value_hash,
+                )
+            )
+            sequence_rows.append((position, event.key, event.index))
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            _insert(
+                cursor,
+                models.Value,
+                ["hash", "data", "compressed"],
+                [(v.hash, v.data, v.compressed) for v in values.values()],
+                verb="INSERT OR IGNORE",
+            )
+            _insert(
+                cursor,
+                models.Event,
+                [
+                    "id",
+                    "event_type",
+                    "event_type_version",
+                    "key",
+                    "by",
+                    "timestamp",
+                    "payload",
+                    "value",
+                ],
+                event_rows,
+            )
+            _insert(cursor, models.Sequence, ["event", "key", "index"], sequence_rows)
+            read_models.update_many(batch)
+        recorded += len(batch)
+    return recorded
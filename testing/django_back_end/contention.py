@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+import attrs
+
+
+@attrs.frozen
+class Throughput:
+    scenario: str
+    threads: int
+    commits: int
+    stale: int
+    seconds: float
+
+    @property
+    def commits_per_second(self) -> float:
+        return self.commits / self.seconds
+
+
+def table(results: Iterable[Throughput]) -> str:
+    """Tabulate commits per second (and stale attempts) by scenario and threads."""
+    results = list(results)
+    scenarios = list(dict.fromkeys(r.scenario for r in results))
+    threads = sorted({r.threads for r in results})
+    cells = {
+        (r.scenario, r.threads): f"{r.commits_per_second:.0f}/s ({r.stale} stale)"
+        for r in results
+    }
+
+    width = max(len(scenario) for scenario in scenarios)
+    lines = [
+        " ".join([f"{'threads':<{width}}", *(f"{count:>18}" for count in threads)])
+    ]
+    for scenario in scenarios:
+        lines.append(
+            " ".join(
+                [
+                    f"{scenario:<{width}}",
+                    *(f"{cells.get((scenario, count), '-'):>18}" for count in threads),
+                ]
+            )
+        )
+    return "\n".join(lines)
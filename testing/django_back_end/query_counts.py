@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import time
+from typing import Callable
+from typing import Iterable
+
+import attrs
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@attrs.frozen
+class Measurement:
+    endpoint: str
+    history_size: int
+    queries: int
+    seconds: float
+
+
+def measure(
+    endpoint: str, history_size: int, call: Callable[[], object]
+) -> Measurement:
+    """Count the queries run (and time taken) by a call."""
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        call()
+        seconds = time.perf_counter() - start
+
+    return Measurement(
+        endpoint=endpoint,
+        history_size=history_size,
+        queries=len(context.captured_queries),
+        seconds=seconds,
+    )
+
+
+def table(measurements: Iterable[Measurement]) -> str:
+    """Tabulate queries (and milliseconds) per endpoint and history size."""
+    measurements = list(measurements)
+    endpoints = list(dict.fromkeys(m.endpoint for m in measurements))
+    sizes = sorted({m.history_size for m in measurements})
+    cells = {
+        (m.endpoint, m.history_size): f"{m.queries} ({m.seconds * 1000:.1f}ms)"
+        for m in measurements
+    }
+
+    width = max(len(endpoint) for endpoint in endpoints)
+    lines = [" ".join([f"{'endpoint':<{width}}", *(f"{size:>18}" for size in sizes)])]
+    for endpoint in endpoints:
+        lines.append(
+            " ".join(
+                [
+                    f"{endpoint:<{width}}",
+                    *(f"{cells.get((endpoint, size), '-'):>18}" for size in sizes),
+                ]
+            )
+        )
+    return "\n".join(lines)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any
+from typing import Callable
+from typing import Iterator
+
+import attrs
+from django.db import connection
+
+
+@attrs.frozen
+class QueryPlan:
+    sql: str
+    steps: list[str]
+
+    @property
+    def problems(self) -> list[str]:
+        """The steps that read a whole table (or index) or sort the results.
+
+        Scans of virtual tables (such as `json_each` over a parameter) are left
+        out: they don't read a stored table.
+        """
+        return [
+            step
+            for step in self.steps
+            if (step.startswith("SCAN ") and "VIRTUAL TABLE" not in step)
+            or step.startswith("USE TEMP B-TREE")
+        ]
+
+
+@contextmanager
+def record_query_plans() -> Iterator[list[QueryPlan]]:
+    """
+    Record SQLite's plan for each query run in the block.
+
+    The list is filled in when the block exits.
+    """
+    statements: list[tuple[str, Any]] = []
+
+    def record(
+        execute: Callable[..., Any], sql: str, params: Any, many: bool, context: Any
+    ) -> Any:
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    plans: list[QueryPlan] = []
+    with connection.execute_wrapper(record):
+        yield plans
+
+    with connection.cursor() as cursor:
+        for sql, params in statements:
+            if not sql.startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plans.append(QueryPlan(sql, [row[3] for row in cursor.fetchall()]))
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import datetime
+from typing import Hashable
+from typing import Iterable
+
 import attrs
 
 from toy_settings.domain import events
@@ -7,9 +11,27 @@ from toy_settings.domain import projections
 from toy_settings.domain import queries
 
 
+def _after(
+    bound: datetime.datetime | int, position: int, event: events.Event
+) -> bool:  # pragma: no cover
+    if isinstance(bound, int):
+        return position > bound
+    return event.timestamp > bound
+
+
+def _up_to(
+    bound: datetime.datetime | int, position: int, event: events.Event
+) -> bool:  # pragma: no cover
+    if isinstance(bound, int):
+        return position <= bound
+    return event.timestamp <= bound
+
+
 @attrs.frozen
 class MemoryRepo(queries.Repository):
     history: list[events.Event] = attrs.field(factory=list)
+    # the fingerprint of the request of each idempotency key
+    idempotency_keys: dict[str, str] = attrs.field(factory=dict)
 
     def events_for_key(self, key: str) -> list[events.Event]:  # pragma: no cover
         return sorted(
@@ -17,6 +39,40 @@ class MemoryRepo(queries.Repository):
             key=lambda e: e.timestamp,
         )
 
+    def history_page(
+        self, key: str, *, before: int | None = None, limit: int
+    ) -> list[tuple[int, events.Event]]:  # pragma: no cover
+        # positions are 1-based, like the database's auto-incrementing ids
+        page = [
+            (position, event)
+            for position, event in enumerate(self.history, start=1)
+            if event.key == key and (before is None or position < before)
+        ]
+        return page[::-1][:limit]
+
+    def events_by_actor(
+        self,
+        by: str,
+        since: datetime.datetime | int | None = None,
+        until: datetime.datetime | int | None = None,
+        *,
+        before: int | None = None,
+        limit: int,
+    ) -> list[tuple[int, events.Event]]:  # pragma: no cover
+        def in_bounds(position: int, event: events.Event) -> bool:
+            return (
+                (since is None or _after(since, position, event))
+                and (until is None or _up_to(until, position, event))
+                and (before is None or position < before)
+            )
+
+        page = [
+            (position, event)
+            for position, event in enumerate(self.history, start=1)
+            if event.by == by and in_bounds(position, event)
+        ]
+        return page[::-1][:limit]
+
     def get_setting(self, key: str) -> projections.Setting:
         return projections.current_settings(
             sorted(
@@ -28,6 +84,10 @@ class MemoryRepo(queries.Repository):
     def current_value(self, key: str) -> str | None:  # pragma: no cover
         return self.all_settings().get(key, None)
 
+    def current_values(self, keys: Iterable[str]) -> dict[str, str]:  # pragma: no cover
+        settings = self.all_settings()
+        return {key: settings[key] for key in keys if key in settings}
+
     def all_settings(self) -> dict[str, str]:  # pragma: no cover
         return {
             key: setting.value
@@ -39,3 +99,54 @@ class MemoryRepo(queries.Repository):
             ).items()
             if setting.value is not None
         }
+
+    def settings_version(self) -> Hashable:  # pragma: no cover
+        return len(self.history)
+
+    def settings_with_prefix(self, prefix: str) -> dict[str, str]:  # pragma: no cover
+        return {
+            key: value
+            for key, value in self.all_settings().items()
+            if key.startswith(prefix)
+        }
+
+    def key_stats(
+        self, keys: Iterable[str]
+    ) -> dict[str, projections.KeyStats]:  # pragma: no cover
+        keys = set(keys)
+        return projections.key_stats(
+            event
+            for event in sorted(self.history, key=lambda e: e.timestamp)
+            if event.key in keys
+        )
+
+    def request_fingerprint(self, idempotency_key: str) -> str | None:
+        return self.idempotency_keys.get(idempotency_key)
+
+    def search(
+        self, query: str, *, limit: int
+    ) -> list[tuple[str, str]]:  # pragma: no cover
+        if len(query) < 3:
+            return []
+        query = query.casefold()
+        matches = [
+            (key, value)
+            for key, value in sorted(self.all_settings().items())
+            if query in key.casefold() or query in value.casefold()
+        ]
+        # keys that match come first
+        matches.sort(key=lambda match: query not in match[0].casefold())
+        return matches[:limit]
+
+    def diff(
+        self,
+        since: datetime.datetime | int,
+        until: datetime.datetime | int | None = None,
+    ) -> projections.Diff:  # pragma: no cover
+        # positions are 1-based, like the database's auto-incrementing ids
+        return projections.diff(
+            event
+            for position, event in enumerate(self.history, start=1)
+            if _after(since, position, event)
+            and (until is None or _up_to(until, position, event))
+        )
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import datetime
 
+import attrs
 import pytest
+from tenacity import RetryError
 
 from testing.application.unit_of_work import MemoryCommitter
 from testing.domain import factories
 from testing.domain.queries import MemoryRepo
 from toy_settings.application import services
+from toy_settings.application import unit_of_work
 from toy_settings.domain import events
 
 
@@ -25,6 +28,102 @@ def test_set():
     ]
 
 
+def test_set_remembers_idempotency_key():
+    committer = MemoryCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=[]), committer=committer
+    )
+
+    toy_settings.set(
+        "FOO", "42", timestamp=datetime.datetime.now(), by="me", idempotency_key="abc"
+    )
+
+    assert committer.idempotency_keys.keys() == {"abc"}
+
+
+@pytest.mark.parametrize(
+    "make_request",
+    (
+        pytest.param(
+            lambda toy_settings, **kwargs: toy_settings.set("FOO", "42", **kwargs),
+            id="set",
+        ),
+        pytest.param(
+            lambda toy_settings, **kwargs: toy_settings.change("BAR", "2", **kwargs),
+            id="change",
+        ),
+        pytest.param(
+            lambda toy_settings, **kwargs: toy_settings.unset("BAR", **kwargs),
+            id="unset",
+        ),
+        pytest.param(
+            lambda toy_settings, **kwargs: toy_settings.change_many(
+                {"BAR": "2"}, **kwargs
+            ),
+            id="change_many",
+        ),
+    ),
+)
+def test_handled_requests_do_nothing(make_request):
+    committer = MemoryCommitter()
+    committer.committed.append(factories.Set(key="BAR", value="1", index=0))
+    # the state sees what has been committed
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(
+            history=committer.committed, idempotency_keys=committer.idempotency_keys
+        ),
+        committer=committer,
+    )
+
+    # once its events have been committed, repeating the request would fail
+    for _ in range(2):
+        make_request(
+            toy_settings,
+            timestamp=datetime.datetime.now(),
+            by="me",
+            idempotency_key="abc",
+        )
+
+    assert len(committer.committed) == 2
+
+
+def test_idempotency_key_cannot_be_reused_for_another_request():
+    committer = MemoryCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(
+            history=committer.committed, idempotency_keys=committer.idempotency_keys
+        ),
+        committer=committer,
+    )
+    toy_settings.set(
+        "FOO", "42", timestamp=datetime.datetime.now(), by="me", idempotency_key="abc"
+    )
+
+    with pytest.raises(services.IdempotencyKeyReused):
+        toy_settings.set(
+            "FOO",
+            "43",
+            timestamp=datetime.datetime.now(),
+            by="me",
+            idempotency_key="abc",
+        )
+
+    assert len(committer.committed) == 1
+
+
+def test_idempotency_keys_without_fingerprint_match_any_request():
+    committer = MemoryCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(idempotency_keys={"abc": ""}), committer=committer
+    )
+
+    toy_settings.set(
+        "FOO", "42", timestamp=datetime.datetime.now(), by="me", idempotency_key="abc"
+    )
+
+    assert committer.committed == []
+
+
 def test_set_cannot_update_value():
     set_at = datetime.datetime.now()
     history: list[events.Event] = [
@@ -75,6 +174,129 @@ def test_cannot_change_non_existent_setting():
     assert committer.committed == []
 
 
+def test_change_at_expected_version():
+    history: list[events.Event] = [
+        factories.Set(key="FOO", value="42", index=0),
+    ]
+    committer = MemoryCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=history), committer=committer
+    )
+
+    changed_at = datetime.datetime.now()
+    toy_settings.change("FOO", "43", timestamp=changed_at, by="me", expected_version=1)
+
+    assert committer.committed == [
+        events.Changed(
+            key="FOO", new_value="43", timestamp=changed_at, by="me", index=1
+        ),
+    ]
+
+
+def test_cannot_change_from_unexpected_version():
+    history: list[events.Event] = [
+        factories.Set(key="FOO", value="42", index=0),
+        factories.Changed(key="FOO", new_value="43", index=1),
+    ]
+    committer = MemoryCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=history), committer=committer
+    )
+
+    with pytest.raises(services.VersionMismatch) as exc_info:
+        toy_settings.change(
+            "FOO",
+            "44",
+            timestamp=datetime.datetime.now(),
+            by="me",
+            expected_version=1,
+        )
+
+    assert exc_info.value.expected_version == 1
+    assert committer.committed == []
+
+
+@attrs.define
+class StaleCommitter(MemoryCommitter):
+    def handle(self, event: events.Event) -> None:
+        raise unit_of_work.StaleState
+
+
+def test_change_from_stale_version_is_a_mismatch():
+    history: list[events.Event] = [
+        factories.Set(key="FOO", value="42", index=0),
+    ]
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=history), committer=StaleCommitter()
+    )
+
+    with pytest.raises(services.VersionMismatch):
+        toy_settings.change(
+            "FOO",
+            "43",
+            timestamp=datetime.datetime.now(),
+            by="me",
+            expected_version=1,
+        )
+
+    # without an expected version, the caller can retry
+    with pytest.raises(unit_of_work.StaleState):
+        toy_settings.change("FOO", "43", timestamp=datetime.datetime.now(), by="me")
+
+
+@attrs.define
+class OnceStaleCommitter(MemoryCommitter):
+    """Find the state stale the first time an event is handled."""
+
+    stale: bool = True
+
+    def handle(self, event: events.Event) -> None:
+        if self.stale:
+            self.stale = False
+            raise unit_of_work.StaleState
+        super().handle(event)
+
+
+def test_retry_runs_the_operation_again_when_stale():
+    committer = OnceStaleCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=[]), committer=committer
+    )
+    set_at = datetime.datetime.now()
+
+    result = toy_settings.retry(
+        lambda: toy_settings.set("FOO", "42", timestamp=set_at, by="me"),
+        max_wait_seconds=1,
+    )
+
+    assert result is None
+    assert committer.committed == [
+        events.Set(key="FOO", value="42", timestamp=set_at, by="me", index=0),
+    ]
+
+
+def test_retry_returns_the_result():
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=[]), committer=MemoryCommitter()
+    )
+
+    assert toy_settings.retry(lambda: 42, max_wait_seconds=1) == 42
+
+
+def test_retry_gives_up():
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=[]), committer=StaleCommitter()
+    )
+
+    with pytest.raises(RetryError):
+        toy_settings.retry(
+            lambda: toy_settings.set(
+                "FOO", "42", timestamp=datetime.datetime.now(), by="me"
+            ),
+            max_wait_seconds=0.01,
+        )
+
+
 def test_unset_removes_value():
     set_at = datetime.datetime.now()
     history: list[events.Event] = [
@@ -142,3 +364,44 @@ def test_unset_never_set():
         toy_settings.unset("FOO", timestamp=datetime.datetime.now(), by="me")
 
     assert committer.committed == []
+
+
+def test_change_many():
+    history: list[events.Event] = [
+        factories.Set(key="FOO", value="42", index=0),
+        factories.Set(key="BAR", value="1", index=0),
+    ]
+    committer = MemoryCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=history), committer=committer
+    )
+
+    changed_at = datetime.datetime.now()
+    toy_settings.change_many({"FOO": "43", "BAR": "2"}, timestamp=changed_at, by="me")
+
+    assert committer.committed == [
+        events.Changed(
+            key="FOO", new_value="43", timestamp=changed_at, by="me", index=1
+        ),
+        events.Changed(
+            key="BAR", new_value="2", timestamp=changed_at, by="me", index=1
+        ),
+    ]
+
+
+def test_change_many_changes_nothing_if_any_are_not_set():
+    history: list[events.Event] = [
+        factories.Set(key="FOO", value="42", index=0),
+    ]
+    committer = MemoryCommitter()
+    toy_settings = services.ToySettings(
+        state=MemoryRepo(history=history), committer=committer
+    )
+
+    with pytest.raises(services.NotSet) as exc_info:
+        toy_settings.change_many(
+            {"FOO": "43", "BAR": "2"}, timestamp=datetime.datetime.now(), by="me"
+        )
+
+    assert exc_info.value.key == "BAR"
+    assert committer.committed == []
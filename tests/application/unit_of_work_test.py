@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import datetime
+import unittest.mock
+
+from testing.domain import factories
+from testing.domain.queries import MemoryRepo
+from toy_settings.application import unit_of_work
+from toy_settings.domain import events
+from toy_settings.domain import operations
+from toy_settings.domain import projections
+
+
+def test_pending_state_reads_each_setting_once():
+    repo = MemoryRepo([factories.Set(key="FOO", value="42", index=0)])
+    state = unittest.mock.Mock(wraps=repo)
+    new_events: list[events.Event] = []
+    domain = operations.ToySettings(
+        state=unit_of_work.PendingState(state, new_events), new_events=new_events
+    )
+
+    now = datetime.datetime.now()
+    domain.unset("FOO", timestamp=now, by="me")
+    domain.set("FOO", "43", timestamp=now, by="me")
+    domain.change("FOO", "44", timestamp=now, by="me")
+
+    assert new_events == [
+        events.Unset(key="FOO", timestamp=now, by="me", index=1),
+        events.Set(key="FOO", value="43", timestamp=now, by="me", index=2),
+        events.Changed(key="FOO", new_value="44", timestamp=now, by="me", index=3),
+    ]
+    state.get_setting.assert_called_once_with("FOO")
+
+
+def test_pending_state_includes_pending_events():
+    history: list[events.Event] = [
+        factories.Set(key="FOO", value="42", index=0),
+        factories.Set(key="FOO_BAR", value="1", index=0),
+        factories.Set(key="BAZ", value="2", index=0),
+    ]
+    new_events: list[events.Event] = [
+        factories.Changed(key="FOO", new_value="43", index=1),
+        factories.Unset(key="FOO_BAR", index=1),
+        factories.Set(key="QUX", value="3", index=0),
+    ]
+    state = unit_of_work.PendingState(MemoryRepo(history), new_events)
+
+    assert state.get_setting("FOO") == projections.Setting("43", next_index=2)
+    assert state.current_value("FOO_BAR") is None
+    assert state.current_values(["FOO", "FOO_BAR", "QUX"]) == {"FOO": "43", "QUX": "3"}
+    assert state.all_settings() == {"FOO": "43", "BAZ": "2", "QUX": "3"}
+    assert state.settings_with_prefix("FOO") == {"FOO": "43"}
+    assert state.events_for_key("FOO") == [history[0], new_events[0]]
+    assert state.diff(0) == projections.diff(history)
+    assert state.history_page("FOO", limit=2) == [(1, history[0])]
+    assert state.settings_version() == (3, 3)
+    assert state.request_fingerprint("abc") is None
+    assert state.search("FOO", limit=1) == [("FOO", "42")]
+    assert state.events_by_actor("me", 0, limit=1) == [(3, history[2])]
+    assert state.key_stats(["FOO"]) == projections.key_stats(history[:1])
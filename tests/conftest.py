@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+
+from testing.django_back_end import contention
+from testing.django_back_end.query_counts import Measurement
+from testing.django_back_end.query_counts import table
+
+_query_counts: list[Measurement] = []
+_throughputs: list[contention.Throughput] = []
+
+
+@pytest.fixture
+def query_counts() -> list[Measurement]:
+    """Measurements to report in the query counts table at the end of the run."""
+    return _query_counts
+
+
+@pytest.fixture
+def throughputs() -> list[contention.Throughput]:
+    """Measurements to report in the contention table at the end of the run."""
+    return _throughputs
+
+
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter) -> None:
+    if _query_counts:  # pragma: no branch (empty when only some tests run)
+        terminalreporter.write_sep("-", "query counts")
+        terminalreporter.write_line(table(_query_counts))
+    if _throughputs:  # pragma: no branch (empty when only some tests run)
+        terminalreporter.write_sep("-", "contention")
+        terminalreporter.write_line(contention.table(_throughputs))
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(tmp_path_factory: pytest.TempPathFactory) -> None:
+    # Test against a database file rather than in memory, so that tests can use
+    # it from several threads or processes, each with its own connection.
+    from django.conf import settings
+
+    settings.DATABASES["default"].setdefault("TEST", {})["NAME"] = str(
+        tmp_path_factory.mktemp("db") / "test.sqlite3"
+    )
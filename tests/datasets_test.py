@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import collections
+import io
+
+import pytest
+
+from testing import datasets
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+from toy_settings.domain import projections
+
+
+def test_histories_are_the_same_for_a_seed():
+    assert list(datasets.generate(1000, seed=1)) == list(
+        datasets.generate(1000, seed=1)
+    )
+    assert list(datasets.generate(1000, seed=1)) != list(
+        datasets.generate(1000, seed=2)
+    )
+
+
+def test_histories_are_valid():
+    history = list(datasets.generate(5000, keys=50))
+
+    assert len(history) == 5000
+    settings: dict[str, projections.Setting] = {}
+    for event in history:
+        setting = settings.get(event.key, projections.Setting())
+        assert event.index == setting.next_index
+        if isinstance(event, events.Set):
+            assert setting.value is None
+        else:
+            assert setting.value is not None
+        projections.apply([event], settings)
+    assert [event.timestamp for event in history] == sorted(
+        event.timestamp for event in history
+    )
+
+
+def test_histories_follow_the_mix():
+    mix = datasets.Mix(set=0.0, change=0.5, unset=0.5)
+
+    kinds = collections.Counter(
+        type(event) for event in datasets.generate(10_000, keys=10, mix=mix)
+    )
+
+    # every unset key is set again the next time it's picked
+    assert kinds[events.Changed] == pytest.approx(kinds[events.Unset], rel=0.1)
+    assert kinds[events.Set] == pytest.approx(kinds[events.Unset], abs=10)
+
+
+def test_popular_keys_are_picked_most():
+    counts = collections.Counter(
+        event.key for event in datasets.generate(10_000, keys=100)
+    )
+
+    assert counts["KEY_0"] > counts["KEY_9"] > counts["KEY_99"]
+    assert counts.most_common(1) == [("KEY_0", counts["KEY_0"])]
+
+
+def test_ndjson_round_trip():
+    history = list(datasets.generate(100))
+    file = io.StringIO()
+
+    datasets.write_ndjson(history, file)
+    file.seek(0)
+
+    assert len(file.getvalue().splitlines()) == 100
+    assert list(datasets.read_ndjson(file)) == history
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_insert():
+    history = list(datasets.generate(1000, keys=20))
+
+    assert datasets.bulk_insert(history, batch_size=300) == 1000
+
+    repo = DjangoRepo()
+    assert models.Event.objects.count() == 1000
+    assert list(
+        models.Sequence.objects.order_by("event_id").values_list("event_id", flat=True)
+    ) == list(models.Event.objects.values_list("pk", flat=True))
+    for key in {event.key for event in history}:
+        assert repo.events_for_key(key) == [
+            event for event in history if event.key == key
+        ]
+
+    assert repo.all_settings() == {
+        key: setting.value
+        for key, setting in projections.current_settings(history).items()
+        if setting.value is not None
+    }
+    assert repo.search("KEY_1", limit=100)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_insert_after_other_events():
+    DjangoCommitter().handle(
+        events.Set(index=0, timestamp=datasets.START, key="OTHER", value="on", by="me")
+    )
+
+    datasets.bulk_insert(datasets.generate(10, keys=1))
+
+    assert DjangoRepo().all_settings().keys() == {"OTHER", "KEY_0"}
+    assert models.Sequence.objects.count() == 11
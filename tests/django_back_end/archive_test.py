@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from testing.domain import factories
+from toy_settings.application import unit_of_work
+from toy_settings.django_back_end import archive
+from toy_settings.django_back_end import checkpoints
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end import projection
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+from toy_settings.domain import projections
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def _record_history() -> list[factories.Event]:
+    history = [
+        factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0),
+        factories.Changed(key="FOO", new_value="43", timestamp=timezone.now(), index=1),
+        factories.Set(key="BAR", value="1", timestamp=timezone.now(), index=0),
+        factories.Changed(key="FOO", new_value="44", timestamp=timezone.now(), index=2),
+    ]
+    committer = DjangoCommitter()
+    for event in history:
+        committer.handle(event)
+    return history
+
+
+def test_archive_superseded_events():
+    history = _record_history()
+    since = models.Event.objects.earliest("id").id - 1
+
+    archived = archive.archive_superseded_events(
+        up_to=models.Event.objects.latest("id").id, batch_size=1
+    )
+
+    assert archived == 2
+    assert sorted(models.Event.objects.values_list("key", flat=True)) == ["BAR", "FOO"]
+
+    repo = DjangoRepo()
+    assert repo.events_for_key("FOO") == [history[0], history[1], history[3]]
+    assert repo.events_for_key("BAR") == [history[2]]
+    assert repo.get_setting("FOO") == projections.Setting("44", next_index=3)
+    assert repo.diff(since) == projections.Diff(
+        added={"FOO": "44", "BAR": "1"}, changed={}, removed=[]
+    )
+    assert projection.CurrentSettings().values() == {"FOO": "44", "BAR": "1"}
+
+
+def test_history_pages_reach_into_archive():
+    history = _record_history()
+    archive.archive_superseded_events(up_to=models.Event.objects.latest("id").id)
+    repo = DjangoRepo()
+
+    first_page = repo.history_page("FOO", limit=2)
+    assert [event for _, event in first_page] == [history[3], history[1]]
+
+    second_page = repo.history_page("FOO", before=first_page[-1][0], limit=2)
+    assert [event for _, event in second_page] == [history[0]]
+
+    # a page which starts in the archive skips the event log entirely
+    assert repo.history_page("FOO", before=second_page[0][0] + 1, limit=2) == (
+        second_page
+    )
+
+
+def test_events_by_actor_merges_archive():
+    history = [
+        factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0),
+        factories.Set(key="BAR", value="1", timestamp=timezone.now(), index=0),
+        factories.Changed(key="FOO", new_value="43", timestamp=timezone.now(), index=1),
+        factories.Changed(key="FOO", new_value="44", timestamp=timezone.now(), index=2),
+    ]
+    committer = DjangoCommitter()
+    for event in history:
+        committer.handle(event)
+    archive.archive_superseded_events(up_to=models.Event.objects.latest("id").id)
+
+    # FOO's archived change is newer than BAR's event, which is still in the log
+    page = DjangoRepo().events_by_actor("me", limit=3)
+
+    assert [event for _, event in page] == [history[3], history[2], history[1]]
+    assert DjangoRepo().events_by_actor("me", before=page[-1][0], limit=3) == [
+        (page[-1][0] - 1, history[0])
+    ]
+
+
+def test_archived_indexes_cannot_be_reused():
+    _record_history()
+    archive.archive_superseded_events(up_to=models.Event.objects.latest("id").id)
+
+    with pytest.raises(unit_of_work.StaleState):
+        DjangoCommitter().handle(
+            factories.Unset(key="FOO", timestamp=timezone.now(), index=1)
+        )
+
+
+def test_archive_events_up_to_checkpoint(tmp_path, settings):
+    settings.SETTINGS_CHECKPOINT_PATH = tmp_path / "checkpoint.json"
+    _record_history()
+    checkpoint = projection.current_settings.checkpoint()
+    checkpoints.save(checkpoint, settings.SETTINGS_CHECKPOINT_PATH)
+    # these events are newer than the checkpoint, so stay in the event log
+    DjangoCommitter().handle(
+        factories.Changed(key="BAR", new_value="2", timestamp=timezone.now(), index=1)
+    )
+    DjangoCommitter().handle(
+        factories.Changed(key="BAR", new_value="3", timestamp=timezone.now(), index=2)
+    )
+
+    stdout = io.StringIO()
+    call_command("archive_events", stdout=stdout)
+
+    assert stdout.getvalue() == (
+        f"Archived 3 events up to position {checkpoint.position}\n"
+    )
+    assert models.Event.objects.filter(id__gt=checkpoint.position).count() == 2
+
+
+def test_archive_events_without_checkpoint(tmp_path, settings):
+    settings.SETTINGS_CHECKPOINT_PATH = tmp_path / "checkpoint.json"
+    _record_history()
+
+    stdout = io.StringIO()
+    call_command("archive_events", stdout=stdout)
+
+    assert stdout.getvalue() == "No checkpoint to archive up to\n"
+    assert models.ArchivedEvent.objects.count() == 0
+
+
+@pytest.mark.parametrize("archived", [False, True])
+def test_diff_follows_the_order_events_were_recorded(archived: bool):
+    start = timezone.now()
+    committer = DjangoCommitter()
+    # the second event comes from a worker whose clock is behind
+    committer.handle(
+        events.Set(
+            index=0,
+            timestamp=start + datetime.timedelta(seconds=10),
+            key="K",
+            value="1",
+            by="me",
+        )
+    )
+    committer.handle(
+        events.Changed(
+            index=1,
+            timestamp=start + datetime.timedelta(seconds=9),
+            key="K",
+            new_value="2",
+            by="me",
+        )
+    )
+    if archived:
+        archive.archive_superseded_events(up_to=2**62)
+
+    expected = projections.Diff(added={"K": "2"}, changed={}, removed=[])
+    assert DjangoRepo().diff(start) == expected
+    assert DjangoRepo().diff(0) == expected
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from testing.django_back_end.contention import Throughput
+from toy_settings.application import unit_of_work
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+CHANGES_PER_THREAD = 20
+
+
+def _change(key: str, changes: int, start: threading.Barrier, stale: list[int]) -> None:
+    """Change a setting, retrying with the latest index whenever it's stale."""
+    committer = DjangoCommitter()
+    repo = DjangoRepo()
+    try:
+        start.wait()
+        for n in range(changes):
+            while True:
+                setting = repo.get_setting(key)
+                try:
+                    with committer.atomic():
+                        committer.handle(
+                            events.Changed(
+                                index=setting.next_index,
+                                timestamp=timezone.now(),
+                                key=key,
+                                new_value=str(n),
+                                by=threading.current_thread().name,
+                            )
+                        )
+                except unit_of_work.StaleState:
+                    stale.append(1)
+                else:
+                    break
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("threads", (1, 2, 4, 8))
+@pytest.mark.parametrize("scenario", ("same key", "own keys"))
+def test_concurrent_changes(scenario, threads, throughputs):
+    keys = [
+        "KEY" if scenario == "same key" else f"KEY_{thread}"
+        for thread in range(threads)
+    ]
+    committer = DjangoCommitter()
+    for key in set(keys):
+        committer.handle(
+            events.Set(index=0, timestamp=timezone.now(), key=key, value="", by="me")
+        )
+
+    start = threading.Barrier(threads + 1)
+    stale: list[int] = []
+    with ThreadPoolExecutor(threads) as executor:
+        futures = [
+            executor.submit(_change, key, CHANGES_PER_THREAD, start, stale)
+            for key in keys
+        ]
+        start.wait()
+        started = time.perf_counter()
+        for future in futures:
+            future.result()
+        seconds = time.perf_counter() - started
+
+    # every change was committed once, and each key's indexes count up from 0 in
+    # the order the events were recorded
+    indexes = defaultdict(list)
+    for key, index in models.Sequence.objects.order_by("event_id").values_list(
+        "key", "index"
+    ):
+        indexes[key].append(index)
+    changes = CHANGES_PER_THREAD * keys.count(keys[0])
+    assert indexes == {key: list(range(changes + 1)) for key in set(keys)}
+    assert dict(models.CurrentSetting.objects.values_list("key", "next_index")) == {
+        key: changes + 1 for key in set(keys)
+    }
+
+    throughputs.append(
+        Throughput(
+            scenario=scenario,
+            threads=threads,
+            commits=CHANGES_PER_THREAD * threads,
+            stale=len(stale),
+            seconds=seconds,
+        )
+    )
+
+
+def _change_once(index: int, start: threading.Barrier) -> bool:
+    committer = DjangoCommitter()
+    try:
+        start.wait()
+        with committer.atomic():
+            committer.handle(
+                events.Changed(
+                    index=index,
+                    timestamp=timezone.now(),
+                    key="KEY",
+                    new_value=threading.current_thread().name,
+                    by="me",
+                )
+            )
+    except unit_of_work.StaleState:
+        return False
+    else:
+        return True
+    finally:
+        connection.close()
+
+
+def test_only_one_concurrent_change_wins():
+    DjangoCommitter().handle(
+        events.Set(index=0, timestamp=timezone.now(), key="KEY", value="", by="me")
+    )
+
+    threads = 8
+    start = threading.Barrier(threads)
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(_change_once, [1] * threads, [start] * threads))
+
+    assert results.count(True) == 1
+    assert list(
+        models.Sequence.objects.filter(key="KEY").values_list("index", flat=True)
+    ) == [0, 1]
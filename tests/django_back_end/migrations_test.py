@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import importlib
+from typing import Any
+from typing import Callable
+from typing import Iterator
+
+import pytest
+from django.apps.registry import Apps
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+
+from testing.domain import factories
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end import search
+from toy_settings.domain import events
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+APP = "django_back_end"
+
+
+@pytest.fixture
+def migrate() -> Iterator[Callable[[str], Apps]]:
+    """Migrate the database to a migration, and get the models as they were then.
+
+    The database is migrated back to the latest migration afterwards.
+    """
+
+    def migrate(name: str) -> Apps:
+        executor = MigrationExecutor(connection)
+        executor.migrate([(APP, name)])
+        return executor.loader.project_state([(APP, name)]).apps
+
+    yield migrate
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+def _record_version_1(apps: Apps, history: list[events.Event]) -> None:
+    # events with their values in the payload, from before values were stored
+    # out of line
+    Event: Any = apps.get_model(APP, "Event")
+    Sequence: Any = apps.get_model(APP, "Sequence")
+    for event in history:
+        stored = Event.objects.create(
+            event_type=type(event).__name__,
+            event_type_version=1,
+            key=event.key,
+            timestamp=event.timestamp,
+            payload=models.Event.payload_converter.dumps(event),
+        )
+        Sequence.objects.create(event=stored, key=event.key, index=event.index)
+
+
+HISTORY: list[events.Event] = [
+    factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0),
+    factories.Set(key="BAR", value="1", timestamp=timezone.now(), index=0),
+    factories.Changed(key="FOO", new_value="43", timestamp=timezone.now(), index=1),
+    factories.Set(key="BAZ", value="1", timestamp=timezone.now(), index=0),
+    factories.Unset(key="BAZ", timestamp=timezone.now(), index=1),
+]
+
+
+def test_populate_current_settings(migrate):
+    _record_version_1(migrate("0005_archivedevent"), HISTORY)
+
+    apps = migrate("0006_currentsetting")
+
+    CurrentSetting: Any = apps.get_model(APP, "CurrentSetting")
+    assert dict(CurrentSetting.objects.values_list("key", "value")) == {
+        "FOO": "43",
+        "BAR": "1",
+    }
+
+
+def test_populate_next_index(migrate):
+    _record_version_1(migrate("0005_archivedevent"), HISTORY)
+
+    apps = migrate("0011_currentsetting_next_index")
+
+    CurrentSetting: Any = apps.get_model(APP, "CurrentSetting")
+    assert dict(CurrentSetting.objects.values_list("key", "next_index")) == {
+        "FOO": 2,
+        "BAR": 1,
+    }
+
+
+def test_populate_key_stats(migrate):
+    _record_version_1(migrate("0005_archivedevent"), HISTORY)
+
+    apps = migrate("0013_keystats")
+
+    KeyStats: Any = apps.get_model(APP, "KeyStats")
+    assert {
+        stats.key: (stats.last_event_type, stats.event_count)
+        for stats in KeyStats.objects.all()
+    } == {"FOO": ("Changed", 2), "BAR": ("Set", 1), "BAZ": ("Unset", 2)}
+
+
+def test_populate_by(migrate, monkeypatch):
+    migration = importlib.import_module(
+        "toy_settings.django_back_end.migrations.0014_event_by"
+    )
+    monkeypatch.setattr(migration, "BATCH_SIZE", 2)
+    _record_version_1(migrate("0005_archivedevent"), HISTORY)
+
+    apps = migrate("0014_event_by")
+
+    Event: Any = apps.get_model(APP, "Event")
+    assert set(Event.objects.values_list("by", flat=True)) == {"me"}
+
+
+def test_populate_search_index(migrate):
+    _record_version_1(migrate("0005_archivedevent"), HISTORY)
+
+    migrate("0015_settingsearch")
+
+    assert search.search("FOO", limit=5) == [("FOO", "43")]
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import attrs
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.utils import timezone
+
+from testing.domain import factories
+from toy_settings.django_back_end import archive
+from toy_settings.django_back_end import checkpoints
+from toy_settings.django_back_end import projection
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+from toy_settings.domain import projections
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_catches_up_from_checkpoint(tmp_path, django_assert_num_queries):
+    committer = DjangoCommitter()
+    committer.handle(
+        factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0)
+    )
+    committer.handle(
+        factories.Set(key="BAR", value="43", timestamp=timezone.now(), index=0)
+    )
+    path = tmp_path / "checkpoint.json"
+    checkpoints.save(projection.current_settings.checkpoint(), path)
+
+    committer.handle(
+        factories.Changed(key="FOO", new_value="44", timestamp=timezone.now(), index=1)
+    )
+    committer.handle(factories.Unset(key="BAR", timestamp=timezone.now(), index=1))
+
+    current_settings = projection.CurrentSettings()
+    current_settings.reset(checkpoints.load(path))
+
+    # one query to check the checkpoint, one for the new events, and one for
+    # their values
+    with django_assert_num_queries(3):
+        assert current_settings.values() == {"FOO": "44"}
+    assert current_settings.checkpoint().settings == {
+        "FOO": projections.Setting("44", next_index=2),
+        "BAR": projections.Setting(None, next_index=2),
+    }
+
+
+def _set(key: str, value: str) -> events.Set:
+    return events.Set(index=0, timestamp=timezone.now(), key=key, value=value, by="me")
+
+
+@pytest.mark.parametrize(
+    "new_events",
+    [
+        pytest.param(1, id="position-past-the-log"),
+        pytest.param(6, id="other-event-at-position"),
+    ],
+)
+def test_checkpoint_from_an_earlier_database_is_discarded(new_events):
+    committer = DjangoCommitter()
+    for index in range(5):
+        committer.handle(_set(f"OLD_{index}", "x"))
+    checkpoint = projection.CurrentSettings().checkpoint()
+    # the database is recreated, but the checkpoint file is left behind
+    call_command("flush", interactive=False)
+    for index in range(new_events):
+        committer.handle(_set(f"NEW_{index}", "1"))
+
+    projection.current_settings.reset(checkpoint)
+
+    assert DjangoRepo().all_settings() == {
+        f"NEW_{index}": "1" for index in range(new_events)
+    }
+
+
+def test_checkpoint_at_an_archived_event_is_kept():
+    committer = DjangoCommitter()
+    committer.handle(_set("FOO", "42"))
+    checkpoint = projection.CurrentSettings().checkpoint()
+    committer.handle(
+        events.Changed(
+            index=1, timestamp=timezone.now(), key="FOO", new_value="43", by="me"
+        )
+    )
+    archive.archive_superseded_events(up_to=checkpoint.position)
+
+    current_settings = projection.CurrentSettings()
+    # a setting only the checkpoint knows about, to tell it was kept
+    current_settings.reset(
+        attrs.evolve(
+            checkpoint,
+            settings={**checkpoint.settings, "BAR": projections.Setting("1", 1)},
+        )
+    )
+
+    assert current_settings.values() == {"FOO": "43", "BAR": "1"}
+
+
+def test_load_missing_checkpoint(tmp_path):
+    assert checkpoints.load(tmp_path / "checkpoint.json") is None
+
+
+def test_write_checkpoint_is_loaded_at_startup(tmp_path, settings):
+    settings.SETTINGS_CHECKPOINT_PATH = tmp_path / "checkpoint.json"
+    DjangoCommitter().handle(
+        factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0)
+    )
+
+    call_command("write_checkpoint")
+    projection.current_settings.reset()
+    apps.get_app_config("django_back_end").ready()
+
+    assert projection.current_settings.settings == {
+        "FOO": projections.Setting("42", next_index=1),
+    }
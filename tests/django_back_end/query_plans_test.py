@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import datetime
+from typing import Callable
+
+import pytest
+from django.utils import timezone
+
+from testing.django_back_end.query_plans import record_query_plans
+from testing.domain import factories
+from toy_settings.django_back_end import archive
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end import projection
+from toy_settings.django_back_end import subscriptions
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Noop(subscriptions.Subscription):
+    name = "noop"
+
+    def handle(self, batch: list[tuple[int, events.Event]]) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def history():
+    day = datetime.timedelta(days=1)
+    committer = DjangoCommitter()
+    for event in [
+        factories.Set(key="FOO", value="42", timestamp=START, index=0),
+        factories.Changed(key="FOO", new_value="43", timestamp=START + day, index=1),
+        factories.Set(key="BAR", value="1", timestamp=START + 2 * day, index=0),
+        factories.Changed(
+            key="FOO", new_value="44", timestamp=START + 3 * day, index=2
+        ),
+    ]:
+        committer.handle(event)
+    archive.archive_superseded_events(up_to=models.Event.objects.latest("id").id)
+    projection.current_settings.reset()
+
+
+def _record(key: str, index: int) -> None:
+    DjangoCommitter().handle(
+        factories.Changed(key=key, new_value="0", timestamp=timezone.now(), index=index)
+    )
+
+
+@pytest.mark.parametrize(
+    "query",
+    (
+        pytest.param(lambda: DjangoRepo().events_for_key("FOO"), id="events_for_key"),
+        pytest.param(lambda: DjangoRepo().get_setting("FOO"), id="get_setting"),
+        pytest.param(
+            lambda: DjangoRepo().events_by_actor("me", before=4, limit=2),
+            id="events_by_actor",
+        ),
+        pytest.param(
+            lambda: DjangoRepo().events_by_actor("me", 1, START, limit=2),
+            id="events_by_actor-bounded",
+        ),
+        pytest.param(lambda: DjangoRepo().current_value("FOO"), id="current_value"),
+        pytest.param(
+            lambda: DjangoRepo().current_values(["FOO", "BAR"]), id="current_values"
+        ),
+        pytest.param(lambda: DjangoRepo().all_settings(), id="all_settings"),
+        pytest.param(lambda: DjangoRepo().key_stats(["FOO", "BAR"]), id="key_stats"),
+        pytest.param(
+            lambda: DjangoRepo().settings_with_prefix("FO"), id="settings_with_prefix"
+        ),
+        pytest.param(lambda: DjangoRepo().search("FOO", limit=5), id="search"),
+        pytest.param(lambda: DjangoRepo().diff(1, 3), id="diff-positions"),
+        pytest.param(
+            lambda: DjangoRepo().diff(START, START + datetime.timedelta(days=2)),
+            id="diff-timestamps",
+        ),
+        pytest.param(lambda: _record("FOO", 3), id="record-event"),
+        pytest.param(
+            lambda: archive.archive_superseded_events(up_to=2**62), id="archive"
+        ),
+        pytest.param(lambda: subscriptions.catch_up(Noop()), id="subscription"),
+    ),
+)
+def test_query_plans(query: Callable[[], object]):
+    with record_query_plans() as plans:
+        query()
+
+    assert plans
+    assert [(plan.sql, plan.problems) for plan in plans if plan.problems] == []
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import io
+from typing import Any
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from testing.domain import factories
+from toy_settings.django_back_end import archive
+from toy_settings.django_back_end import checkpoints
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end import projection
+from toy_settings.django_back_end import rebuild
+from toy_settings.django_back_end import search
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import projections
+from toy_settings.snapshot_back_end import snapshot
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture(autouse=True)
+def history():
+    committer = DjangoCommitter()
+    for event in [
+        factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0),
+        factories.Set(key="BAR", value="1", timestamp=timezone.now(), index=0),
+        factories.Changed(key="FOO", new_value="43", timestamp=timezone.now(), index=1),
+        factories.Set(key="BAZ", value="2", timestamp=timezone.now(), index=0),
+        factories.Unset(key="BAR", timestamp=timezone.now(), index=1),
+        factories.Changed(key="BAZ", new_value="3", timestamp=timezone.now(), index=1),
+    ]:
+        committer.handle(event)
+    archive.archive_superseded_events(up_to=models.Event.objects.latest("id").id)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _read_models() -> tuple[Any, ...]:
+    return (
+        sorted(models.CurrentSetting.objects.values_list()),
+        sorted(models.KeyStats.objects.values_list()),
+        search.search("FOO", limit=10),
+    )
+
+
+def test_rebuild_projections():
+    expected = _read_models()
+    models.CurrentSetting.objects.update(value="wrong")
+    models.KeyStats.objects.all().delete()
+    search.rebuild()
+
+    stdout = io.StringIO()
+    call_command("rebuild_projections", "--batch-size", "4", stdout=stdout)
+
+    assert _read_models() == expected
+    assert stdout.getvalue().splitlines()[0].startswith("partition 1/1: 4/6 events,")
+    assert stdout.getvalue().splitlines()[-1] == "Rebuilt read models"
+    assert rebuild.in_progress() == []
+
+
+def test_rebuild_projections_replaces_checkpoint_and_snapshot(tmp_path, settings):
+    settings.SETTINGS_CHECKPOINT_PATH = tmp_path / "checkpoint.json"
+    settings.SETTINGS_SNAPSHOT_PATH = tmp_path / "snapshot"
+    stale = checkpoints.Checkpoint(
+        position=models.Event.objects.latest("id").id,
+        settings={"FOO": projections.Setting("wrong", next_index=2)},
+    )
+    checkpoints.save(stale, settings.SETTINGS_CHECKPOINT_PATH)
+    projection.current_settings.reset(stale)
+    snapshot.publish(settings.SETTINGS_SNAPSHOT_PATH, lambda: {"FOO": "wrong"})
+
+    stdout = io.StringIO()
+    call_command("rebuild_projections", stdout=stdout)
+
+    checkpoint = checkpoints.load(settings.SETTINGS_CHECKPOINT_PATH)
+    assert checkpoint is not None
+    assert checkpoint.position == stale.position
+    assert checkpoint.settings["FOO"] == projections.Setting("43", next_index=2)
+    assert dict(snapshot.Snapshot.open(settings.SETTINGS_SNAPSHOT_PATH).items()) == {
+        "FOO": "43",
+        "BAZ": "3",
+    }
+    assert stdout.getvalue().splitlines()[-3:] == [
+        f"Rewrote checkpoint at position {stale.position} "
+        f"to {settings.SETTINGS_CHECKPOINT_PATH}",
+        f"Republished snapshot to {settings.SETTINGS_SNAPSHOT_PATH}",
+        "Rebuilt read models",
+    ]
+
+
+def test_rebuild_projections_in_processes():
+    expected = _read_models()
+    models.CurrentSetting.objects.update(value="wrong")
+
+    stdout = io.StringIO()
+    call_command("rebuild_projections", "--partitions", "2", stdout=stdout)
+
+    assert _read_models() == expected
+    assert rebuild.in_progress() == []
+
+
+def test_resume_failed_processes(monkeypatch):
+    expected = _read_models()
+
+    def fail(*args: object) -> None:  # pragma: no cover (runs in the processes)
+        raise Interrupted
+
+    with monkeypatch.context() as patched:
+        patched.setattr(rebuild, "rebuild", fail)
+        with pytest.raises(CommandError, match=r"Partitions \[0, 1\] failed"):
+            call_command("rebuild_projections", "--partitions", "2")
+
+    stdout = io.StringIO()
+    call_command("rebuild_projections", stdout=stdout)
+
+    assert stdout.getvalue().splitlines()[0] == "Resuming rebuild in 2 partitions"
+    assert _read_models() == expected
+
+
+def test_rebuild_partitions():
+    expected = _read_models()
+
+    partitions = rebuild.start(2)
+    assert not models.CurrentSetting.objects.exists()
+    for partition in partitions:
+        assert rebuild.rebuild(partition, batch_size=4) == 6
+    rebuild.finish()
+
+    assert _read_models() == expected
+    assert {key in partitions[0] for key in ["FOO", "BAR", "BAZ"]} == {True, False}
+
+
+def _interrupt(progress: rebuild.Progress) -> None:
+    raise Interrupted
+
+
+def test_resume_rebuild():
+    expected = _read_models()
+    [partition] = rebuild.start(1)
+    with pytest.raises(Interrupted):
+        rebuild.rebuild(partition, batch_size=4, report=_interrupt)
+
+    stdout = io.StringIO()
+    call_command("rebuild_projections", "--batch-size", "4", stdout=stdout)
+
+    assert _read_models() == expected
+    lines = stdout.getvalue().splitlines()
+    assert lines[0] == "Resuming rebuild in 1 partitions"
+    assert lines[1].startswith("partition 1/1: 2/2 events,")
+
+
+def test_progress():
+    progress = rebuild.Progress(
+        rebuild.Partition(0, 1), applied=100, total=300, seconds=2
+    )
+    assert progress.events_per_second == 50
+    assert progress.eta_seconds == 4
+
+    progress = rebuild.Progress(
+        rebuild.Partition(0, 1), applied=0, total=300, seconds=0
+    )
+    assert progress.events_per_second == 0
+    assert progress.eta_seconds is None
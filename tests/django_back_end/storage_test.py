@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable
+from typing import Iterator
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from testing.domain import factories
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end import storage
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_values_are_stored_once():
+    committer = DjangoCommitter()
+    committer.handle(
+        factories.Set(key="FOO", value="on", timestamp=timezone.now(), index=0)
+    )
+    committer.handle(
+        factories.Changed(key="FOO", new_value="off", timestamp=timezone.now(), index=1)
+    )
+    committer.handle(
+        factories.Changed(key="FOO", new_value="on", timestamp=timezone.now(), index=2)
+    )
+    committer.handle(
+        factories.Set(key="BAR", value="on", timestamp=timezone.now(), index=0)
+    )
+
+    assert models.Value.objects.count() == 2
+    assert DjangoRepo().all_settings() == {"FOO": "on", "BAR": "on"}
+
+
+def test_large_values_are_compressed():
+    value = "x" * 10_000
+    event = factories.Set(key="FOO", value=value, timestamp=timezone.now(), index=0)
+
+    DjangoCommitter().handle(event)
+
+    stored = models.Value.objects.get()
+    assert stored.compressed
+    assert len(stored.data) < len(value)
+    assert DjangoRepo().events_for_key("FOO") == [event]
+
+
+def test_values_are_not_compressed_unless_smaller(monkeypatch):
+    monkeypatch.setattr(storage, "COMPRESSION_THRESHOLD", 0)
+    value = "x"
+
+    value_hash = storage.store_value(value)
+
+    assert not models.Value.objects.get().compressed
+    assert storage.load_values([value_hash]) == {value_hash: value}
+
+
+def test_only_the_values_of_a_page_are_fetched(monkeypatch):
+    committer = DjangoCommitter()
+    for index in range(10):
+        committer.handle(
+            events.Set(
+                index=index,
+                timestamp=timezone.now(),
+                key="FOO",
+                value=str(index),
+                by="me",
+            )
+            if index == 0
+            else events.Changed(
+                index=index,
+                timestamp=timezone.now(),
+                key="FOO",
+                new_value=str(index),
+                by="me",
+            )
+        )
+    fetched: list[str] = []
+    load_values = storage.load_values
+
+    def spy(hashes: Iterable[str]) -> dict[str, str]:
+        values = load_values(hashes)
+        fetched.extend(values.values())
+        return values
+
+    monkeypatch.setattr(storage, "load_values", spy)
+
+    DjangoRepo().history_page("FOO", limit=3)
+
+    assert sorted(fetched) == ["7", "8", "9"]
+
+
+@pytest.fixture
+def max_parameters() -> Iterator[int]:
+    """Lower the number of parameters SQLite allows in one query."""
+    connection.ensure_connection()
+    limit = sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER
+    previous = connection.connection.setlimit(limit, 100)
+    yield 100
+    connection.connection.setlimit(limit, previous)
+
+
+def test_any_number_of_keys_can_be_looked_up(max_parameters: int):
+    DjangoCommitter().handle(
+        events.Set(index=0, timestamp=timezone.now(), key="FOO", value="42", by="me")
+    )
+    keys = [f"KEY_{i}" for i in range(max_parameters)] + ["FOO"]
+
+    assert DjangoRepo().current_values(keys) == {"FOO": "42"}
+    assert DjangoRepo().key_stats(keys).keys() == {"FOO"}
+
+
+def test_version_1_events_can_be_read():
+    now = timezone.now()
+    history: list[events.Event] = [
+        events.Set(key="FOO", value="42", timestamp=now, index=0, by="me"),
+        events.Changed(key="FOO", new_value="43", timestamp=now, index=1, by="me"),
+        events.Unset(key="FOO", timestamp=now, index=2, by="me"),
+    ]
+    rows = [
+        models.Event(
+            event_type=type(event).__name__,
+            event_type_version=1,
+            key=event.key,
+            timestamp=event.timestamp,
+            payload=models.Event.payload_converter.dumps(event),
+        )
+        for event in history
+    ]
+
+    assert storage.to_domain(rows) == history
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from testing.domain import factories
+from toy_settings.django_back_end import archive
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end import subscriptions
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+class Recording(subscriptions.Subscription):
+    name = "recording"
+    batches: list[list[tuple[int, events.Event]]] = []
+
+    def handle(self, batch: list[tuple[int, events.Event]]) -> None:
+        self.batches.append(batch)
+
+
+class Broken(subscriptions.Subscription):
+    name = "broken"
+
+    def handle(self, batch: list[tuple[int, events.Event]]) -> None:
+        raise RuntimeError
+
+
+@pytest.fixture(autouse=True)
+def reset_batches():
+    Recording.batches = []
+
+
+def _record(*history: events.Event) -> None:
+    committer = DjangoCommitter()
+    for event in history:
+        committer.handle(event)
+
+
+def test_catch_up_in_batches():
+    history = [
+        factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0),
+        factories.Changed(key="FOO", new_value="43", timestamp=timezone.now(), index=1),
+        factories.Set(key="BAR", value="1", timestamp=timezone.now(), index=0),
+    ]
+    _record(*history)
+    subscription = Recording()
+
+    assert subscriptions.catch_up(subscription, batch_size=2) == 3
+
+    assert [[event for _, event in batch] for batch in Recording.batches] == [
+        history[:2],
+        history[2:],
+    ]
+    checkpoint = models.SubscriptionCheckpoint.objects.get(name="recording")
+    assert checkpoint.position == models.Event.objects.latest("id").id
+
+    # only newer events are applied next time
+    new_event = factories.Unset(key="BAR", timestamp=timezone.now(), index=1)
+    _record(new_event)
+
+    assert subscriptions.catch_up(subscription) == 1
+    assert [event for _, event in Recording.batches[-1]] == [new_event]
+
+
+def test_catch_up_includes_archived_events():
+    history = [
+        factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0),
+        factories.Set(key="BAR", value="1", timestamp=timezone.now(), index=0),
+        factories.Changed(key="FOO", new_value="43", timestamp=timezone.now(), index=1),
+    ]
+    _record(*history)
+    archive.archive_superseded_events(up_to=models.Event.objects.latest("id").id)
+
+    subscriptions.catch_up(Recording())
+
+    assert [[event for _, event in batch] for batch in Recording.batches] == [history]
+
+
+def test_failed_batch_is_not_checkpointed():
+    _record(factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0))
+
+    with pytest.raises(RuntimeError):
+        subscriptions.catch_up(Broken())
+
+    assert not models.SubscriptionCheckpoint.objects.filter(name="broken").exists()
+
+
+def test_run_subscriptions_once(settings):
+    settings.SETTINGS_SUBSCRIPTIONS = [
+        "tests.django_back_end.subscriptions_test.Recording"
+    ]
+    _record(factories.Set(key="FOO", value="42", timestamp=timezone.now(), index=0))
+
+    stdout = io.StringIO()
+    call_command("run_subscriptions", "--once", stdout=stdout)
+    call_command("run_subscriptions", "--once", stdout=stdout)
+
+    assert stdout.getvalue() == "recording: applied 1 events\n"
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import datetime
+import io
+
 import pytest
+from django.core.management import call_command
 from django.utils import timezone
 
 from testing.domain import factories
 from toy_settings.application import unit_of_work
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end.queries import DjangoRepo
 from toy_settings.django_back_end.unit_of_work import DjangoCommitter
 
 pytestmark = pytest.mark.django_db(transaction=True)
@@ -40,3 +46,30 @@ def test_non_monotonic_insert_raises_StaleState(indexes):
                 key="FOO", new_value="99", timestamp=timezone.now(), index=indexes[1]
             )
         )
+
+
+def test_idempotency_key_can_only_be_remembered_once():
+    committer = DjangoCommitter()
+
+    committer.remember("abc", "fingerprint")
+
+    assert DjangoRepo().request_fingerprint("abc") == "fingerprint"
+    assert DjangoRepo().request_fingerprint("def") is None
+    with pytest.raises(unit_of_work.StaleState):
+        committer.remember("abc", "other")
+
+
+def test_purge_idempotency_keys():
+    committer = DjangoCommitter()
+    committer.remember("old", "fingerprint")
+    committer.remember("new", "fingerprint")
+    models.IdempotencyKey.objects.filter(key="old").update(
+        recorded_at=timezone.now() - datetime.timedelta(days=2)
+    )
+
+    stdout = io.StringIO()
+    call_command("purge_idempotency_keys", stdout=stdout)
+
+    assert stdout.getvalue().startswith("Purged 1 idempotency keys recorded before")
+    assert DjangoRepo().request_fingerprint("old") is None
+    assert DjangoRepo().request_fingerprint("new") == "fingerprint"
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import datetime
+
 from testing.domain import factories
+from toy_settings.domain import events
 from toy_settings.domain import projections
 
 
@@ -20,3 +23,50 @@ def test_current_settings():
         "set-and-changed": projections.Setting("43", next_index=2),
         "set-and-unset": projections.Setting(None, next_index=2),
     }
+
+
+def test_key_stats():
+    set_at = datetime.datetime(2024, 1, 1)
+    unset_at = datetime.datetime(2024, 1, 2)
+    history: list[events.Event] = [
+        events.Set(key="set-once", value="42", index=0, timestamp=set_at, by="me"),
+        events.Set(key="set-and-unset", value="42", index=0, timestamp=set_at, by="me"),
+        events.Unset(key="set-and-unset", index=1, timestamp=unset_at, by="you"),
+    ]
+
+    stats = projections.key_stats(history)
+
+    assert stats == {
+        "set-once": projections.KeyStats(
+            last_event_type="Set",
+            last_by="me",
+            last_timestamp=set_at,
+            event_count=1,
+        ),
+        "set-and-unset": projections.KeyStats(
+            last_event_type="Unset",
+            last_by="you",
+            last_timestamp=unset_at,
+            event_count=2,
+        ),
+    }
+
+
+def test_diff():
+    history = [
+        factories.Set(key="added", value="42", index=0),
+        factories.Changed(key="changed", new_value="43", index=1),
+        factories.Unset(key="removed", index=1),
+        factories.Set(key="added-and-removed", value="42", index=0),
+        factories.Unset(key="added-and-removed", index=1),
+        factories.Unset(key="removed-and-added", index=1),
+        factories.Set(key="removed-and-added", value="44", index=2),
+    ]
+
+    diff = projections.diff(history)
+
+    assert diff == projections.Diff(
+        added={"added": "42"},
+        changed={"changed": "43", "removed-and-added": "44"},
+        removed=["removed"],
+    )
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import datetime
+import json
+
+import attrs
+import pytest
+
+from toy_settings.domain import events
+from toy_settings.journal_back_end import journal
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+TRANSACTIONS = [
+    journal.Transaction(
+        (
+            events.Set(index=0, timestamp=NOW, key="FOO", value="42", by="me"),
+            events.Changed(index=1, timestamp=NOW, key="FOO", new_value="43", by="me"),
+        ),
+        idempotency_key="abc",
+        fingerprint="fingerprint",
+    ),
+    journal.Transaction((events.Unset(index=2, timestamp=NOW, key="FOO", by="me"),)),
+]
+
+
+@pytest.mark.parametrize("fsync", ["always", "interval", "never"])
+def test_read_appended_transactions(tmp_path, fsync):
+    path = tmp_path / "journal"
+
+    with journal.Journal(path, fsync=fsync) as writer:
+        for transaction in TRANSACTIONS:
+            writer.append(transaction)
+
+    with journal.Journal(path) as reader:
+        assert reader.read() == TRANSACTIONS
+
+
+def test_ignore_transaction_cut_short(tmp_path):
+    path = tmp_path / "journal"
+    with journal.Journal(path) as writer:
+        writer.append(TRANSACTIONS[0])
+    with open(path, "ab") as f:
+        f.write(journal.encode(TRANSACTIONS[1])[:-10])
+
+    with journal.Journal(path) as reader:
+        assert reader.read() == TRANSACTIONS[:1]
+
+
+def test_read_transaction_without_fingerprint():
+    # written before requests were fingerprinted
+    data = json.loads(journal.encode(TRANSACTIONS[0]))
+    del data["fingerprint"]
+
+    assert journal.decode(json.dumps(data).encode()) == attrs.evolve(
+        TRANSACTIONS[0], fingerprint=""
+    )
+
+
+@pytest.mark.parametrize("fsync", ["always", "never"])
+def test_replace(tmp_path, fsync):
+    path = tmp_path / "journal"
+
+    with journal.Journal(path, fsync=fsync) as writer:
+        writer.append(TRANSACTIONS[0])
+        writer.replace(TRANSACTIONS[1:])
+        writer.append(TRANSACTIONS[0])
+
+        assert writer.read() == [TRANSACTIONS[1], TRANSACTIONS[0]]
+
+
+def test_one_process_at_a_time(tmp_path):
+    path = tmp_path / "journal"
+
+    with journal.Journal(path):
+        with pytest.raises(journal.JournalLocked):
+            journal.Journal(path)
+
+    journal.Journal(path).close()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import threading
+from typing import Iterator
+
+import pytest
+from django.utils import timezone
+
+from testing.application.unit_of_work import MemoryCommitter
+from testing.domain import factories
+from toy_settings.application import unit_of_work
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+from toy_settings.journal_back_end import journal
+from toy_settings.journal_back_end.unit_of_work import WriteBehindCommitter
+
+NOW = timezone.now()
+
+
+@pytest.fixture
+def committer(tmp_path) -> Iterator[WriteBehindCommitter]:
+    # long enough that nothing is written in the background during a test
+    committer = WriteBehindCommitter(
+        committer=DjangoCommitter(),
+        journal=journal.Journal(tmp_path / "journal"),
+        max_batch=3,
+        max_delay=60,
+    )
+    yield committer
+    committer.close()
+
+
+def _commit(
+    committer: unit_of_work.Committer,
+    *new_events: events.Event,
+    idempotency_key: str | None = None,
+) -> None:
+    with unit_of_work.commit_on_success(
+        committer, idempotency_key, "fingerprint"
+    ) as pending:
+        pending.extend(new_events)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writes_behind(committer):
+    _commit(
+        committer,
+        factories.Set(key="FOO", value="42", index=0, timestamp=NOW),
+        idempotency_key="abc",
+    )
+    _commit(committer, factories.Set(key="BAR", value="1", index=0, timestamp=NOW))
+
+    # acknowledged, but not written yet
+    assert DjangoRepo().all_settings() == {}
+    state = committer.pending_state(DjangoRepo())
+    assert state.all_settings() == {"FOO": "42", "BAR": "1"}
+    assert state.request_fingerprint("abc") == "fingerprint"
+
+    committer.flush()
+
+    assert DjangoRepo().all_settings() == {"FOO": "42", "BAR": "1"}
+    assert DjangoRepo().request_fingerprint("abc") == "fingerprint"
+    assert committer.pending_state(DjangoRepo()).new_events == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writes_full_batch(committer):
+    for key in ["FOO", "BAR", "BAZ"]:
+        _commit(committer, factories.Set(key=key, value="1", index=0, timestamp=NOW))
+
+    assert DjangoRepo().all_settings() == {"FOO": "1", "BAR": "1", "BAZ": "1"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_conflicts_with_waiting_transactions(committer):
+    _commit(
+        committer,
+        factories.Set(key="FOO", value="42", index=0, timestamp=NOW),
+        idempotency_key="abc",
+    )
+
+    with pytest.raises(unit_of_work.StaleState):
+        _commit(committer, factories.Set(key="FOO", value="43", index=0, timestamp=NOW))
+    with pytest.raises(unit_of_work.StaleState):
+        _commit(
+            committer,
+            factories.Set(key="BAR", value="1", index=0, timestamp=NOW),
+            idempotency_key="abc",
+        )
+
+    committer.flush()
+    assert DjangoRepo().all_settings() == {"FOO": "42"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_drops_transactions_that_conflict_with_the_store(committer):
+    _commit(committer, factories.Set(key="FOO", value="42", index=0, timestamp=NOW))
+    _commit(committer, factories.Set(key="BAR", value="1", index=0, timestamp=NOW))
+    _commit(
+        DjangoCommitter(), factories.Set(key="FOO", value="0", index=0, timestamp=NOW)
+    )
+
+    committer.flush()
+
+    assert DjangoRepo().all_settings() == {"FOO": "0", "BAR": "1"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recovers_from_journal(tmp_path):
+    path = tmp_path / "journal"
+    with journal.Journal(path) as crashed:
+        crashed.append(
+            journal.Transaction(
+                (factories.Set(key="FOO", value="42", index=0, timestamp=NOW),)
+            )
+        )
+        crashed.append(
+            journal.Transaction(
+                (factories.Set(key="BAR", value="1", index=0, timestamp=NOW),),
+                idempotency_key="abc",
+                fingerprint="fingerprint",
+            )
+        )
+    # the first transaction was written before the crash
+    _commit(
+        DjangoCommitter(), factories.Set(key="FOO", value="42", index=0, timestamp=NOW)
+    )
+
+    committer = WriteBehindCommitter(
+        committer=DjangoCommitter(), journal=journal.Journal(path), max_delay=60
+    )
+    assert committer.pending_state(DjangoRepo()).all_settings() == {
+        "FOO": "42",
+        "BAR": "1",
+    }
+    committer.close()
+
+    assert DjangoRepo().all_settings() == {"FOO": "42", "BAR": "1"}
+    assert DjangoRepo().request_fingerprint("abc") == "fingerprint"
+    with journal.Journal(path) as reopened:
+        assert reopened.read() == []
+
+
+class FlakyCommitter(MemoryCommitter):
+    """Fail to write the first time, and signal each successful write."""
+
+    failed: bool = False
+    written: threading.Event
+
+    def handle(self, event: events.Event) -> None:
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError
+        super().handle(event)
+        self.written.set()
+
+
+def test_writes_in_background(tmp_path):
+    memory_committer = FlakyCommitter()
+    memory_committer.written = threading.Event()
+    committer = WriteBehindCommitter(
+        committer=memory_committer,
+        journal=journal.Journal(tmp_path / "journal"),
+        max_delay=0.01,
+    )
+    event = factories.Set(key="FOO", value="42", index=0, timestamp=NOW)
+
+    _commit(committer, event)
+
+    assert memory_committer.written.wait(timeout=5)
+    committer.close()
+    assert memory_committer.committed == [event]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import itertools
+from typing import Callable
+
+import pytest
+from django.db import transaction
+from django.utils import timezone
+from django_webtest import DjangoTestApp
+
+from testing.django_back_end.query_counts import Measurement
+from testing.django_back_end.query_counts import measure
+from toy_settings import config
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end import projection
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+HISTORY_SIZES = (10, 100, 1000)
+
+
+def _grow_history(to: int) -> None:
+    """Record events until there are `to` of them.
+
+    Half the events change FOO, so its history grows. The rest set new settings,
+    so the number of settings grows too.
+    """
+    committer = DjangoCommitter()
+    size = models.Event.objects.count()
+    next_foo_index = models.Event.objects.filter(key="FOO").count()
+    with transaction.atomic():
+        for n in range(size, to):
+            if n % 2:
+                committer.handle(
+                    events.Changed(
+                        index=next_foo_index,
+                        timestamp=timezone.now(),
+                        key="FOO",
+                        new_value=str(n),
+                        by="me",
+                    )
+                )
+                next_foo_index += 1
+            else:
+                committer.handle(
+                    events.Set(
+                        index=0,
+                        timestamp=timezone.now(),
+                        key=f"KEY_{n}",
+                        value=str(n),
+                        by="me",
+                    )
+                )
+
+
+_new_keys = (f"NEW_{n}" for n in itertools.count())
+
+
+def _set(app: DjangoTestApp) -> object:
+    return app.post("/set/", {"key": next(_new_keys), "value": "42"})
+
+
+def _unset(app: DjangoTestApp) -> Callable[[], object]:
+    """Set a new setting, and return a call that unsets it."""
+    key = next(_new_keys)
+    config.get_services().set(key, "42", timestamp=timezone.now(), by="me")
+    projection.current_settings.reset()
+    return lambda: app.post(f"/unset/{key}/")
+
+
+ENDPOINTS: dict[str, Callable[[DjangoTestApp], object]] = {
+    "GET /": lambda app: app.get("/"),
+    "GET /json/": lambda app: app.get("/json/"),
+    "GET /json/?prefix=": lambda app: app.get("/json/", {"prefix": "KEY_1"}),
+    "GET /json/?key=": lambda app: app.get(
+        "/json/", [("key", "FOO"), ("key", "KEY_0")]
+    ),
+    "GET /diff/": lambda app: app.get("/diff/", {"from": "0"}),
+    "GET /history/FOO/": lambda app: app.get("/history/FOO/"),
+    "GET /change/FOO/": lambda app: app.get("/change/FOO/"),
+    "POST /change/FOO/": lambda app: app.post("/change/FOO/", {"value": "42"}),
+    "POST /set/": _set,
+    "services.set": lambda app: config.get_services().set(
+        next(_new_keys), "42", timestamp=timezone.now(), by="me"
+    ),
+    "services.change": lambda app: config.get_services().change(
+        "FOO", "42", timestamp=timezone.now(), by="me"
+    ),
+}
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_query_count_does_not_grow_with_history(
+    endpoint: str, django_app_factory, query_counts: list[Measurement]
+):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    call = ENDPOINTS[endpoint]
+
+    measurements = []
+    for size in HISTORY_SIZES:
+        _grow_history(to=size)
+        # start each measurement as a newly started worker would
+        projection.current_settings.reset()
+        measurements.append(measure(endpoint, size, lambda: call(django_app)))
+    query_counts.extend(measurements)
+
+    assert len({m.queries for m in measurements}) == 1, measurements
+
+
+def test_unset_query_count_does_not_grow_with_history(
+    django_app_factory, query_counts: list[Measurement]
+):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+
+    measurements = []
+    for size in HISTORY_SIZES:
+        _grow_history(to=size)
+        unset = _unset(django_app)
+        measurements.append(measure("POST /unset/<key>/", size, unset))
+    query_counts.extend(measurements)
+
+    assert len({m.queries for m in measurements}) == 1, measurements
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import gzip
+import zlib
+from typing import Callable
+
+import pytest
+
+from toy_settings import responses
+
+DATA = b'{"FOO": "' + b"42" * 100 + b'"}'
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected_coding"),
+    (
+        ("", None),
+        ("br", None),
+        ("gzip, deflate", "gzip"),
+        ("deflate", "deflate"),
+        ("gzip;q=0.5, deflate", "deflate"),
+        ("gzip;q=0, *", "deflate"),
+        ("gzip;q=nonsense", None),
+    ),
+)
+def test_negotiate(accept_encoding, expected_coding):
+    body = responses.EncodedBody.encode(DATA)
+
+    coding, data = body.negotiate(accept_encoding)
+
+    assert coding == expected_coding
+    decompressors: dict[str | None, Callable[[bytes], bytes]] = {
+        None: bytes,
+        "gzip": gzip.decompress,
+        "deflate": zlib.decompress,
+    }
+    assert decompressors[coding](data) == DATA
+
+
+def test_small_bodies_are_not_compressed():
+    body = responses.EncodedBody.encode(b"{}")
+
+    assert body.negotiate("gzip, deflate") == (None, b"{}")
+
+
+def test_body_cache_renders_each_version_once():
+    cache = responses.BodyCache()
+    renders: list[int] = []
+
+    def render() -> bytes:
+        renders.append(len(renders))
+        return DATA
+
+    first = cache.get(1, render)
+    assert cache.get(1, render) is first
+    assert cache.get(2, render) is not first
+    assert renders == [0, 1]
+
+
+def test_chunks(monkeypatch):
+    monkeypatch.setattr(responses, "CHUNK_SIZE", 3)
+
+    assert [bytes(chunk) for chunk in responses.chunks(b"abcdefg")] == [
+        b"abc",
+        b"def",
+        b"g",
+    ]
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+from toy_settings import serialization
+from toy_settings.domain import events
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        events.Set(index=0, timestamp=NOW, key="FOO", value="42", by="me"),
+        events.Changed(index=1, timestamp=NOW, key="FOO", new_value="43", by="me"),
+        events.Unset(index=2, timestamp=NOW, key="FOO", by="me"),
+    ],
+)
+def test_round_trip(event: events.Event):
+    data = serialization.unstructure_event(event)
+
+    assert data["type"] == type(event).__name__
+    assert serialization.structure_event(data) == event
+    # the data can be structured again
+    assert "type" in data
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from testing.domain import factories
+from testing.domain.queries import MemoryRepo
+from toy_settings.domain import projections
+from toy_settings.snapshot_back_end import snapshot
+from toy_settings.snapshot_back_end.queries import SnapshotRepo
+
+
+def _repo(tmp_path) -> tuple[SnapshotRepo, MemoryRepo]:
+    fallback = MemoryRepo(
+        [
+            factories.Set(key="FOO", value="42", index=0),
+            factories.Set(key="FOO_BAR", value="1", index=0),
+        ]
+    )
+    repo = SnapshotRepo(
+        reader=snapshot.SnapshotReader(tmp_path / "snapshot"), fallback=fallback
+    )
+    return repo, fallback
+
+
+def test_reads_current_values_from_snapshot(tmp_path):
+    repo, fallback = _repo(tmp_path)
+    snapshot.publish(tmp_path / "snapshot", lambda: {"FOO": "43", "BAZ": "2"})
+
+    assert repo.current_value("FOO") == "43"
+    assert repo.current_values(["FOO", "BAZ", "QUX"]) == {"FOO": "43", "BAZ": "2"}
+    assert repo.all_settings() == {"FOO": "43", "BAZ": "2"}
+    assert repo.settings_with_prefix("B") == {"BAZ": "2"}
+    assert repo.settings_version() == ("snapshot", 1)
+
+    # operations need the full state of a setting
+    assert repo.get_setting("FOO") == projections.Setting("42", next_index=1)
+    assert repo.events_for_key("FOO") == fallback.events_for_key("FOO")
+    assert repo.diff(0) == fallback.diff(0)
+    assert repo.history_page("FOO", limit=1) == fallback.history_page("FOO", limit=1)
+    assert repo.request_fingerprint("abc") is None
+    assert repo.search("FOO", limit=1) == fallback.search("FOO", limit=1)
+    assert repo.events_by_actor("me", limit=1) == fallback.events_by_actor(
+        "me", limit=1
+    )
+    assert repo.key_stats(["FOO"]) == fallback.key_stats(["FOO"])
+
+
+def test_falls_back_without_snapshot(tmp_path):
+    repo, fallback = _repo(tmp_path)
+
+    assert repo.current_value("FOO") == "42"
+    assert repo.current_values(["FOO", "QUX"]) == {"FOO": "42"}
+    assert repo.all_settings() == {"FOO": "42", "FOO_BAR": "1"}
+    assert repo.settings_with_prefix("FOO_") == {"FOO_BAR": "1"}
+    assert repo.settings_version() == fallback.settings_version()
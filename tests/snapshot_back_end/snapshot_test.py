@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import itertools
+import zlib
+
+import pytest
+
+from toy_settings.snapshot_back_end import snapshot
+
+
+def test_encoded_snapshot_can_be_read(tmp_path):
+    settings = {f"KEY_{n}": f"value {n}" for n in range(100)}
+    settings["UNICODE_ü"] = "☃"
+    path = tmp_path / "snapshot"
+    path.write_bytes(snapshot.encode(settings, generation=3))
+
+    mapped = snapshot.Snapshot.open(path)
+
+    assert mapped.generation == 3
+    assert all(mapped.get(key) == value for key, value in settings.items())
+    assert mapped.get("MISSING") is None
+    assert dict(mapped.items()) == settings
+
+
+def test_colliding_keys(tmp_path):
+    # two keys that hash to the same bucket of a two-entry table
+    bucket = zlib.crc32(b"FOO") % 4
+    other = next(
+        key
+        for key in (f"KEY_{n}" for n in itertools.count())
+        if zlib.crc32(key.encode()) % 4 == bucket
+    )
+    path = tmp_path / "snapshot"
+    path.write_bytes(snapshot.encode({"FOO": "42", other: "43"}, generation=1))
+
+    mapped = snapshot.Snapshot.open(path)
+
+    assert mapped.get("FOO") == "42"
+    assert mapped.get(other) == "43"
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / "snapshot"
+    path.write_bytes(snapshot.encode({}, generation=1))
+
+    mapped = snapshot.Snapshot.open(path)
+
+    assert mapped.get("MISSING") is None
+    assert dict(mapped.items()) == {}
+
+
+@pytest.mark.parametrize(
+    "data",
+    (
+        pytest.param(b"", id="empty"),
+        pytest.param(b"TOYSNAP\0", id="truncated"),
+        pytest.param(b"NOTASNAP" + bytes(24), id="wrong-magic"),
+        pytest.param(
+            snapshot.encode({}, generation=1).replace(b"\x01", b"\x02", 1),
+            id="wrong-version",
+        ),
+    ),
+)
+def test_invalid_snapshot(tmp_path, data):
+    path = tmp_path / "snapshot"
+    path.write_bytes(data)
+
+    with pytest.raises(snapshot.InvalidSnapshot):
+        snapshot.Snapshot.open(path)
+
+
+def test_reader_maps_published_snapshots(tmp_path):
+    path = tmp_path / "shm" / "snapshot"
+    reader = snapshot.SnapshotReader(path)
+    assert reader.snapshot() is None
+
+    snapshot.publish(path, lambda: {"FOO": "42"})
+    first = reader.snapshot()
+    assert first is not None
+    assert first.get("FOO") == "42"
+    assert reader.snapshot() is first
+
+    snapshot.publish(path, lambda: {"FOO": "43"})
+    second = reader.snapshot()
+    assert second is not None
+    assert second.generation == first.generation + 1
+    assert second.get("FOO") == "43"
+
+
+def test_reader_ignores_invalid_snapshot(tmp_path):
+    path = tmp_path / "snapshot"
+    path.write_bytes(b"")
+    reader = snapshot.SnapshotReader(path)
+
+    assert reader.snapshot() is None
+
+    # publishing replaces the invalid snapshot
+    snapshot.publish(path, lambda: {"FOO": "42"})
+    published = reader.snapshot()
+    assert published is not None
+    assert published.generation == 1
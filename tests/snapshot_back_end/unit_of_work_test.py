@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from testing.application.unit_of_work import MemoryCommitter
+from testing.domain import factories
+from testing.domain.queries import MemoryRepo
+from toy_settings.snapshot_back_end import snapshot
+from toy_settings.snapshot_back_end.unit_of_work import PublishingCommitter
+
+
+def test_publishes_snapshot_on_commit(tmp_path):
+    path = tmp_path / "snapshot"
+    memory_committer = MemoryCommitter()
+    committer = PublishingCommitter(
+        committer=memory_committer,
+        state=MemoryRepo(memory_committer.committed),
+        path=path,
+    )
+    event = factories.Set(key="FOO", value="42", index=0)
+
+    with committer.atomic():
+        committer.handle(event)
+        committer.remember("abc", "fingerprint")
+
+    assert memory_committer.committed == [event]
+    assert memory_committer.idempotency_keys == {"abc": "fingerprint"}
+    assert dict(snapshot.Snapshot.open(path).items()) == {"FOO": "42"}
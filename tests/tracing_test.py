@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django_webtest import DjangoTestApp
+
+from toy_settings import config
+from toy_settings import tracing
+
+
+@pytest.fixture
+def spans(tmp_path):
+    """Trace to a file, and return its path."""
+    path = tmp_path / "spans.jsonl"
+    tracer = tracing.FileTracer(path)
+    previous = tracing.set_tracer(tracer)
+    yield path
+    tracing.set_tracer(previous)
+    tracer.close()
+
+
+def _names(spans: list[tracing.FinishedSpan]) -> dict[str, str | None]:
+    """Map each span's name to its parent's name."""
+    by_id = {span.span_id: span for span in spans}
+    return {
+        span.name: by_id[span.parent_id].name if span.parent_id else None
+        for span in spans
+    }
+
+
+def test_spans_do_nothing_by_default():
+    assert isinstance(tracing.get_tracer(), tracing.NoopTracer)
+
+    with tracing.span("outer", key="FOO") as span:
+        span.set_attribute("replayed", True)
+
+
+def test_file_tracer_writes_finished_spans(spans: Path):
+    with tracing.span("outer", key="FOO") as span:
+        with tracing.span("inner"):
+            pass
+        span.set_attribute("replayed", True)
+    with pytest.raises(KeyError):
+        with tracing.span("failed"):
+            raise KeyError
+
+    inner, outer, failed = tracing.read(spans)
+    assert (inner.name, outer.name, failed.name) == ("inner", "outer", "failed")
+    assert inner.parent_id == outer.span_id
+    assert inner.trace_id == outer.trace_id != failed.trace_id
+    assert outer.parent_id is None
+    assert outer.attributes == {"key": "FOO", "replayed": True}
+    assert outer.start <= inner.start
+    assert outer.duration >= inner.duration
+    assert (inner.error, failed.error) == (None, "KeyError")
+
+
+def _other_span() -> None:
+    with tracing.span("other"):
+        pass
+
+
+def test_spans_in_other_threads_start_new_traces(spans: Path):
+    with tracing.span("outer"):
+        thread = threading.Thread(target=_other_span)
+        thread.start()
+        thread.join()
+
+    other, outer = tracing.read(spans)
+    assert other.parent_id is None
+    assert other.trace_id != outer.trace_id
+    assert other.thread != outer.thread
+
+
+@pytest.mark.django_db(transaction=True)
+def test_set_setting_is_traced(django_app: DjangoTestApp, spans: Path):
+    page = django_app.get("/set/")
+    page.form["key"] = "FOO"
+    page.form["value"] = "42"
+    page.form.submit()
+
+    recorded = tracing.read(spans)
+    assert _names(recorded) == {
+        "views.SetSetting": None,
+        "views.validate_form": "views.SetSetting",
+        "services.attempt": "views.SetSetting",
+        "services.set": "services.attempt",
+        "operations.get_setting": "services.set",
+        "django_back_end.get_setting": "operations.get_setting",
+        "unit_of_work.commit": "services.set",
+        "django_back_end.atomic": "unit_of_work.commit",
+        "django_back_end.handle": "django_back_end.atomic",
+    }
+    assert len({span.trace_id for span in recorded}) == 1
+    attributes = {span.name: span.attributes for span in recorded}
+    assert attributes["services.attempt"] == {"attempt": 1}
+    assert attributes["django_back_end.get_setting"] == {
+        "key": "FOO",
+        "replayed": True,
+    }
+    assert attributes["django_back_end.handle"] == {
+        "event_type": "Set",
+        "key": "FOO",
+        "index": 0,
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_invalid_form_is_traced(django_app: DjangoTestApp, spans: Path):
+    page = django_app.get("/set/")
+    page.form["key"] = ""
+    page.form.submit()
+
+    assert _names(tracing.read(spans)) == {
+        "views.SetSetting": None,
+        "views.validate_form": "views.SetSetting",
+    }
+    [validate, _] = tracing.read(spans)
+    assert validate.attributes == {"valid": False}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unset_setting_is_traced(django_app_factory, spans: Path):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    page = django_app.get("/set/")
+    page.form["key"] = "FOO"
+    page.form["value"] = "42"
+    page.form.submit()
+    spans.write_bytes(b"")
+
+    django_app.post("/unset/FOO/")
+
+    names = _names(tracing.read(spans))
+    assert names["services.attempt"] == "views.UnsetSetting"
+    assert names["services.unset"] == "services.attempt"
+    assert names["django_back_end.get_setting"] == "operations.get_setting"
+
+
+@pytest.mark.parametrize(
+    "tracer, tracer_type",
+    [
+        ("none", tracing.NoopTracer),
+        ("file", tracing.FileTracer),
+        ("opentelemetry", tracing.OpenTelemetryTracer),
+    ],
+)
+def test_get_tracer(settings, tmp_path, tracer, tracer_type):
+    settings.SETTINGS_TRACER = tracer
+    settings.SETTINGS_TRACE_PATH = tmp_path / "spans.jsonl"
+
+    assert isinstance(config.get_tracer(), tracer_type)
+
+
+def test_get_unknown_tracer(settings):
+    settings.SETTINGS_TRACER = "jaeger"
+
+    with pytest.raises(ImproperlyConfigured, match="not 'jaeger'"):
+        config.get_tracer()
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import gzip
 import json
 import os
 import unittest.mock
 
 import pytest
+from django.utils import timezone
 from django_webtest import DjangoTestApp
 from django_webtest import DjangoWebtestResponse
 
 from toy_settings import config
+from toy_settings.application import unit_of_work
+from toy_settings.django_back_end import models
+from toy_settings.django_back_end.unit_of_work import DjangoCommitter
+from toy_settings.domain import events
+from toy_settings.journal_back_end.unit_of_work import WriteBehindCommitter
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -36,6 +43,21 @@ def _set_setting(
     return form.submit()
 
 
+def test_settings_show_key_stats(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "42")
+    _change_setting(django_app, "FOO", "43")
+
+    response = django_app.get("/")
+
+    [(key, value, stats, _)] = response.context["settings"]
+    assert (key, value) == ("FOO", "43")
+    assert (stats.last_event_type, stats.last_by, stats.event_count) == (
+        "Changed",
+        "Some User",
+        2,
+    )
+
+
 def test_setting_history(django_app: DjangoTestApp):
     _set_setting(django_app, "FOO", "42")
 
@@ -43,6 +65,142 @@ def test_setting_history(django_app: DjangoTestApp):
     assert response.status_code == 200
 
 
+def test_setting_history_pages(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "0")
+    for value in range(1, 5):
+        _change_setting(django_app, "FOO", str(value))
+
+    response = django_app.get("/history/FOO/", {"limit": 2})
+    assert [e.new_value for e in response.context["events"]] == ["4", "3"]
+
+    response = response.click("Older")
+    assert [e.new_value for e in response.context["events"]] == ["2", "1"]
+
+    response = response.click("Older")
+    assert [e.value for e in response.context["events"]] == ["0"]
+    assert "Older" not in response
+
+
+def test_setting_history_requires_valid_page(django_app: DjangoTestApp):
+    response = django_app.get("/history/FOO/", {"limit": "0"}, expect_errors=True)
+
+    assert response.status_code == 400
+
+
+def test_setting_history_json(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "42")
+    _change_setting(django_app, "FOO", "43")
+
+    response = django_app.get("/history/FOO/json/")
+
+    history = json.loads(b"".join(response.app_iter))
+    assert [
+        (event["event_type"], event.get("value") or event.get("new_value"))
+        for event in history
+    ] == [("Changed", "43"), ("Set", "42")]
+    assert history[0]["position"] > history[1]["position"]
+
+
+def test_actor_events(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "0")
+    _set_setting(django_app, "BAR", "1")
+    _change_setting(django_app, "FOO", "2")
+    since = max(config.get_repository().events_by_actor("Some User", limit=3))[0]
+    _change_setting(django_app, "BAR", "3")
+    _change_setting(django_app, "FOO", "4")
+
+    response = django_app.get("/history/FOO/").click("Some User", index=0)
+    assert [
+        (event_type, event.key) for event_type, event in response.context["events"]
+    ] == [
+        ("Changed", "FOO"),
+        ("Changed", "BAR"),
+        ("Changed", "FOO"),
+        ("Set", "BAR"),
+        ("Set", "FOO"),
+    ]
+
+    response = django_app.get(
+        "/actors/Some User/", {"from": str(since - 1), "limit": 2}
+    )
+    assert [event.key for _, event in response.context["events"]] == ["FOO", "BAR"]
+
+    response = response.click("Older")
+    assert [event.key for _, event in response.context["events"]] == ["FOO"]
+    assert response.context["next_page"] is None
+
+
+def test_actors_with_slashes_are_linked(django_app: DjangoTestApp):
+    config.get_services().set(
+        "FOO", "42", timestamp=timezone.now(), by="ops/deploy-bot"
+    )
+
+    response = django_app.get("/history/FOO/").click("ops/deploy-bot")
+
+    assert response.request.path == "/actors/ops/deploy-bot/"
+    assert [event.key for _, event in response.context["events"]] == ["FOO"]
+
+
+def test_empty_actors_are_not_linked(django_app: DjangoTestApp):
+    config.get_services().set("FOO", "42", timestamp=timezone.now(), by="")
+
+    response = django_app.get("/history/FOO/")
+
+    assert "/actors/" not in response
+
+
+def test_actor_events_requires_valid_bounds(django_app: DjangoTestApp):
+    response = django_app.get(
+        "/actors/Some User/", {"from": "yesterday"}, expect_errors=True
+    )
+
+    assert response.status_code == 400
+
+
+def test_search(django_app_factory):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    _set_setting(django_app, "TIMEOUT", "30")
+    _set_setting(django_app, "RETRIES", "3")
+    _set_setting(django_app, "MESSAGE", "Request timeout")
+    _set_setting(django_app, "BAR", "something")
+
+    page = django_app.get("/")
+    page.forms[0]["q"] = "timeout"
+    response = page.forms[0].submit()
+
+    # matches in keys come first
+    assert response.context["results"] == [
+        ("TIMEOUT", "30"),
+        ("MESSAGE", "Request timeout"),
+    ]
+
+    # the index follows changes
+    _change_setting(django_app, "MESSAGE", "Try again")
+    _unset_setting(django_app, "TIMEOUT")
+    _set_setting(django_app, "CONNECT_TIMEOUT", "5")
+
+    response = django_app.get("/search/", {"q": "timeout"})
+    assert response.context["results"] == [("CONNECT_TIMEOUT", "5")]
+
+
+def test_search_needs_three_characters(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "42")
+
+    response = django_app.get("/search/", {"q": "FO"})
+
+    assert response.context["results"] == []
+    assert "at least three characters" in response
+
+
+def test_search_for_short_key(django_app: DjangoTestApp):
+    _set_setting(django_app, "AB", "something")
+    _change_setting(django_app, "AB", "something else")
+
+    response = django_app.get("/search/", {"q": "something"})
+
+    assert response.context["results"] == [("AB", "something else")]
+
+
 def test_settings_json(django_app: DjangoTestApp):
     _set_setting(django_app, "FOO", "42")
     _set_setting(django_app, "BAR", "something")
@@ -57,6 +215,111 @@ def test_settings_json(django_app: DjangoTestApp):
     }
 
 
+def test_settings_json_is_compressed(django_app: DjangoTestApp, client):
+    # WebTest decompresses responses, so use Django's client to see the raw body.
+    _set_setting(django_app, "FOO", "42" * 100)
+
+    response = client.get("/json/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    body = gzip.decompress(response.getvalue())
+    assert json.loads(body) == {"FOO": "42" * 100}
+
+    _change_setting(django_app, "FOO", "43" * 100)
+    response = client.get("/json/", headers={"Accept-Encoding": "gzip"})
+
+    assert json.loads(gzip.decompress(response.getvalue())) == {"FOO": "43" * 100}
+
+
+def test_settings_json_for_keys(django_app_factory):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    _set_setting(django_app, "FOO", "42")
+    _set_setting(django_app, "BAR", "something")
+    _set_setting(django_app, "BAZ", "something else")
+    _unset_setting(django_app, "BAR")
+
+    response = django_app.get(
+        "/json/", [("key", "FOO"), ("key", "BAR"), ("key", "QUX")]
+    )
+
+    assert json.loads(response.body) == {"FOO": "42"}
+
+
+def test_settings_json_with_prefix(django_app_factory):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    _set_setting(django_app, "PAYMENTS_TIMEOUT", "30")
+    _set_setting(django_app, "PAYMENTS_RETRIES", "3")
+    _set_setting(django_app, "PAYMENTS_URL", "http://example.com")
+    _set_setting(django_app, "PAYROLL_DAY", "Friday")
+    _change_setting(django_app, "PAYMENTS_TIMEOUT", "60")
+    _unset_setting(django_app, "PAYMENTS_RETRIES")
+
+    response = django_app.get("/json/", {"prefix": "PAYMENTS_"})
+
+    assert json.loads(response.body) == {
+        "PAYMENTS_TIMEOUT": "60",
+        "PAYMENTS_URL": "http://example.com",
+    }
+
+    response = django_app.get("/json/", {"prefix": ""})
+
+    assert json.loads(response.body) == {
+        "PAYMENTS_TIMEOUT": "60",
+        "PAYMENTS_URL": "http://example.com",
+        "PAYROLL_DAY": "Friday",
+    }
+
+
+def test_settings_json_from_snapshot(django_app: DjangoTestApp, settings, tmp_path):
+    settings.SETTINGS_SNAPSHOT_PATH = tmp_path / "snapshot"
+
+    _set_setting(django_app, "FOO", "42")
+    _set_setting(django_app, "BAR", "something")
+
+    assert settings.SETTINGS_SNAPSHOT_PATH.exists()
+    response = django_app.get("/json/")
+
+    assert json.loads(response.body) == {"FOO": "42", "BAR": "something"}
+
+
+def test_stale_writes_are_retried(django_app: DjangoTestApp, monkeypatch):
+    handle = DjangoCommitter.handle
+    stale = [True]
+
+    def handle_once_stale(self: DjangoCommitter, event: events.Event) -> None:
+        if stale:
+            stale.pop()
+            raise unit_of_work.StaleState
+        handle(self, event)
+
+    monkeypatch.setattr(DjangoCommitter, "handle", handle_once_stale)
+
+    response = _set_setting(django_app, "FOO", "42").follow()
+
+    assert _get_messages(response) == [("success", "'FOO' set to '42'")]
+    assert config.get_repository().current_value("FOO") == "42"
+
+
+def test_write_behind(django_app: DjangoTestApp, settings, tmp_path):
+    settings.SETTINGS_JOURNAL_PATH = tmp_path / "journal"
+    # long enough that nothing is written in the background during the test
+    settings.SETTINGS_JOURNAL_MAX_DELAY = 60
+    committer = config.get_committer()
+    assert isinstance(committer, WriteBehindCommitter)
+
+    _set_setting(django_app, "FOO", "42").follow()
+    _change_setting(django_app, "FOO", "43").follow()
+
+    # acknowledged, but not yet written to the database
+    assert not models.CurrentSetting.objects.exists()
+    assert json.loads(django_app.get("/json/").body) == {"FOO": "43"}
+
+    committer.close()
+
+    assert models.CurrentSetting.objects.get(key="FOO").value == "43"
+
+
 def test_set_new_setting(django_app: DjangoTestApp):
     response = _set_setting(django_app, "FOO", "42")
 
@@ -73,6 +336,19 @@ def test_set_new_setting(django_app: DjangoTestApp):
     assert repo.all_settings() == {"FOO": "42"}
 
 
+def test_set_setting_resubmitted(django_app: DjangoTestApp):
+    page = django_app.get("/set/")
+    form = page.form
+    form["key"] = "FOO"
+    form["value"] = "42"
+    form.submit().follow()
+
+    response = form.submit().follow()
+
+    assert _get_messages(response) == [("success", "'FOO' set to '42'")]
+    assert len(config.get_repository().events_for_key("FOO")) == 1
+
+
 def test_new_setting_normalizes_key(django_app: DjangoTestApp):
     _set_setting(django_app, "foo-bar value", "42")
 
@@ -126,6 +402,34 @@ def test_change_setting(django_app: DjangoTestApp):
     assert repo.all_settings() == {"FOO": "43"}
 
 
+def test_cannot_change_setting_changed_since_loaded(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "42")
+    page = django_app.get("/change/FOO/")
+    _change_setting(django_app, "FOO", "43").follow()
+
+    form = page.form
+    form["value"] = "44"
+    response = form.submit().follow()
+
+    assert _get_messages(response) == [
+        ("danger", "'FOO' has been changed since you loaded it. Please try again."),
+    ]
+    repo = config.get_repository()
+    assert repo.all_settings() == {"FOO": "43"}
+
+
+def test_change_setting_without_version(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "42")
+    page = django_app.get("/change/FOO/")
+
+    form = page.form
+    form["value"] = "43"
+    form["version"] = ""
+    response = form.submit().follow()
+
+    assert _get_messages(response) == [("success", "'FOO' set to '43'")]
+
+
 def test_cannot_change_non_existent_setting(django_app: DjangoTestApp):
     # change a setting that hasn't been set yet
     response = _change_setting(django_app, "FOO", "43")
@@ -169,6 +473,51 @@ def test_unset_setting(django_app_factory):
     assert repo.all_settings() == {}
 
 
+def test_unset_setting_resubmitted(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "42").follow()
+    page = django_app.get("/")
+    form = page.forms[1]
+    form.submit().follow()
+
+    response = form.submit().follow()
+
+    assert _get_messages(response) == [("success", "'FOO' unset")]
+    assert len(config.get_repository().events_for_key("FOO")) == 2
+
+
+def test_unset_setting_with_idempotency_key_header(django_app_factory):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    _set_setting(django_app, "FOO", "42").follow()
+
+    for _ in range(2):
+        response = django_app.post(
+            "/unset/FOO/", headers={"Idempotency-Key": "abc"}
+        ).follow()
+
+        assert _get_messages(response) == [("success", "'FOO' unset")]
+
+
+def test_idempotency_key_header_reused_for_another_request(django_app_factory):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    _set_setting(django_app, "FOO", "42").follow()
+    _set_setting(django_app, "BAR", "1").follow()
+    django_app.post("/unset/FOO/", headers={"Idempotency-Key": "abc"})
+
+    response = django_app.post(
+        "/unset/BAR/", headers={"Idempotency-Key": "abc"}, status=422
+    )
+
+    assert "'abc' was used for a different request" in response.text
+    assert config.get_repository().current_value("BAR") == "1"
+
+    page = django_app.get("/set/")
+    page.form["key"] = "BAZ"
+    page.form["value"] = "2"
+    page.form["idempotency_key"] = "abc"
+    page.form.submit(status=422)
+    assert config.get_repository().current_value("BAZ") is None
+
+
 def test_cannot_unset_non_existent_setting(django_app_factory):
     django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
 
@@ -186,3 +535,60 @@ def test_cannot_unset_non_existent_setting(django_app_factory):
 
     repo = config.get_repository()
     assert repo.all_settings() == {}
+
+
+def test_settings_diff(django_app_factory):
+    django_app: DjangoTestApp = django_app_factory(csrf_checks=False)
+    _set_setting(django_app, "FOO", "42")
+    _set_setting(django_app, "BAR", "something")
+    since = models.Event.objects.latest("id").id
+
+    _change_setting(django_app, "FOO", "43")
+    _unset_setting(django_app, "BAR")
+    _set_setting(django_app, "BAZ", "something else")
+    until = models.Event.objects.latest("id").id
+    _set_setting(django_app, "QUX", "not yet")
+
+    response = django_app.get("/diff/", {"from": since, "to": until})
+
+    assert json.loads(response.body) == {
+        "added": {"BAZ": "something else"},
+        "changed": {"FOO": "43"},
+        "removed": ["BAR"],
+    }
+
+    response = django_app.get("/diff/", {"from": until})
+
+    assert json.loads(response.body) == {
+        "added": {"QUX": "not yet"},
+        "changed": {},
+        "removed": [],
+    }
+
+
+def test_settings_diff_between_timestamps(django_app: DjangoTestApp):
+    _set_setting(django_app, "FOO", "42")
+    since = timezone.now()
+    _change_setting(django_app, "FOO", "43")
+    until = timezone.now()
+    _set_setting(django_app, "BAR", "something")
+
+    response = django_app.get(
+        "/diff/",
+        {
+            "from": since.replace(tzinfo=None).isoformat(),
+            "to": until.isoformat(),
+        },
+    )
+
+    assert json.loads(response.body) == {
+        "added": {},
+        "changed": {"FOO": "43"},
+        "removed": [],
+    }
+
+
+def test_settings_diff_requires_valid_bounds(django_app: DjangoTestApp):
+    response = django_app.get("/diff/", {"from": "yesterday"}, expect_errors=True)
+
+    assert response.status_code == 400
@@ -2,18 +2,27 @@ from __future__ import annotations
 
 import contextlib
 import datetime
-from typing import Generator
+import hashlib
+import json
+from typing import Callable
+from typing import Iterator
+from typing import Mapping
+from typing import TypeVar
 
 import attrs
 from tenacity import Retrying
 from tenacity import retry_if_exception_type
+from tenacity import stop_after_delay
 from tenacity import wait_random_exponential
 
+from toy_settings import tracing
 from toy_settings.domain import operations
 from toy_settings.domain import queries
 
 from . import unit_of_work
 
+T = TypeVar("T")
+
 
 @attrs.frozen
 class AlreadySet(Exception):
@@ -25,19 +34,75 @@ class NotSet(Exception):
     key: str
 
 
+@attrs.frozen
+class VersionMismatch(Exception):
+    key: str
+    expected_version: int
+
+
+@attrs.frozen
+class IdempotencyKeyReused(Exception):
+    idempotency_key: str
+
+
+def _fingerprint(operation: str, **arguments: object) -> str:
+    """
+    Identify a request by its operation and arguments.
+
+    Leave out the arguments that change each time the same request is made
+    again, such as its timestamp.
+    """
+    request = json.dumps([operation, arguments], sort_keys=True)
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
 @attrs.frozen
 class ToySettings:
     state: queries.Repository
     committer: unit_of_work.Committer
 
-    @contextlib.contextmanager
-    def retry(self, max_wait_seconds: int) -> Generator[None, None, None]:
+    def retry(self, operation: Callable[[], T], *, max_wait_seconds: float) -> T:
+        """
+        Run an operation, and run it again whenever the state it read was stale.
+
+        Attempts are a random, exponentially growing time apart.
+
+        Raises:
+            RetryError: The state was still stale after `max_wait_seconds`.
+        """
         for attempt in Retrying(
             retry=retry_if_exception_type(unit_of_work.StaleState),
             wait=wait_random_exponential(multiplier=0.1, max=max_wait_seconds),
+            stop=stop_after_delay(max_wait_seconds),
         ):
-            with attempt:
-                yield
+            with attempt, tracing.span(
+                "services.attempt", attempt=attempt.retry_state.attempt_number
+            ):
+                result = operation()
+        return result
+
+    def _handled(self, idempotency_key: str | None, fingerprint: str) -> bool:
+        if idempotency_key is None:
+            return False
+        handled = self.state.request_fingerprint(idempotency_key)
+        if handled is None:
+            return False
+        # keys recorded before requests were fingerprinted match any request
+        if handled and handled != fingerprint:
+            raise IdempotencyKeyReused(idempotency_key)
+        return True
+
+    @contextlib.contextmanager
+    def _unit_of_work(
+        self, idempotency_key: str | None, fingerprint: str
+    ) -> Iterator[operations.ToySettings]:
+        with unit_of_work.commit_on_success(
+            self.committer, idempotency_key, fingerprint
+        ) as new_events:
+            yield operations.ToySettings(
+                state=unit_of_work.PendingState(self.state, new_events),
+                new_events=new_events,
+            )
 
     def set(
         self,
@@ -46,19 +111,29 @@ class ToySettings:
         *,
         timestamp: datetime.datetime,
         by: str,
+        idempotency_key: str | None = None,
     ) -> None:
         """
         Create a new setting.
 
+        A request with an `idempotency_key` that has already been committed
+        does nothing, without checking the state of the settings again.
+        Reusing the key for a different request raises `IdempotencyKeyReused`.
+
         Raises:
             AlreadySet: The setting already exists.
+            IdempotencyKeyReused: The key was used for a different request.
         """
-        with unit_of_work.commit_on_success(self.committer) as new_events:
-            domain = operations.ToySettings(state=self.state, new_events=new_events)
-            try:
-                domain.set(key, value, timestamp=timestamp, by=by)
-            except operations.AlreadySet as exc:
-                raise AlreadySet(key) from exc
+        with tracing.span("services.set", key=key):
+            request = _fingerprint("set", key=key, value=value, by=by)
+            if self._handled(idempotency_key, request):
+                return
+
+            with self._unit_of_work(idempotency_key, request) as domain:
+                try:
+                    domain.set(key, value, timestamp=timestamp, by=by)
+                except operations.AlreadySet as exc:
+                    raise AlreadySet(key) from exc
 
     def change(
         self,
@@ -67,19 +142,57 @@ class ToySettings:
         *,
         timestamp: datetime.datetime,
         by: str,
+        expected_version: int | None = None,
+        idempotency_key: str | None = None,
     ) -> None:
         """
         Change the current value of a setting.
 
+        If `expected_version` is given, the setting is only changed if it is
+        still at that version. A mismatch is final: retrying won't help, because
+        the setting has been changed since the caller last read it.
+
+        A request with an `idempotency_key` that has already been committed
+        does nothing, without checking the state of the settings again.
+        Reusing the key for a different request raises `IdempotencyKeyReused`.
+
         Raises:
             NotSet: There is no setting for this key.
+            VersionMismatch: The setting is not at the expected version.
+            IdempotencyKeyReused: The key was used for a different request.
         """
-        with unit_of_work.commit_on_success(self.committer) as new_events:
-            domain = operations.ToySettings(state=self.state, new_events=new_events)
+        with tracing.span("services.change", key=key):
+            request = _fingerprint(
+                "change",
+                key=key,
+                new_value=new_value,
+                by=by,
+                expected_version=expected_version,
+            )
+            if self._handled(idempotency_key, request):
+                return
+
             try:
-                domain.change(key, new_value, timestamp=timestamp, by=by)
-            except operations.NotSet as exc:
-                raise NotSet(key) from exc
+                with self._unit_of_work(idempotency_key, request) as domain:
+                    try:
+                        domain.change(
+                            key,
+                            new_value,
+                            timestamp=timestamp,
+                            by=by,
+                            expected_version=expected_version,
+                        )
+                    except operations.NotSet as exc:
+                        raise NotSet(key) from exc
+                    except operations.VersionMismatch as exc:
+                        raise VersionMismatch(
+                            key, expected_version=exc.expected_version
+                        ) from exc
+            except unit_of_work.StaleState as exc:
+                if expected_version is None:
+                    raise
+                # another change was committed at the version we expected
+                raise VersionMismatch(key, expected_version=expected_version) from exc
 
     def unset(
         self,
@@ -87,16 +200,59 @@ class ToySettings:
         *,
         timestamp: datetime.datetime,
         by: str,
+        idempotency_key: str | None = None,
     ) -> None:
         """
         Unset a setting.
 
+        A request with an `idempotency_key` that has already been committed
+        does nothing, without checking the state of the settings again.
+        Reusing the key for a different request raises `IdempotencyKeyReused`.
+
         Raises:
             NotSet: There is no setting for this key.
+            IdempotencyKeyReused: The key was used for a different request.
         """
-        with unit_of_work.commit_on_success(self.committer) as new_events:
-            domain = operations.ToySettings(state=self.state, new_events=new_events)
-            try:
-                domain.unset(key, timestamp=timestamp, by=by)
-            except operations.NotSet as exc:
-                raise NotSet(key) from exc
+        with tracing.span("services.unset", key=key):
+            request = _fingerprint("unset", key=key, by=by)
+            if self._handled(idempotency_key, request):
+                return
+
+            with self._unit_of_work(idempotency_key, request) as domain:
+                try:
+                    domain.unset(key, timestamp=timestamp, by=by)
+                except operations.NotSet as exc:
+                    raise NotSet(key) from exc
+
+    def change_many(
+        self,
+        new_values: Mapping[str, str],
+        *,
+        timestamp: datetime.datetime,
+        by: str,
+        idempotency_key: str | None = None,
+    ) -> None:
+        """
+        Change the current values of several settings together.
+
+        Either all of the settings are changed, or none are.
+
+        A request with an `idempotency_key` that has already been committed
+        does nothing, without checking the state of the settings again.
+        Reusing the key for a different request raises `IdempotencyKeyReused`.
+
+        Raises:
+            NotSet: There is no setting for one of the keys.
+            IdempotencyKeyReused: The key was used for a different request.
+        """
+        with tracing.span("services.change_many", keys=len(new_values)):
+            request = _fingerprint("change_many", new_values=dict(new_values), by=by)
+            if self._handled(idempotency_key, request):
+                return
+
+            with self._unit_of_work(idempotency_key, request) as domain:
+                for key, new_value in new_values.items():
+                    try:
+                        domain.change(key, new_value, timestamp=timestamp, by=by)
+                    except operations.NotSet as exc:
+                        raise NotSet(key) from exc
@@ -1,19 +1,132 @@
 from __future__ import annotations
 
 import abc
+import datetime
 from contextlib import contextmanager
+from typing import Callable
+from typing import Hashable
+from typing import Iterable
 from typing import Iterator
 
+import attrs
+
+from toy_settings import tracing
 from toy_settings.domain import events
+from toy_settings.domain import projections
+from toy_settings.domain import queries
 
 
 @contextmanager
-def commit_on_success(committer: Committer) -> Iterator[list[events.Event]]:
+def commit_on_success(
+    committer: Committer, idempotency_key: str | None = None, fingerprint: str = ""
+) -> Iterator[list[events.Event]]:
     new_events: list[events.Event] = []
     yield new_events
-    with committer.atomic():
-        for event in new_events:
-            committer.handle(event)
+    with tracing.span("unit_of_work.commit", events=len(new_events)):
+        with committer.atomic():
+            for event in new_events:
+                committer.handle(event)
+            if idempotency_key is not None:
+                committer.remember(idempotency_key, fingerprint)
+
+
+@attrs.define
+class PendingState(queries.Repository):
+    """
+    The state as it will be once the pending events have been committed.
+
+    Each setting is read from the underlying state at most once, so operations
+    that touch the same setting several times in one unit of work don't repeat
+    the query, and see the events they have already added.
+    """
+
+    state: queries.Repository
+    new_events: list[events.Event]
+    _settings: dict[str, projections.Setting] = attrs.field(factory=dict, init=False)
+
+    def _pending(self, include: Callable[[str], bool]) -> Iterator[events.Event]:
+        return (event for event in self.new_events if include(event.key))
+
+    def _with_pending(
+        self, values: dict[str, str], include: Callable[[str], bool]
+    ) -> dict[str, str]:
+        settings = {key: projections.Setting(value) for key, value in values.items()}
+        projections.apply(self._pending(include), settings)
+        return {
+            key: setting.value
+            for key, setting in settings.items()
+            if setting.value is not None
+        }
+
+    def events_for_key(self, key: str) -> list[events.Event]:
+        return self.state.events_for_key(key) + list(self._pending(lambda k: k == key))
+
+    def history_page(
+        self, key: str, *, before: int | None = None, limit: int
+    ) -> list[tuple[int, events.Event]]:
+        # pending events aren't part of the history yet
+        return self.state.history_page(key, before=before, limit=limit)
+
+    def events_by_actor(
+        self,
+        by: str,
+        since: datetime.datetime | int | None = None,
+        until: datetime.datetime | int | None = None,
+        *,
+        before: int | None = None,
+        limit: int,
+    ) -> list[tuple[int, events.Event]]:
+        # pending events aren't part of the history yet
+        return self.state.events_by_actor(by, since, until, before=before, limit=limit)
+
+    def get_setting(self, key: str) -> projections.Setting:
+        if key not in self._settings:
+            self._settings[key] = self.state.get_setting(key)
+
+        setting = attrs.evolve(self._settings[key])
+        projections.apply(self._pending(lambda k: k == key), {key: setting})
+        return setting
+
+    def current_value(self, key: str) -> str | None:
+        return self.get_setting(key).value
+
+    def current_values(self, keys: Iterable[str]) -> dict[str, str]:
+        keys = set(keys)
+        return self._with_pending(self.state.current_values(keys), lambda k: k in keys)
+
+    def all_settings(self) -> dict[str, str]:
+        return self._with_pending(self.state.all_settings(), lambda k: True)
+
+    def settings_version(self) -> Hashable:
+        # The pending events change the settings without changing the underlying
+        # state's version, so a body cached for that version alone would leave
+        # them out. Pending events are only ever added (or written to the state,
+        # which changes its version), so counting them tells the states apart.
+        return (self.state.settings_version(), len(self.new_events))
+
+    def settings_with_prefix(self, prefix: str) -> dict[str, str]:
+        return self._with_pending(
+            self.state.settings_with_prefix(prefix), lambda k: k.startswith(prefix)
+        )
+
+    def key_stats(self, keys: Iterable[str]) -> dict[str, projections.KeyStats]:
+        # pending events aren't part of the history yet
+        return self.state.key_stats(keys)
+
+    def request_fingerprint(self, idempotency_key: str) -> str | None:
+        return self.state.request_fingerprint(idempotency_key)
+
+    def search(self, query: str, *, limit: int) -> list[tuple[str, str]]:
+        # pending events aren't part of the history yet
+        return self.state.search(query, limit=limit)
+
+    def diff(
+        self,
+        since: datetime.datetime | int,
+        until: datetime.datetime | int | None = None,
+    ) -> projections.Diff:
+        # pending events aren't part of the history yet
+        return self.state.diff(since, until)
 
 
 class StaleState(Exception):
@@ -41,3 +154,12 @@ class Committer(abc.ABC):
             StaleState: The state has changed and handling is no longer safe.
         """
         ...
+
+    @abc.abstractmethod
+    def remember(self, idempotency_key: str, fingerprint: str) -> None:
+        """Record that the request with this key and fingerprint has been handled.
+
+        Raises:
+            StaleState: A request with this key has been handled concurrently.
+        """
+        ...
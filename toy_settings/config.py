@@ -1,18 +1,91 @@
 from __future__ import annotations
 
+import functools
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from . import tracing
 from .application.services import ToySettings
 from .application.unit_of_work import Committer
 from .django_back_end.queries import DjangoRepo
 from .django_back_end.unit_of_work import DjangoCommitter
 from .domain.queries import Repository
+from .journal_back_end.journal import Journal
+from .journal_back_end.unit_of_work import WriteBehindCommitter
+from .snapshot_back_end.queries import SnapshotRepo
+from .snapshot_back_end.snapshot import SnapshotReader
+from .snapshot_back_end.unit_of_work import PublishingCommitter
+
+
+@functools.cache
+def _snapshot_reader(path: Path) -> SnapshotReader:
+    return SnapshotReader(path)
+
+
+@functools.cache
+def _write_behind_committer(path: Path) -> WriteBehindCommitter:
+    return WriteBehindCommitter(
+        committer=_store_committer(),
+        journal=Journal(
+            path,
+            fsync=settings.SETTINGS_JOURNAL_FSYNC,
+            fsync_interval=settings.SETTINGS_JOURNAL_FSYNC_INTERVAL,
+        ),
+        max_batch=settings.SETTINGS_JOURNAL_MAX_BATCH,
+        max_delay=settings.SETTINGS_JOURNAL_MAX_DELAY,
+    )
+
+
+def _store_repository() -> Repository:
+    if settings.SETTINGS_SNAPSHOT_PATH is None:
+        return DjangoRepo()
+
+    return SnapshotRepo(
+        reader=_snapshot_reader(settings.SETTINGS_SNAPSHOT_PATH),
+        fallback=DjangoRepo(),
+    )
+
+
+def _store_committer() -> Committer:
+    if settings.SETTINGS_SNAPSHOT_PATH is None:
+        return DjangoCommitter()
+
+    return PublishingCommitter(
+        committer=DjangoCommitter(),
+        state=DjangoRepo(),
+        path=settings.SETTINGS_SNAPSHOT_PATH,
+    )
 
 
 def get_repository() -> Repository:
-    return DjangoRepo()
+    if settings.SETTINGS_JOURNAL_PATH is None:
+        return _store_repository()
+
+    return _write_behind_committer(settings.SETTINGS_JOURNAL_PATH).pending_state(
+        _store_repository()
+    )
 
 
 def get_committer() -> Committer:
-    return DjangoCommitter()
+    if settings.SETTINGS_JOURNAL_PATH is None:
+        return _store_committer()
+
+    return _write_behind_committer(settings.SETTINGS_JOURNAL_PATH)
+
+
+def get_tracer() -> tracing.Tracer:
+    if settings.SETTINGS_TRACER == "none":
+        return tracing.NoopTracer()
+    if settings.SETTINGS_TRACER == "file":
+        return tracing.FileTracer(settings.SETTINGS_TRACE_PATH)
+    if settings.SETTINGS_TRACER == "opentelemetry":
+        return tracing.OpenTelemetryTracer()
+    raise ImproperlyConfigured(
+        f"SETTINGS_TRACER must be 'none', 'file' or 'opentelemetry', "
+        f"not {settings.SETTINGS_TRACER!r}"
+    )
 
 
 def get_services() -> ToySettings:
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
+
+
+class DjangoBackEndConfig(AppConfig):
+    name = "toy_settings.django_back_end"
+
+    def ready(self) -> None:
+        from toy_settings import config
+        from toy_settings import tracing
+
+        from . import checkpoints
+        from . import projection
+
+        tracing.set_tracer(config.get_tracer())
+
+        # Start from the last checkpoint so that only the events recorded since
+        # it was taken need to be replayed. We don't touch the database here:
+        # the tail is applied on the first read.
+        projection.current_settings.reset(
+            checkpoints.load(settings.SETTINGS_CHECKPOINT_PATH)
+        )
+        post_migrate.connect(_forget_projected_settings, sender=self)
+        post_migrate.connect(_rebuild_search_index, sender=self)
+
+
+def _forget_projected_settings(**kwargs: Any) -> None:
+    # Migrating (or flushing) the database may have changed the history out from
+    # under the projection, so rebuild it from scratch on the next read.
+    from . import projection
+
+    projection.current_settings.reset()
+
+
+def _rebuild_search_index(using: str, **kwargs: Any) -> None:
+    # Flushing the database doesn't empty the search index, which Django doesn't
+    # know about, so bring it back in line with the current settings.
+    from . import search
+
+    search.rebuild(using)
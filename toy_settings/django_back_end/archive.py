@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import Exists
+from django.db.models import OuterRef
+
+from . import models
+
+BATCH_SIZE = 1000
+
+
+def archive_superseded_events(up_to: int, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Move superseded events at or before a position into the archive.
+
+    An event is superseded if there is a later event for the same key. The latest
+    event for each key is never archived: it is enough on its own to project the
+    current state of the setting, and its sequence entry keeps the next index
+    monotonic.
+
+    Returns the number of events archived.
+    """
+    superseded = (
+        models.Event.objects.filter(id__lte=up_to)
+        .filter(
+            Exists(
+                models.Event.objects.filter(key=OuterRef("key"), id__gt=OuterRef("id"))
+            )
+        )
+        .order_by("id")
+    )
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(superseded[:batch_size])
+            if not batch:
+                return archived
+
+            models.ArchivedEvent.objects.bulk_create(
+                models.ArchivedEvent(
+                    position=evt.id,
+                    event_type=evt.event_type,
+                    event_type_version=evt.event_type_version,
+                    key=evt.key,
+                    by=evt.by,
+                    timestamp=evt.timestamp,
+                    payload=evt.payload,
+                    value_id=evt.value_id,
+                )
+                for evt in batch
+            )
+            ids = [evt.id for evt in batch]
+            models.Sequence.objects.filter(event_id__in=ids).delete()
+            models.Event.objects.filter(id__in=ids).delete()
+
+        archived += len(batch)
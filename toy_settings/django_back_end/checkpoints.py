@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import datetime
+import os
+import tempfile
+from pathlib import Path
+
+import attrs
+import cattrs.preconf.json
+
+from toy_settings.domain import projections
+
+_converter = cattrs.preconf.json.make_converter()
+
+
+@attrs.frozen
+class LastEvent:
+    """
+    The event at a checkpoint's position, to recognise the history it belongs to.
+    """
+
+    key: str
+    timestamp: datetime.datetime
+
+
+@attrs.frozen
+class Checkpoint:
+    """
+    The projected settings as of an event position.
+    """
+
+    position: int
+    settings: dict[str, projections.Setting]
+    # None for an empty history, or a checkpoint written before it was recorded
+    last_event: LastEvent | None = None
+
+
+def save(checkpoint: Checkpoint, path: Path) -> None:
+    """Write a checkpoint to a file, replacing any previous checkpoint atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, prefix=f".{path.name}.", delete=False
+    ) as f:
+        f.write(_converter.dumps(checkpoint))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f.name, path)
+
+
+def load(path: Path) -> Checkpoint | None:
+    """Read a checkpoint from a file, if there is one."""
+    try:
+        data = path.read_text()
+    except FileNotFoundError:
+        return None
+
+    return _converter.loads(data, Checkpoint)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from toy_settings.django_back_end import archive
+from toy_settings.django_back_end import checkpoints
+
+
+class Command(BaseCommand):
+    help = "Move events superseded before the last checkpoint into the archive."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        # Only archive events that a durable checkpoint has already accounted for.
+        checkpoint = checkpoints.load(settings.SETTINGS_CHECKPOINT_PATH)
+        if checkpoint is None:
+            self.stdout.write("No checkpoint to archive up to")
+            return
+
+        archived = archive.archive_superseded_events(up_to=checkpoint.position)
+        self.stdout.write(
+            f"Archived {archived} events up to position {checkpoint.position}"
+        )
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import datetime
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from toy_settings.django_back_end import unit_of_work
+
+
+class Command(BaseCommand):
+    help = "Delete the idempotency keys older than SETTINGS_IDEMPOTENCY_KEY_TTL."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        recorded_before = timezone.now() - datetime.timedelta(
+            seconds=settings.SETTINGS_IDEMPOTENCY_KEY_TTL
+        )
+        purged = unit_of_work.purge_idempotency_keys(recorded_before)
+
+        self.stdout.write(
+            f"Purged {purged} idempotency keys recorded before "
+            f"{recorded_before.isoformat()}"
+        )
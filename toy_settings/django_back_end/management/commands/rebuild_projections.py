@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import datetime
+import multiprocessing
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.core.management.base import CommandParser
+from django.db import connections
+
+from toy_settings.django_back_end import checkpoints
+from toy_settings.django_back_end import projection
+from toy_settings.django_back_end import rebuild
+from toy_settings.django_back_end.queries import DjangoRepo
+from toy_settings.snapshot_back_end import snapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuild the read models from the event log, resuming if interrupted."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--partitions",
+            type=int,
+            default=1,
+            help="Split the keys into partitions, each rebuilt by its own process.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=rebuild.BATCH_SIZE,
+            help="Events to apply in each transaction.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start again, rather than resuming an interrupted rebuild.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        partitions = [] if options["restart"] else rebuild.in_progress()
+        if partitions:
+            self.stdout.write(f"Resuming rebuild in {len(partitions)} partitions")
+        else:
+            partitions = rebuild.start(options["partitions"])
+
+        if len(partitions) == 1:
+            self._rebuild(partitions[0], options["batch_size"])
+        else:
+            self._rebuild_in_processes(partitions, options["batch_size"])
+
+        rebuild.finish()
+        self._replace_copies()
+        self.stdout.write("Rebuilt read models")
+
+    def _replace_copies(self) -> None:
+        # The checkpoint and the snapshot were projected the old way, so replay
+        # the settings from the event log and replace them.
+        projection.current_settings.reset()
+        checkpoint = projection.current_settings.checkpoint()
+
+        # only replace a checkpoint that is in use
+        if settings.SETTINGS_CHECKPOINT_PATH.exists():
+            checkpoints.save(checkpoint, settings.SETTINGS_CHECKPOINT_PATH)
+            self.stdout.write(
+                f"Rewrote checkpoint at position {checkpoint.position} "
+                f"to {settings.SETTINGS_CHECKPOINT_PATH}"
+            )
+
+        if settings.SETTINGS_SNAPSHOT_PATH is not None:
+            snapshot.publish(settings.SETTINGS_SNAPSHOT_PATH, DjangoRepo().all_settings)
+            self.stdout.write(
+                f"Republished snapshot to {settings.SETTINGS_SNAPSHOT_PATH}"
+            )
+
+    def _rebuild(self, partition: rebuild.Partition, batch_size: int) -> None:
+        rebuild.rebuild(partition, batch_size, self._report)
+
+    def _rebuild_in_processes(
+        self, partitions: list[rebuild.Partition], batch_size: int
+    ) -> None:
+        # Each process opens its own connection.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=self._rebuild, args=(partition, batch_size))
+            for partition in partitions
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        failed = [
+            partition.index
+            for partition, process in zip(partitions, processes)
+            if process.exitcode
+        ]
+        if failed:
+            raise CommandError(
+                f"Partitions {failed} failed: run the command again to resume"
+            )
+
+    def _report(self, progress: rebuild.Progress) -> None:
+        eta = progress.eta_seconds
+        self.stdout.write(
+            f"partition {progress.partition.index + 1}/{progress.partition.count}:"
+            f" {progress.applied}/{progress.total} events,"
+            f" {progress.events_per_second:.0f} events/s,"
+            f" ETA {datetime.timedelta(seconds=round(eta)) if eta is not None else '?'}"
+        )
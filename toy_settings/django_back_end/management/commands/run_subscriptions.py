@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandParser
+
+from toy_settings.django_back_end import subscriptions
+
+
+class Command(BaseCommand):
+    help = "Keep subscriptions up to date with the event log."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Catch up once and exit, rather than polling for new events.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls once caught up.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=subscriptions.BATCH_SIZE,
+            help="Events to apply in each transaction.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        registered = subscriptions.registered()
+        if options["once"]:
+            self._catch_up(registered, options["batch_size"])
+            return
+
+        while True:  # pragma: no cover
+            if not self._catch_up(registered, options["batch_size"]):
+                time.sleep(options["poll_interval"])
+
+    def _catch_up(
+        self, registered: list[subscriptions.Subscription], batch_size: int
+    ) -> int:
+        applied = 0
+        for subscription in registered:
+            count = subscriptions.catch_up(subscription, batch_size)
+            if count:
+                self.stdout.write(f"{subscription.name}: applied {count} events")
+            applied += count
+        return applied
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from toy_settings.django_back_end import checkpoints
+from toy_settings.django_back_end import projection
+
+
+class Command(BaseCommand):
+    help = "Write a checkpoint of the current settings to load at startup."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        checkpoint = projection.current_settings.checkpoint()
+        checkpoints.save(checkpoint, settings.SETTINGS_CHECKPOINT_PATH)
+
+        self.stdout.write(
+            f"Wrote checkpoint at position {checkpoint.position} "
+            f"to {settings.SETTINGS_CHECKPOINT_PATH}"
+        )
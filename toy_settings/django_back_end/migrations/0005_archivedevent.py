@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:48
+
+from __future__ import annotations
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0004_alter_event_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedEvent",
+            fields=[
+                ("event_type", models.CharField(max_length=100)),
+                ("event_type_version", models.IntegerField()),
+                ("key", models.CharField(db_index=True, max_length=100)),
+                ("timestamp", models.DateTimeField()),
+                ("payload", models.CharField(max_length=500)),
+                ("position", models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from django.db import migrations
+from django.db import models
+
+
+def populate_current_settings(apps: Any, schema_editor: Any) -> None:
+    Event = apps.get_model("django_back_end", "Event")
+    CurrentSetting = apps.get_model("django_back_end", "CurrentSetting")
+
+    # The latest event for each key determines its current value.
+    latest: dict[str, Any] = {}
+    for event in Event.objects.order_by("id").iterator():
+        latest[event.key] = event
+
+    for key, event in latest.items():
+        payload = json.loads(event.payload)
+        if event.event_type == "Set":
+            CurrentSetting.objects.create(key=key, value=payload["value"])
+        elif event.event_type == "Changed":
+            CurrentSetting.objects.create(key=key, value=payload["new_value"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0005_archivedevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CurrentSetting",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("value", models.TextField()),
+            ],
+        ),
+        migrations.RunPython(
+            populate_current_settings, reverse_code=migrations.RunPython.noop
+        ),
+    ]
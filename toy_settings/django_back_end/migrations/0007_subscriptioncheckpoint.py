@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:55
+
+from __future__ import annotations
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0006_currentsetting"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubscriptionCheckpoint",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("position", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
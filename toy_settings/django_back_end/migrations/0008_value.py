@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:56
+
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0007_subscriptioncheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Value",
+            fields=[
+                (
+                    "hash",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("data", models.BinaryField()),
+                ("compressed", models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="archivedevent",
+            name="value",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="django_back_end.value",
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="value",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="django_back_end.value",
+            ),
+        ),
+    ]
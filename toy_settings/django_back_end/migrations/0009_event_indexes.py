@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:59
+
+from __future__ import annotations
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0008_value"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="archivedevent",
+            name="key",
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="key",
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="archivedevent",
+            index=models.Index(
+                fields=["key", "position"], name="django_back_key_6c1217_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedevent",
+            index=models.Index(
+                fields=["timestamp"], name="django_back_timesta_3a6ede_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["key", "timestamp"], name="django_back_key_6d244e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["timestamp"], name="django_back_timesta_835a21_idx"
+            ),
+        ),
+    ]
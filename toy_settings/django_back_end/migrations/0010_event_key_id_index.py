@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:04
+
+from __future__ import annotations
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0009_event_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="event",
+            name="django_back_key_6d244e_idx",
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["key", "id"], name="django_back_key_7012a7_idx"),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:12
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.db import migrations
+from django.db import models
+from django.db.models import Max
+
+
+def populate_next_index(apps: Any, schema_editor: Any) -> None:
+    Sequence = apps.get_model("django_back_end", "Sequence")
+    CurrentSetting = apps.get_model("django_back_end", "CurrentSetting")
+
+    last_indexes = dict(
+        Sequence.objects.values("key")
+        .annotate(last_index=Max("index"))
+        .values_list("key", "last_index")
+    )
+    for current in CurrentSetting.objects.iterator():
+        current.next_index = last_indexes[current.key] + 1
+        current.save(update_fields=["next_index"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0010_event_key_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="currentsetting",
+            name="next_index",
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            populate_next_index, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:24
+
+from __future__ import annotations
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0011_currentsetting_next_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("recorded_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:27
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from django.db import migrations
+from django.db import models
+
+
+def populate_key_stats(apps: Any, schema_editor: Any) -> None:
+    Event = apps.get_model("django_back_end", "Event")
+    KeyStats = apps.get_model("django_back_end", "KeyStats")
+
+    # The latest event for each key is never archived.
+    latest: dict[str, Any] = {}
+    for event in Event.objects.order_by("id").iterator():
+        latest[event.key] = event
+
+    KeyStats.objects.bulk_create(
+        KeyStats(
+            key=key,
+            last_event_type=event.event_type,
+            last_by=payload["by"],
+            last_timestamp=event.timestamp,
+            event_count=payload["index"] + 1,
+        )
+        for key, event in latest.items()
+        for payload in [json.loads(event.payload)]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0012_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KeyStats",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("last_event_type", models.CharField(max_length=100)),
+                ("last_by", models.TextField()),
+                ("last_timestamp", models.DateTimeField()),
+                ("event_count", models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.RunPython(
+            populate_key_stats, reverse_code=migrations.RunPython.noop
+        ),
+    ]
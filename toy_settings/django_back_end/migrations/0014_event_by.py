@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:33
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from django.db import migrations
+from django.db import models
+
+BATCH_SIZE = 1000
+
+
+def populate_by(apps: Any, schema_editor: Any) -> None:
+    for model_name in ["Event", "ArchivedEvent"]:
+        model = apps.get_model("django_back_end", model_name)
+        batch = []
+        for event in model.objects.only("payload").iterator(chunk_size=BATCH_SIZE):
+            event.by = json.loads(event.payload)["by"]
+            batch.append(event)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, ["by"])
+                batch = []
+        model.objects.bulk_update(batch, ["by"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0013_keystats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedevent",
+            name="by",
+            field=models.CharField(default="", max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="by",
+            field=models.CharField(default="", max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_by, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="archivedevent",
+            index=models.Index(
+                fields=["by", "position"], name="django_back_by_2db476_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["by", "id"], name="django_back_by_7510dd_idx"),
+        ),
+    ]
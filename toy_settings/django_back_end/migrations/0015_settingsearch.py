@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:52
+
+from __future__ import annotations
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0014_event_by"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE django_back_end_settingsearch"
+                " USING fts5(key, value, tokenize='trigram')",
+                # rank matches in keys ten times higher than matches in values
+                "INSERT INTO django_back_end_settingsearch"
+                " (django_back_end_settingsearch, rank)"
+                " VALUES ('rank', 'bm25(10.0, 1.0)')",
+                "INSERT INTO django_back_end_settingsearch (key, value)"
+                " SELECT key, value FROM django_back_end_currentsetting",
+            ],
+            reverse_sql=["DROP TABLE django_back_end_settingsearch"],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:05
+
+from __future__ import annotations
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_back_end", "0015_settingsearch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="fingerprint",
+            field=models.CharField(default="", max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="idempotencykey",
+            name="recorded_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -6,26 +6,136 @@ from django.db import models
 from toy_settings.domain import events
 
 EVENT_TYPES: dict[type[events.Event], tuple[str, int]] = {
-    events.Set: ("Set", 1),
-    events.Changed: ("Changed", 1),
+    events.Set: ("Set", 2),
+    events.Changed: ("Changed", 2),
     events.Unset: ("Unset", 1),
 }
 
+# Versions of event types that are no longer recorded, but can still be read.
+# Unlike version 2, version 1 payloads include the value of the setting.
+PREVIOUS_EVENT_TYPES: dict[tuple[str, int], type[events.Event]] = {
+    ("Set", 1): events.Set,
+    ("Changed", 1): events.Changed,
+}
+
+# The field of each event type whose value is stored out of line in a `Value`.
+VALUE_FIELDS: dict[type[events.Event], str] = {
+    events.Set: "value",
+    events.Changed: "new_value",
+}
+
 
 def event_type(event_type: str, version: int) -> type[events.Event]:
-    return {v: k for k, v in EVENT_TYPES.items()}[(event_type, version)]
+    try:
+        return PREVIOUS_EVENT_TYPES[(event_type, version)]
+    except KeyError:
+        return {v: k for k, v in EVENT_TYPES.items()}[(event_type, version)]
+
 
+class Value(models.Model):
+    """
+    A setting value, stored once however many events refer to it.
+    """
 
-class Event(models.Model):
+    hash = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    compressed = models.BooleanField(default=False)
+
+
+class StoredEvent(models.Model):
     event_type = models.CharField(max_length=100)
     event_type_version = models.IntegerField()
 
-    key = models.CharField(max_length=100, db_index=True)
+    key = models.CharField(max_length=100)
+    # also in the payload, but copied out so that events can be found by actor
+    by = models.CharField(max_length=100)
 
     timestamp = models.DateTimeField()
     payload = models.CharField(max_length=500)
     payload_converter = cattrs.preconf.json.make_converter()
 
+    value = models.ForeignKey(
+        Value, null=True, on_delete=models.PROTECT, related_name="+"
+    )
+
+    class Meta:
+        abstract = True
+
+
+class Event(StoredEvent):
+    class Meta:
+        indexes = [
+            models.Index(fields=["key", "id"]),
+            models.Index(fields=["by", "id"]),
+            models.Index(fields=["timestamp"]),
+        ]
+
+
+class ArchivedEvent(StoredEvent):
+    """
+    An event that has been superseded by a later event for the same key.
+
+    Archived events keep the position they had in the event log.
+    """
+
+    position = models.BigIntegerField(primary_key=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["key", "position"]),
+            models.Index(fields=["by", "position"]),
+            models.Index(fields=["timestamp"]),
+        ]
+
+
+class CurrentSetting(models.Model):
+    """
+    The current state of each setting, kept up to date as events are recorded.
+
+    Settings that are not set have no row.
+    """
+
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.TextField()
+    next_index = models.PositiveIntegerField()
+
+
+class KeyStats(models.Model):
+    """
+    A summary of the events for each key, kept up to date as events are recorded.
+    """
+
+    key = models.CharField(max_length=100, primary_key=True)
+    last_event_type = models.CharField(max_length=100)
+    last_by = models.TextField()
+    last_timestamp = models.DateTimeField()
+    event_count = models.PositiveIntegerField()
+
+
+class SubscriptionCheckpoint(models.Model):
+    """
+    The position of the last event a subscription has handled.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)
+    position = models.BigIntegerField(default=0)
+
+
+class IdempotencyKey(models.Model):
+    """
+    The idempotency key of each request that has been committed.
+
+    Keys are recorded in the same transaction as the request's events, with a
+    fingerprint of the request, so that reusing a key for a different request
+    can be told apart from repeating the request. Keys are kept until they are
+    purged, once they are older than SETTINGS_IDEMPOTENCY_KEY_TTL.
+    """
+
+    key = models.CharField(max_length=255, primary_key=True)
+    # empty for keys recorded before requests were fingerprinted
+    fingerprint = models.CharField(max_length=64)
+    recorded_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
 
 class Sequence(models.Model):
     event = models.ForeignKey(Event, on_delete=models.PROTECT)
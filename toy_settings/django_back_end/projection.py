@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+
+import attrs
+
+from toy_settings.domain import projections
+
+from . import checkpoints
+from . import models
+from . import storage
+
+
+@attrs.define
+class CurrentSettings:
+    """
+    The current settings, kept up to date by catching up on new events.
+
+    Events are applied in position order. SQLite serializes writers, so an event
+    can never be committed with a lower position than one we have already seen.
+    """
+
+    position: int = 0
+    settings: dict[str, projections.Setting] = attrs.field(factory=dict)
+    last_event: checkpoints.LastEvent | None = None
+    _verified: bool = attrs.field(default=True, init=False)
+    _lock: threading.Lock = attrs.field(factory=threading.Lock, init=False)
+
+    def reset(self, checkpoint: checkpoints.Checkpoint | None = None) -> None:
+        """
+        Start again from a checkpoint, or from the beginning of history.
+
+        The checkpoint is checked against the event log on the next read, and
+        discarded if it doesn't belong to it.
+        """
+        with self._lock:
+            if checkpoint is None:
+                self._start_over()
+            else:
+                self.position = checkpoint.position
+                self.settings = dict(checkpoint.settings)
+                self.last_event = checkpoint.last_event
+                self._verified = False
+
+    def _start_over(self) -> None:
+        self.position, self.settings, self.last_event = 0, {}, None
+        self._verified = True
+
+    def _verify(self) -> None:
+        # A checkpoint left behind by an earlier database, such as one that was
+        # deleted and migrated again, has a position that the new events may
+        # never pass, so they would never be applied.
+        if self.position and self.last_event != _event_at(self.position):
+            self._start_over()
+        self._verified = True
+
+    def _catch_up(self) -> None:
+        if not self._verified:
+            self._verify()
+
+        new_events = list(
+            models.Event.objects.filter(id__gt=self.position).order_by("id")
+        )
+        if new_events:
+            projections.apply(storage.to_domain(new_events), self.settings)
+            last = new_events[-1]
+            self.position = last.id
+            self.last_event = checkpoints.LastEvent(last.key, last.timestamp)
+
+    def values(self) -> dict[str, str]:
+        """Catch up and get the current value of all settings."""
+        with self._lock:
+            self._catch_up()
+            return {
+                key: setting.value
+                for key, setting in self.settings.items()
+                if setting.value is not None
+            }
+
+    def checkpoint(self) -> checkpoints.Checkpoint:
+        """Catch up and take a checkpoint of the settings."""
+        with self._lock:
+            self._catch_up()
+            return checkpoints.Checkpoint(
+                position=self.position,
+                settings={
+                    key: attrs.evolve(setting) for key, setting in self.settings.items()
+                },
+                last_event=self.last_event,
+            )
+
+
+def _event_at(position: int) -> checkpoints.LastEvent | None:
+    """Get the event at a position in the event log, or in the archive."""
+    fields = ("key", "timestamp")
+    found = (
+        models.Event.objects.filter(pk=position)
+        .values_list(*fields)
+        .union(models.ArchivedEvent.objects.filter(pk=position).values_list(*fields))
+    )
+    for key, timestamp in found:
+        return checkpoints.LastEvent(key, timestamp)
+    return None
+
+
+current_settings = CurrentSettings()
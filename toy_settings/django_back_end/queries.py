@@ -1,38 +1,208 @@
 from __future__ import annotations
 
+import datetime
+import heapq
+import itertools
+from typing import Hashable
+from typing import Iterable
+
+from django.db.models import Max
 from django.db.models import Q
 
+from toy_settings import tracing
 from toy_settings.domain import events
 from toy_settings.domain import projections
 from toy_settings.domain import queries
 
 from . import models
+from . import projection
+from . import search
+from . import storage
+
+
+def _after(bound: datetime.datetime | int) -> Q:
+    if isinstance(bound, int):
+        return Q(pk__gt=bound)
+    return Q(timestamp__gt=bound)
+
+
+def _up_to(bound: datetime.datetime | int) -> Q:
+    if isinstance(bound, int):
+        return Q(pk__lte=bound)
+    return Q(timestamp__lte=bound)
 
 
 class DjangoRepo(queries.Repository):
     def _events(self, filter: Q = Q()) -> list[events.Event]:
-        return [
-            models.Event.payload_converter.loads(
-                evt.payload, models.event_type(evt.event_type, evt.event_type_version)
-            )
-            for evt in models.Event.objects.filter(filter).order_by("timestamp")
-        ]
+        return storage.to_domain(models.Event.objects.filter(filter).order_by("pk"))
+
+    def _archived_events(self, filter: Q = Q()) -> list[events.Event]:
+        return storage.to_domain(
+            models.ArchivedEvent.objects.filter(filter).order_by("pk")
+        )
 
     def events_for_key(self, key: str) -> list[events.Event]:
         """Retrieve the events for this key in chronological order."""
-        return self._events(Q(key=key))
+        history = self._events(Q(key=key))
+        if history and history[0].index > 0:
+            # the earlier events have been archived
+            history = self._archived_events(Q(key=key)) + history
+        return history
+
+    def history_page(
+        self, key: str, *, before: int | None = None, limit: int
+    ) -> list[tuple[int, events.Event]]:
+        """Retrieve a page of the events for this key, newest first.
+
+        The archive is only read if the page goes back past the oldest event
+        still in the event log.
+        """
+        filter = Q(key=key)
+        if before is not None:
+            filter &= Q(pk__lt=before)
+
+        page = storage.with_positions(
+            models.Event.objects.filter(filter).order_by("-pk")[:limit]
+        )
+        if len(page) < limit and not (page and page[-1][1].index == 0):
+            if page:
+                filter &= Q(pk__lt=page[-1][0])
+            page += storage.with_positions(
+                models.ArchivedEvent.objects.filter(filter).order_by("-pk")[
+                    : limit - len(page)
+                ]
+            )
+        return page
+
+    def events_by_actor(
+        self,
+        by: str,
+        since: datetime.datetime | int | None = None,
+        until: datetime.datetime | int | None = None,
+        *,
+        before: int | None = None,
+        limit: int,
+    ) -> list[tuple[int, events.Event]]:
+        """Retrieve a page of the events recorded by someone, newest first.
+
+        Unlike the history of a key, an actor's archived events can be newer than
+        their events still in the event log, so a page is merged from both.
+        """
+        filter = Q(by=by)
+        if since is not None:
+            filter &= _after(since)
+        if until is not None:
+            filter &= _up_to(until)
+        if before is not None:
+            filter &= Q(pk__lt=before)
+
+        recent = models.Event.objects.filter(filter).order_by("-pk")[:limit]
+        archived = models.ArchivedEvent.objects.filter(filter).order_by("-pk")[:limit]
+        rows = heapq.merge(recent, archived, key=lambda row: row.pk, reverse=True)
+        return storage.with_positions(itertools.islice(rows, limit))
 
     def get_setting(self, key: str) -> projections.Setting:
-        return projections.current_settings(self.events_for_key(key))[key]
+        with tracing.span("django_back_end.get_setting", key=key) as span:
+            current = models.CurrentSetting.objects.filter(key=key).first()
+            if current is not None:
+                span.set_attribute("replayed", False)
+                return projections.Setting(current.value, next_index=current.next_index)
+
+            # Settings that aren't set need replaying to find their next index.
+            # Archived events are always superseded, so we can ignore them here.
+            span.set_attribute("replayed", True)
+            return projections.current_settings(self._events(Q(key=key)))[key]
 
     def current_value(self, key: str) -> str | None:
         """Get the current value of a setting."""
         return self.get_setting(key).value
 
+    def current_values(self, keys: Iterable[str]) -> dict[str, str]:
+        """Get the current value of some settings.
+
+        Settings that are not set are left out.
+        """
+        return dict(
+            models.CurrentSetting.objects.filter(
+                key__in=storage.json_each(keys)
+            ).values_list("key", "value")
+        )
+
     def all_settings(self) -> dict[str, str]:
         """Get the current value of all settings."""
+        return projection.current_settings.values()
+
+    def settings_version(self) -> Hashable:
+        """Get the position of the latest event.
+
+        Only superseded events are archived, so the latest event is always
+        still in the event log.
+        """
+        return models.Event.objects.aggregate(position=Max("pk"))["position"] or 0
+
+    def settings_with_prefix(self, prefix: str) -> dict[str, str]:
+        """Get the current value of all settings whose keys start with `prefix`.
+
+        This is a range scan over the primary key index of the current settings,
+        so it only reads the settings in the namespace.
+        """
+        namespace = Q(key__gte=prefix)
+        if prefix:
+            # the smallest string greater than every string starting with prefix
+            namespace &= Q(key__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        return dict(
+            models.CurrentSetting.objects.filter(namespace).values_list("key", "value")
+        )
+
+    def key_stats(self, keys: Iterable[str]) -> dict[str, projections.KeyStats]:
         return {
-            key: setting.value
-            for key, setting in projections.current_settings(self._events()).items()
-            if setting.value is not None
+            stats.key: projections.KeyStats(
+                last_event_type=stats.last_event_type,
+                last_by=stats.last_by,
+                last_timestamp=stats.last_timestamp,
+                event_count=stats.event_count,
+            )
+            for stats in models.KeyStats.objects.filter(key__in=storage.json_each(keys))
         }
+
+    def request_fingerprint(self, idempotency_key: str) -> str | None:
+        return (
+            models.IdempotencyKey.objects.filter(key=idempotency_key)
+            .values_list("fingerprint", flat=True)
+            .first()
+        )
+
+    def search(self, query: str, *, limit: int) -> list[tuple[str, str]]:
+        if len(query) < search.MIN_QUERY_LENGTH:
+            return []
+        return search.search(query, limit)
+
+    def diff(
+        self,
+        since: datetime.datetime | int,
+        until: datetime.datetime | int | None = None,
+    ) -> projections.Diff:
+        """Get the settings that changed after `since`, up to and including `until`.
+
+        This reads only the events in the range, in the order they were recorded.
+        """
+        filter = _after(since)
+        if until is not None:
+            filter &= _up_to(until)
+
+        archived = models.ArchivedEvent.objects.filter(filter)
+        recent = models.Event.objects.filter(filter)
+        rows: Iterable[models.StoredEvent]
+        if isinstance(since, int):
+            rows = heapq.merge(
+                archived.order_by("pk"),
+                recent.order_by("pk"),
+                key=lambda evt: evt.pk,
+            )
+        else:
+            # Timestamps come from the callers, so they can be out of order. The
+            # timestamp index finds the events in the range, and they are put
+            # back in the order they were recorded here, rather than sorted in a
+            # temporary B-tree by the query.
+            rows = sorted(itertools.chain(archived, recent), key=lambda evt: evt.pk)
+        return projections.diff(storage.to_domain(rows))
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from functools import singledispatch
+from typing import Sequence
+
+from toy_settings.domain import events
+from toy_settings.domain import projections
+
+from . import models
+from . import search
+
+
+def update(event: events.Event) -> None:
+    """Update the read models with a newly recorded event."""
+    _update_current_setting(event)
+    _update_key_stats(event)
+
+
+def update_many(batch: Sequence[events.Event]) -> None:
+    """
+    Update the read models with a batch of events, in the order they were recorded.
+
+    Each setting is written once, in its state after the whole batch.
+    """
+    settings: dict[str, projections.Setting] = {}
+    projections.apply(batch, settings)
+
+    models.CurrentSetting.objects.bulk_create(
+        [
+            models.CurrentSetting(
+                key=key, value=setting.value, next_index=setting.next_index
+            )
+            for key, setting in settings.items()
+            if setting.value is not None
+        ],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["value", "next_index"],
+    )
+    models.CurrentSetting.objects.filter(
+        key__in=[key for key, setting in settings.items() if setting.value is None]
+    ).delete()
+    _save_key_stats(projections.key_stats(batch))
+
+    for key, setting in settings.items():
+        if setting.value is None:
+            search.remove(key)
+        else:
+            search.index(key, setting.value)
+
+
+def _update_key_stats(event: events.Event) -> None:
+    _save_key_stats({event.key: projections.stats_after(event)})
+
+
+def _save_key_stats(stats: dict[str, projections.KeyStats]) -> None:
+    models.KeyStats.objects.bulk_create(
+        [
+            models.KeyStats(
+                key=key,
+                last_event_type=key_stats.last_event_type,
+                last_by=key_stats.last_by,
+                last_timestamp=key_stats.last_timestamp,
+                event_count=key_stats.event_count,
+            )
+            for key, key_stats in stats.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=[
+            "last_event_type",
+            "last_by",
+            "last_timestamp",
+            "event_count",
+        ],
+    )
+
+
+@singledispatch
+def _update_current_setting(event: events.Event) -> None:
+    raise TypeError(f"unrecognised event type: {type(event)!r}")  # pragma: no cover
+
+
+@_update_current_setting.register
+def _(event: events.Set) -> None:
+    models.CurrentSetting.objects.create(
+        key=event.key, value=event.value, next_index=event.index + 1
+    )
+    search.index(event.key, event.value)
+
+
+@_update_current_setting.register
+def _(event: events.Changed) -> None:
+    models.CurrentSetting.objects.filter(key=event.key).update(
+        value=event.new_value, next_index=event.index + 1
+    )
+    search.index(event.key, event.new_value)
+
+
+@_update_current_setting.register
+def _(event: events.Unset) -> None:
+    models.CurrentSetting.objects.filter(key=event.key).delete()
+    search.remove(event.key)
@@ -0,0 +1,148 @@
+"""
+Rebuild the read models from the event log, after the way they are projected
+has changed.
+
+The log is read in position order, a batch at a time, and each batch is applied
+in the same transaction that advances the rebuild's checkpoint, so an
+interrupted rebuild carries on from where it got to. The keys can be split into
+partitions that are rebuilt side by side: each partition reads the whole log,
+but only writes its own keys.
+
+Writes should be stopped while rebuilding, as they update the same read models.
+"""
+
+from __future__ import annotations
+
+import time
+import zlib
+from typing import Callable
+
+import attrs
+from django.db import transaction
+
+from . import models
+from . import read_models
+from . import search
+from . import subscriptions
+
+BATCH_SIZE = 1000
+
+# Progress is kept alongside the subscriptions' checkpoints.
+CHECKPOINT_PREFIX = "rebuild/"
+
+
+@attrs.frozen
+class Partition:
+    """One of `count` partitions of the keys, split by the CRC-32 of each key."""
+
+    index: int
+    count: int
+
+    @property
+    def checkpoint_name(self) -> str:
+        return f"{CHECKPOINT_PREFIX}{self.index}/{self.count}"
+
+    def __contains__(self, key: str) -> bool:
+        return zlib.crc32(key.encode()) % self.count == self.index
+
+
+@attrs.frozen
+class Progress:
+    partition: Partition
+    applied: int
+    total: int
+    seconds: float
+
+    @property
+    def events_per_second(self) -> float:
+        return self.applied / self.seconds if self.seconds else 0.0
+
+    @property
+    def eta_seconds(self) -> float | None:
+        """Seconds until the rebuild finishes, at the rate so far."""
+        if not self.applied:
+            return None
+        return (self.total - self.applied) / self.events_per_second
+
+
+def in_progress() -> list[Partition]:
+    """Get the partitions of an interrupted rebuild, if there is one."""
+    names = models.SubscriptionCheckpoint.objects.filter(
+        name__startswith=CHECKPOINT_PREFIX
+    ).values_list("name", flat=True)
+    partitions = []
+    for name in names:
+        index, count = name.removeprefix(CHECKPOINT_PREFIX).split("/")
+        partitions.append(Partition(int(index), int(count)))
+    return sorted(partitions, key=lambda partition: partition.index)
+
+
+def start(count: int) -> list[Partition]:
+    """Empty the read models, and start a rebuild split into `count` partitions."""
+    partitions = [Partition(index, count) for index in range(count)]
+    with transaction.atomic():
+        models.CurrentSetting.objects.all().delete()
+        models.KeyStats.objects.all().delete()
+        search.rebuild()
+        models.SubscriptionCheckpoint.objects.filter(
+            name__startswith=CHECKPOINT_PREFIX
+        ).delete()
+        models.SubscriptionCheckpoint.objects.bulk_create(
+            models.SubscriptionCheckpoint(name=partition.checkpoint_name)
+            for partition in partitions
+        )
+    return partitions
+
+
+def finish() -> None:
+    """Forget the progress of a rebuild whose partitions have all caught up."""
+    models.SubscriptionCheckpoint.objects.filter(
+        name__startswith=CHECKPOINT_PREFIX
+    ).delete()
+
+
+def _remaining(position: int) -> int:
+    return (
+        models.Event.objects.filter(pk__gt=position).count()
+        + models.ArchivedEvent.objects.filter(pk__gt=position).count()
+    )
+
+
+def rebuild(
+    partition: Partition,
+    batch_size: int = BATCH_SIZE,
+    report: Callable[[Progress], None] = lambda progress: None,
+) -> int:
+    """
+    Apply the events after a partition's checkpoint to its keys' read models.
+
+    `report` is called after each batch. Returns the number of events read.
+    """
+    checkpoint = models.SubscriptionCheckpoint.objects.get(
+        name=partition.checkpoint_name
+    )
+    total = _remaining(checkpoint.position)
+    started = time.monotonic()
+    applied = 0
+    # Only this partition moves its checkpoint, so each batch can be read before
+    # the transaction that applies it. The transaction then starts by writing,
+    # so on SQLite partitions wait for each other's writes, rather than failing
+    # to upgrade a read lock.
+    while batch := subscriptions.events_after(checkpoint.position, batch_size):
+        with transaction.atomic():
+            read_models.update_many(
+                [event for _, event in batch if event.key in partition]
+            )
+            checkpoint.position, _ = batch[-1]
+            checkpoint.save()
+
+        applied += len(batch)
+        report(
+            Progress(
+                partition,
+                applied=applied,
+                total=max(total, applied),
+                seconds=time.monotonic() - started,
+            )
+        )
+    return applied
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connection
+from django.db import connections
+
+# An FTS5 table of the current settings. The trigram tokenizer matches any
+# fragment of at least three characters, ignoring case. The table ranks matches
+# in keys above matches in values (see the migration that creates it).
+TABLE = "django_back_end_settingsearch"
+
+MIN_QUERY_LENGTH = 3
+
+
+def _phrase(text: str) -> str:
+    # Quote the text as a phrase, so that it isn't parsed as FTS5 syntax.
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _delete(cursor: Any, key: str) -> None:
+    if len(key) < MIN_QUERY_LENGTH:
+        # too short to look up by trigram, so scan for it
+        cursor.execute(f"DELETE FROM {TABLE} WHERE key = %s", [key])
+    else:
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE {TABLE} MATCH %s AND key = %s",
+            [f"key : {_phrase(key)}", key],
+        )
+
+
+def index(key: str, value: str) -> None:
+    """Add a setting to the index, or replace its value."""
+    with connection.cursor() as cursor:
+        _delete(cursor, key)
+        cursor.execute(
+            f"INSERT INTO {TABLE} (key, value) VALUES (%s, %s)", [key, value]
+        )
+
+
+def remove(key: str) -> None:
+    """Remove a setting from the index."""
+    with connection.cursor() as cursor:
+        _delete(cursor, key)
+
+
+def rebuild(using: str = DEFAULT_DB_ALIAS) -> None:
+    """Rebuild the index from the current settings."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(
+            f"INSERT INTO {TABLE} (key, value)"
+            " SELECT key, value FROM django_back_end_currentsetting"
+        )
+
+
+def search(query: str, limit: int) -> list[tuple[str, str]]:
+    """
+    Find the settings whose key or value contains the query, best matches first.
+
+    Queries shorter than `MIN_QUERY_LENGTH` match nothing.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT key, value FROM {TABLE} WHERE {TABLE} MATCH %s"
+            " ORDER BY rank LIMIT %s",
+            [_phrase(query), limit],
+        )
+        return cursor.fetchall()
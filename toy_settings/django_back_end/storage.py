@@ -0,0 +1,121 @@
+"""
+Convert between domain events and the rows that store them.
+
+The values of settings are stored out of line, addressed by the SHA-256 of their
+content, so a value shared by many events is only stored once. Large values are
+compressed. Reading events fetches the values they refer to afterwards, in one
+query per batch of distinct values, rather than joining them onto every row.
+
+Values are resolved when the rows are decoded, not lazily when an event's value
+is first used: events are frozen attrs classes holding plain strings, so a lazy
+value would need a proxy type in the domain. Instead, reads that return a page
+of events (`history_page`, `events_by_actor`) cut the rows down to the page
+before decoding them, so only the values of the returned events are fetched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from typing import Iterable
+
+from django.db.models.expressions import RawSQL
+
+from toy_settings.domain import events
+
+from . import models
+
+# Values at least this many bytes long are compressed, if that makes them smaller.
+COMPRESSION_THRESHOLD = 256
+
+
+def encode_value(value: str) -> models.Value:
+    """Make an (unsaved) row for a value, compressing it if that's worthwhile."""
+    data = value.encode()
+    value_hash = hashlib.sha256(data).hexdigest()
+
+    compressed = False
+    if len(data) >= COMPRESSION_THRESHOLD:
+        compressed_data = zlib.compress(data)
+        if len(compressed_data) < len(data):
+            data, compressed = compressed_data, True
+
+    return models.Value(hash=value_hash, data=data, compressed=compressed)
+
+
+def store_value(value: str) -> str:
+    """Store a value, if it isn't already stored, and return its hash."""
+    row = encode_value(value)
+    models.Value.objects.bulk_create([row], ignore_conflicts=True)
+    return row.hash
+
+
+def json_each(values: Iterable[str]) -> RawSQL:
+    """
+    Select these values, to filter a column with `__in`.
+
+    The values are passed as a single JSON array, so that any number of them
+    can be looked up in one query without hitting SQLite's limit on parameters.
+    """
+    return RawSQL("SELECT value FROM json_each(%s)", [json.dumps(list(values))])
+
+
+def load_values(hashes: Iterable[str]) -> dict[str, str]:
+    """Fetch the stored values with these hashes."""
+    unique_hashes = sorted(set(hashes))
+    if not unique_hashes:
+        return {}
+
+    stored = models.Value.objects.filter(hash__in=json_each(unique_hashes))
+    return {value.hash: _decode(value) for value in stored}
+
+
+def _decode(value: models.Value) -> str:
+    data = bytes(value.data)
+    if value.compressed:
+        data = zlib.decompress(data)
+    return data.decode()
+
+
+def to_row(event: events.Event) -> models.Event:
+    """Make an (unsaved) row for a new event, storing its value out of line."""
+    event_type, event_type_version = models.EVENT_TYPES[type(event)]
+    data = models.Event.payload_converter.unstructure(event)
+
+    value_hash = None
+    if value_field := models.VALUE_FIELDS.get(type(event)):
+        value_hash = store_value(data.pop(value_field))
+
+    return models.Event(
+        event_type=event_type,
+        event_type_version=event_type_version,
+        key=event.key,
+        by=event.by,
+        timestamp=event.timestamp,
+        payload=json.dumps(data),
+        value_id=value_hash,
+    )
+
+
+def to_domain(rows: Iterable[models.StoredEvent]) -> list[events.Event]:
+    """Decode stored events, fetching the values they refer to."""
+    rows = list(rows)
+    values = load_values(row.value_id for row in rows if row.value_id is not None)
+
+    decoded = []
+    for row in rows:
+        event_type = models.event_type(row.event_type, row.event_type_version)
+        data = json.loads(row.payload)
+        if row.value_id is not None:
+            data[models.VALUE_FIELDS[event_type]] = values[row.value_id]
+        decoded.append(models.StoredEvent.payload_converter.structure(data, event_type))
+    return decoded
+
+
+def with_positions(
+    rows: Iterable[models.StoredEvent],
+) -> list[tuple[int, events.Event]]:
+    """Decode stored events, along with their positions."""
+    rows = list(rows)
+    return list(zip((row.pk for row in rows), to_domain(rows)))
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import abc
+import heapq
+import itertools
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from toy_settings.domain import events
+
+from . import models
+from . import storage
+
+BATCH_SIZE = 500
+
+
+class Subscription(abc.ABC):
+    """
+    A read model that catches up on the event log in the background.
+
+    Subscriptions are listed by import path in the SETTINGS_SUBSCRIPTIONS setting.
+    Each one handles every event in position order, starting from its stored
+    checkpoint, so adding one doesn't slow down recording events.
+    """
+
+    name: str
+
+    @abc.abstractmethod
+    def handle(self, batch: list[tuple[int, events.Event]]) -> None:
+        """Apply a batch of events and their positions, in position order.
+
+        This is called in the same transaction that advances the checkpoint, so a
+        batch is either applied and checkpointed, or neither.
+        """
+        ...
+
+
+def registered() -> list[Subscription]:
+    """Get the subscriptions listed in the settings."""
+    return [import_string(path)() for path in settings.SETTINGS_SUBSCRIPTIONS]
+
+
+def events_after(position: int, limit: int) -> list[tuple[int, events.Event]]:
+    """Get the events after a position, including any that have been archived."""
+    archived = models.ArchivedEvent.objects.filter(pk__gt=position).order_by("pk")
+    recent = models.Event.objects.filter(pk__gt=position).order_by("pk")
+    return storage.with_positions(
+        itertools.islice(
+            heapq.merge(archived[:limit], recent[:limit], key=lambda evt: evt.pk),
+            limit,
+        )
+    )
+
+
+def catch_up(subscription: Subscription, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Apply the events recorded since a subscription's checkpoint.
+
+    Returns the number of events applied.
+    """
+    applied = 0
+    while True:
+        with transaction.atomic():
+            (
+                checkpoint,
+                _,
+            ) = models.SubscriptionCheckpoint.objects.select_for_update().get_or_create(
+                name=subscription.name
+            )
+            batch = events_after(checkpoint.position, batch_size)
+            if not batch:
+                return applied
+
+            subscription.handle(batch)
+            checkpoint.position, _ = batch[-1]
+            checkpoint.save()
+
+        applied += len(batch)
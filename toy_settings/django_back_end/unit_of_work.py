@@ -1,37 +1,66 @@
 from __future__ import annotations
 
+import datetime
 from contextlib import contextmanager
 from typing import Iterator
 
 from django.db import IntegrityError
 from django.db import transaction
 
+from toy_settings import tracing
 from toy_settings.application import unit_of_work
 from toy_settings.domain import events
 
 from . import models
+from . import read_models
+from . import storage
 
 
 class DjangoCommitter(unit_of_work.Committer):
     @contextmanager
     def atomic(self) -> Iterator[None]:
-        with transaction.atomic():
+        # the span ends once the transaction has committed
+        with tracing.span("django_back_end.atomic"), transaction.atomic():
             yield
 
     def handle(self, event: events.Event) -> None:
-        event_type, event_type_version = models.EVENT_TYPES[type(event)]
-        new_event = models.Event.objects.create(
-            event_type=event_type,
-            event_type_version=event_type_version,
-            timestamp=event.timestamp,
+        with tracing.span(
+            "django_back_end.handle",
+            event_type=type(event).__name__,
             key=event.key,
-            payload=models.Event.payload_converter.dumps(event),
-        )
+            index=event.index,
+        ):
+            new_event = storage.to_row(event)
+            new_event.save()
+            try:
+                models.Sequence.objects.create(
+                    event=new_event,
+                    key=event.key,
+                    index=event.index,
+                )
+            except IntegrityError as exc:
+                raise unit_of_work.StaleState from exc
+
+            read_models.update(event)
+
+    def remember(self, idempotency_key: str, fingerprint: str) -> None:
         try:
-            models.Sequence.objects.create(
-                event=new_event,
-                key=event.key,
-                index=event.index,
+            models.IdempotencyKey.objects.create(
+                key=idempotency_key, fingerprint=fingerprint
             )
         except IntegrityError as exc:
             raise unit_of_work.StaleState from exc
+
+
+def purge_idempotency_keys(recorded_before: datetime.datetime) -> int:
+    """
+    Forget the idempotency keys recorded before a time.
+
+    Repeating one of their requests applies it again.
+
+    Returns the number of keys purged.
+    """
+    purged, _ = models.IdempotencyKey.objects.filter(
+        recorded_at__lt=recorded_before
+    ).delete()
+    return purged
@@ -13,21 +13,19 @@ class Event(abc.ABC):
 
     key: str
 
+    by: str
+
 
 @attrs.frozen
 class Set(Event):
     value: str
 
-    by: str
-
 
 @attrs.frozen
 class Changed(Event):
     new_value: str
 
-    by: str
-
 
 @attrs.frozen
 class Unset(Event):
-    by: str
+    pass
@@ -4,7 +4,10 @@ import datetime
 
 import attrs
 
+from toy_settings import tracing
+
 from . import events
+from . import projections
 from . import queries
 
 
@@ -18,11 +21,22 @@ class NotSet(Exception):
     key: str
 
 
+@attrs.frozen
+class VersionMismatch(Exception):
+    key: str
+    expected_version: int
+    version: int
+
+
 @attrs.frozen
 class ToySettings:
     state: queries.Repository
     new_events: list[events.Event]
 
+    def _get_setting(self, key: str) -> projections.Setting:
+        with tracing.span("operations.get_setting", key=key):
+            return self.state.get_setting(key)
+
     def set(
         self,
         key: str,
@@ -37,7 +51,7 @@ class ToySettings:
         Raises:
             AlreadySet: The setting already exists.
         """
-        setting = self.state.get_setting(key)
+        setting = self._get_setting(key)
         if setting.value is not None:
             raise AlreadySet(key)
 
@@ -58,16 +72,24 @@ class ToySettings:
         *,
         timestamp: datetime.datetime,
         by: str,
+        expected_version: int | None = None,
     ) -> None:
         """
         Change the current value of a setting.
 
+        A setting's version is the number of events recorded for it. If
+        `expected_version` is given, the setting is only changed if it is still
+        at that version.
+
         Raises:
             NotSet: There is no setting for this key.
+            VersionMismatch: The setting is not at the expected version.
         """
-        setting = self.state.get_setting(key)
+        setting = self._get_setting(key)
         if setting.value is None:
             raise NotSet(key)
+        if expected_version is not None and expected_version != setting.next_index:
+            raise VersionMismatch(key, expected_version, setting.next_index)
 
         self.new_events.append(
             events.Changed(
@@ -92,7 +114,7 @@ class ToySettings:
         Raises:
             NotSet: There is no setting for this key.
         """
-        setting = self.state.get_setting(key)
+        setting = self._get_setting(key)
         if setting.value is None:
             raise NotSet(key)
 
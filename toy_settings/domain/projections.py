@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import datetime
 from collections import defaultdict
 from functools import singledispatch
 from typing import Iterable
@@ -17,12 +18,89 @@ class Setting:
 
 def current_settings(history: Iterable[events.Event]) -> defaultdict[str, Setting]:
     settings: defaultdict[str, Setting] = defaultdict(lambda: Setting())
-    for event in sorted(history, key=lambda e: e.timestamp):
-        _handle_event(event, settings)
+    apply(sorted(history, key=lambda e: e.timestamp), settings)
 
     return settings
 
 
+def apply(history: Iterable[events.Event], settings: dict[str, Setting]) -> None:
+    """
+    Bring some settings up to date with more history.
+
+    The events must be in the order they were recorded.
+    """
+    for event in history:
+        if event.key not in settings:
+            settings[event.key] = Setting()
+        _handle_event(event, settings)
+
+
+@attrs.frozen
+class Diff:
+    added: dict[str, str]
+    changed: dict[str, str]
+    removed: list[str]
+
+
+def diff(history: Iterable[events.Event]) -> Diff:
+    """
+    Summarise how the settings changed over a slice of history.
+
+    The events must be in the order they were recorded. Each key is folded into
+    its first and last states: the first event tells us whether the setting
+    existed before the slice (only a `Set` can follow an absent setting) and the
+    last event gives its value afterwards.
+    """
+    existed_before: dict[str, bool] = {}
+    after: defaultdict[str, Setting] = defaultdict(lambda: Setting())
+    for event in history:
+        existed_before.setdefault(event.key, not isinstance(event, events.Set))
+        _handle_event(event, after)
+
+    added: dict[str, str] = {}
+    changed: dict[str, str] = {}
+    removed: list[str] = []
+    for key, existed in existed_before.items():
+        value = after[key].value
+        if value is None:
+            if existed:
+                removed.append(key)
+        elif existed:
+            changed[key] = value
+        else:
+            added[key] = value
+
+    return Diff(added=added, changed=changed, removed=sorted(removed))
+
+
+@attrs.frozen
+class KeyStats:
+    last_event_type: str
+    last_by: str
+    last_timestamp: datetime.datetime
+    event_count: int
+
+
+def stats_after(event: events.Event) -> KeyStats:
+    """Summarise the events for a key, up to and including this one."""
+    return KeyStats(
+        last_event_type=type(event).__name__,
+        last_by=event.by,
+        last_timestamp=event.timestamp,
+        # each event's index counts the events before it
+        event_count=event.index + 1,
+    )
+
+
+def key_stats(history: Iterable[events.Event]) -> dict[str, KeyStats]:
+    """
+    Summarise the events for each key.
+
+    The events must be in the order they were recorded.
+    """
+    return {event.key: stats_after(event) for event in history}
+
+
 @singledispatch
 def _handle_event(event: events.Event, settings: dict[str, Setting]) -> None:
     raise TypeError(f"unrecognised event type: {type(event)!r}")  # pragma: no cover
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import abc
+import datetime
+from typing import Hashable
+from typing import Iterable
 
 from . import events
 from . import projections
@@ -18,6 +21,35 @@ class Repository(abc.ABC):
         """Retrieve the events for this key in chronological order."""
         ...
 
+    @abc.abstractmethod
+    def history_page(
+        self, key: str, *, before: int | None = None, limit: int
+    ) -> list[tuple[int, events.Event]]:
+        """Retrieve a page of the events for this key, newest first.
+
+        Each event comes with its position. Only events before the position
+        `before` (if given) are included, so pass the position of the last event
+        on a page to get the next page.
+        """
+        ...
+
+    @abc.abstractmethod
+    def events_by_actor(
+        self,
+        by: str,
+        since: datetime.datetime | int | None = None,
+        until: datetime.datetime | int | None = None,
+        *,
+        before: int | None = None,
+        limit: int,
+    ) -> list[tuple[int, events.Event]]:
+        """Retrieve a page of the events recorded by someone, newest first.
+
+        Bounds are as for `diff`, and are both optional. Pages work as they do
+        for `history_page`.
+        """
+        ...
+
     @abc.abstractmethod
     def get_setting(self, key: str) -> projections.Setting:
         """Get the current state of a setting."""
@@ -28,7 +60,67 @@ class Repository(abc.ABC):
         """Get the current value of a setting."""
         ...
 
+    @abc.abstractmethod
+    def current_values(self, keys: Iterable[str]) -> dict[str, str]:
+        """Get the current value of some settings.
+
+        Settings that are not set are left out.
+        """
+        ...
+
     @abc.abstractmethod
     def all_settings(self) -> dict[str, str]:
         """Get the current value of all settings."""
         ...
+
+    @abc.abstractmethod
+    def settings_version(self) -> Hashable:
+        """Identify the current state of all settings.
+
+        This changes whenever any setting does, so anything derived from
+        `all_settings` can be cached against it.
+        """
+        ...
+
+    @abc.abstractmethod
+    def settings_with_prefix(self, prefix: str) -> dict[str, str]:
+        """Get the current value of all settings whose keys start with `prefix`."""
+        ...
+
+    @abc.abstractmethod
+    def key_stats(self, keys: Iterable[str]) -> dict[str, projections.KeyStats]:
+        """Summarise the events for some keys.
+
+        Keys that have no events are left out.
+        """
+        ...
+
+    @abc.abstractmethod
+    def request_fingerprint(self, idempotency_key: str) -> str | None:
+        """Get the fingerprint of the request committed with this idempotency key.
+
+        Returns None if no request with this key has been committed.
+        """
+        ...
+
+    @abc.abstractmethod
+    def search(self, query: str, *, limit: int) -> list[tuple[str, str]]:
+        """Find the current settings whose key or value contains the query.
+
+        The key and value of each match are returned, best matches first. Queries
+        shorter than three characters match nothing.
+        """
+        ...
+
+    @abc.abstractmethod
+    def diff(
+        self,
+        since: datetime.datetime | int,
+        until: datetime.datetime | int | None = None,
+    ) -> projections.Diff:
+        """Get the settings that changed after `since`, up to and including `until`.
+
+        Each bound is either a timestamp or an event position. If `until` is
+        omitted, the diff runs to the end of the history.
+        """
+        ...
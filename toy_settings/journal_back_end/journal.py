@@ -0,0 +1,146 @@
+"""
+A local journal of transactions that have been acknowledged but not yet written
+to the backing store.
+
+Each transaction is a line of JSON. A transaction is only acknowledged once its
+line has been written (and, depending on the fsync policy, synced), so after a
+crash the journal holds every acknowledged transaction that may not have reached
+the store. A line cut short by a crash was never acknowledged, and is ignored.
+
+Only one process can have a journal open at a time.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import IO
+from typing import Any
+from typing import Iterable
+from typing import Literal
+
+import attrs
+
+from toy_settings import serialization
+from toy_settings.domain.events import Event
+
+# When to sync appended transactions to disk:
+#   always:   before acknowledging each transaction
+#   interval: at most once every `fsync_interval` seconds, so a crash can lose
+#             the transactions acknowledged since the last sync
+#   never:    leave it to the operating system
+FsyncPolicy = Literal["always", "interval", "never"]
+
+
+class JournalLocked(Exception):
+    """
+    Another process has the journal open.
+    """
+
+
+@attrs.frozen
+class Transaction:
+    events: tuple[Event, ...]
+    idempotency_key: str | None = None
+    fingerprint: str = ""
+
+
+def encode(transaction: Transaction) -> bytes:
+    data = {
+        "events": [
+            serialization.unstructure_event(event) for event in transaction.events
+        ],
+        "idempotency_key": transaction.idempotency_key,
+        "fingerprint": transaction.fingerprint,
+    }
+    return json.dumps(data, separators=(",", ":")).encode() + b"\n"
+
+
+def decode(line: bytes) -> Transaction:
+    data = json.loads(line)
+    return Transaction(
+        events=tuple(serialization.structure_event(event) for event in data["events"]),
+        idempotency_key=data["idempotency_key"],
+        # journals written before requests were fingerprinted have none
+        fingerprint=data.get("fingerprint", ""),
+    )
+
+
+def _fsync_directory(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@attrs.define
+class Journal:
+    path: Path
+    fsync: FsyncPolicy = "always"
+    fsync_interval: float = 1.0
+    _file: IO[bytes] = attrs.field(init=False)
+    _lock: IO[str] = attrs.field(init=False)
+    _last_fsync: float = attrs.field(init=False, factory=time.monotonic)
+
+    def __attrs_post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = open(self.path.with_name(f"{self.path.name}.lock"), "w")
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as exc:
+            self._lock.close()
+            raise JournalLocked(self.path) from exc
+        self._file = open(self.path, "ab")
+
+    def read(self) -> list[Transaction]:
+        """Read the transactions in the journal, oldest first."""
+        transactions = []
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # cut short by a crash
+                transactions.append(decode(line))
+        return transactions
+
+    def append(self, transaction: Transaction) -> None:
+        """Add a transaction, syncing it to disk if the policy says so."""
+        self._file.write(encode(transaction))
+        self._file.flush()
+        if self.fsync == "always" or (
+            self.fsync == "interval"
+            and time.monotonic() - self._last_fsync >= self.fsync_interval
+        ):
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.monotonic()
+
+    def replace(self, transactions: Iterable[Transaction]) -> None:
+        """Replace the journal with these transactions, atomically."""
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self.path.parent, prefix=f".{self.path.name}.", delete=False
+        ) as f:
+            for transaction in transactions:
+                f.write(encode(transaction))
+            f.flush()
+            if self.fsync != "never":
+                os.fsync(f.fileno())
+        os.replace(f.name, self.path)
+        if self.fsync != "never":
+            _fsync_directory(self.path.parent)
+
+        self._file.close()
+        self._file = open(self.path, "ab")
+
+    def close(self) -> None:
+        self._file.close()
+        self._lock.close()
+
+    def __enter__(self) -> Journal:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
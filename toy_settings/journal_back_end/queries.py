@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import attrs
+
+from toy_settings.application import unit_of_work
+
+
+@attrs.define
+class BufferedState(unit_of_work.PendingState):
+    """
+    The state including the transactions that are waiting to be written.
+
+    Each event sets the state of its setting outright, so if a flush writes the
+    buffered events while they are being read, applying them again on top of
+    the store gives the same settings.
+    """
+
+    # the fingerprint of the request of each waiting idempotency key
+    idempotency_keys: dict[str, str] = attrs.field(factory=dict)
+
+    def request_fingerprint(self, idempotency_key: str) -> str | None:
+        if idempotency_key in self.idempotency_keys:
+            return self.idempotency_keys[idempotency_key]
+        return self.state.request_fingerprint(idempotency_key)
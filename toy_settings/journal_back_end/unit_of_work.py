@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+import attrs
+
+from toy_settings.application import unit_of_work
+from toy_settings.domain import events
+from toy_settings.domain import queries
+
+from .journal import Journal
+from .journal import Transaction
+from .queries import BufferedState
+
+logger = logging.getLogger(__name__)
+
+
+@attrs.define
+class WriteBehindCommitter(unit_of_work.Committer):
+    """
+    Acknowledge transactions once they are in the journal, and write them to the
+    backing store in batches.
+
+    A batch is written once `max_batch` transactions are waiting, or
+    `max_delay` seconds after the first of them was acknowledged, or when
+    `flush` is called. Transactions left in the journal by a crash are written
+    with the next batch.
+
+    Reads must go through `pending_state`, so that they see the transactions
+    that are waiting. Handling an event that conflicts with a waiting one
+    raises `StaleState` straight away, but a conflict with an event written to
+    the store some other way is only found when the batch is written: the
+    conflicting transaction is then dropped, and logged.
+
+    The committer is shared by all the threads in a process.
+    """
+
+    committer: unit_of_work.Committer
+    journal: Journal
+    max_batch: int = 100
+    max_delay: float = 0.1
+    _pending: list[Transaction] = attrs.field(init=False)
+    _indexes: set[tuple[str, int]] = attrs.field(init=False, factory=set)
+    _idempotency_keys: dict[str, str] = attrs.field(init=False, factory=dict)
+    _lock: threading.Condition = attrs.field(init=False, factory=threading.Condition)
+    _flush_lock: threading.Lock = attrs.field(init=False, factory=threading.Lock)
+    _local: threading.local = attrs.field(init=False, factory=threading.local)
+    _flusher: threading.Thread | None = attrs.field(init=False, default=None)
+    _closed: bool = attrs.field(init=False, default=False)
+
+    def __attrs_post_init__(self) -> None:
+        self._pending = self.journal.read()
+        self._index_pending()
+
+    def _index_pending(self) -> None:
+        self._indexes = {
+            (event.key, event.index)
+            for transaction in self._pending
+            for event in transaction.events
+        }
+        self._idempotency_keys = {
+            transaction.idempotency_key: transaction.fingerprint
+            for transaction in self._pending
+            if transaction.idempotency_key is not None
+        }
+
+    def pending_state(self, state: queries.Repository) -> BufferedState:
+        """Get the state as it will be once the waiting transactions are written."""
+        with self._lock:
+            return BufferedState(
+                state,
+                [
+                    event
+                    for transaction in self._pending
+                    for event in transaction.events
+                ],
+                idempotency_keys=dict(self._idempotency_keys),
+            )
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        self._local.events = []
+        self._local.idempotency_key = None
+        self._local.fingerprint = ""
+        yield
+        transaction = Transaction(
+            tuple(self._local.events),
+            self._local.idempotency_key,
+            self._local.fingerprint,
+        )
+        del self._local.events, self._local.idempotency_key, self._local.fingerprint
+
+        with self._lock:
+            indexes = {(event.key, event.index) for event in transaction.events}
+            if not indexes.isdisjoint(self._indexes) or (
+                transaction.idempotency_key in self._idempotency_keys
+            ):
+                raise unit_of_work.StaleState
+
+            self.journal.append(transaction)
+            self._pending.append(transaction)
+            self._indexes |= indexes
+            if transaction.idempotency_key is not None:
+                self._idempotency_keys[transaction.idempotency_key] = (
+                    transaction.fingerprint
+                )
+
+            batch_full = len(self._pending) >= self.max_batch
+            self._start_flusher()
+            self._lock.notify()
+
+        if batch_full:
+            self.flush()
+
+    def handle(self, event: events.Event) -> None:
+        self._local.events.append(event)
+
+    def remember(self, idempotency_key: str, fingerprint: str) -> None:
+        self._local.idempotency_key = idempotency_key
+        self._local.fingerprint = fingerprint
+
+    def _write(self, transaction: Transaction) -> None:
+        for event in transaction.events:
+            self.committer.handle(event)
+        if transaction.idempotency_key is not None:
+            self.committer.remember(
+                transaction.idempotency_key, transaction.fingerprint
+            )
+
+    def flush(self) -> None:
+        """Write the waiting transactions to the backing store.
+
+        Returns once every transaction acknowledged before the call has been
+        written (or dropped because it conflicts with the store).
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return
+
+            try:
+                with self.committer.atomic():
+                    for transaction in batch:
+                        self._write(transaction)
+            except unit_of_work.StaleState:
+                # Write the transactions one at a time, to find the ones that
+                # conflict. Transactions replayed from the journal that were
+                # written before a crash conflict with themselves.
+                for transaction in batch:
+                    try:
+                        with self.committer.atomic():
+                            self._write(transaction)
+                    except unit_of_work.StaleState:
+                        logger.warning(
+                            "Dropped conflicting transaction %r", transaction
+                        )
+
+            with self._lock:
+                del self._pending[: len(batch)]
+                self._index_pending()
+                self.journal.replace(self._pending)
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None:
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name="write-behind", daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: self._pending or self._closed)
+                # give the batch until `max_delay` to fill up
+                if self._lock.wait_for(lambda: self._closed, timeout=self.max_delay):
+                    return
+
+            try:
+                self.flush()
+            except Exception:
+                # keep the transactions, and try again after the next delay
+                logger.exception("Failed to write transactions")
+                with self._lock:
+                    self._lock.wait_for(lambda: self._closed, timeout=self.max_delay)
+
+    def close(self) -> None:
+        """Write the waiting transactions, and stop writing in the background."""
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self.journal.close()
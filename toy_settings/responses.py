@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import zlib
+from typing import Callable
+from typing import Hashable
+from typing import Iterator
+
+import attrs
+
+CHUNK_SIZE = 64 * 1024
+
+# The content codings we can serve, in order of preference.
+CODINGS = ("gzip", "deflate")
+
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def _compress(data: bytes, coding: str) -> bytes:
+    compressor = zlib.compressobj(wbits=_WBITS[coding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def _qualities(accept_encoding: str) -> dict[str, float]:
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities
+
+
+@attrs.frozen
+class EncodedBody:
+    """
+    A response body, along with each compressed form that is worth serving.
+    """
+
+    identity: bytes
+    compressed: dict[str, bytes]
+
+    @classmethod
+    def encode(cls, data: bytes) -> EncodedBody:
+        compressed = {coding: _compress(data, coding) for coding in CODINGS}
+        return cls(
+            identity=data,
+            compressed={
+                coding: body
+                for coding, body in compressed.items()
+                if len(body) < len(data)
+            },
+        )
+
+    def negotiate(self, accept_encoding: str) -> tuple[str | None, bytes]:
+        """
+        Choose the body to send for an `Accept-Encoding` header.
+
+        Returns the content coding (`None` if the body is uncompressed) and the
+        body itself.
+        """
+        qualities = _qualities(accept_encoding)
+        accepted = sorted(
+            (-quality, CODINGS.index(coding))
+            for coding in self.compressed
+            if (quality := qualities.get(coding, qualities.get("*", 0.0))) > 0
+        )
+        if not accepted:
+            return None, self.identity
+
+        coding = CODINGS[accepted[0][1]]
+        return coding, self.compressed[coding]
+
+
+@attrs.define
+class BodyCache:
+    """
+    Keep the latest version of a response body.
+
+    The body is only rendered and compressed again when the version changes.
+    Read the version before rendering the body: then a body can be newer than
+    its version, which only causes an extra render, but never older.
+    """
+
+    _latest: tuple[Hashable, EncodedBody] | None = attrs.field(default=None, init=False)
+
+    def get(self, version: Hashable, render: Callable[[], bytes]) -> EncodedBody:
+        latest = self._latest
+        if latest is None or latest[0] != version:
+            latest = self._latest = (version, EncodedBody.encode(render()))
+        return latest[1]
+
+
+def chunks(data: bytes) -> Iterator[memoryview]:
+    """Split a body into chunks for streaming, without copying it."""
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield view[start : start + CHUNK_SIZE]
@@ -0,0 +1,31 @@
+"""
+Convert events to and from plain data, to be written as JSON.
+
+Each event becomes a dict of its fields, with the name of its type under "type".
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import cattrs.preconf.json
+
+from toy_settings.domain import events
+
+EVENT_TYPES: dict[str, type[events.Event]] = {
+    "Set": events.Set,
+    "Changed": events.Changed,
+    "Unset": events.Unset,
+}
+
+_converter = cattrs.preconf.json.make_converter()
+
+
+def unstructure_event(event: events.Event) -> dict[str, Any]:
+    return {"type": type(event).__name__, **_converter.unstructure(event)}
+
+
+def structure_event(data: dict[str, Any]) -> events.Event:
+    """Convert data made by `unstructure_event` back into an event."""
+    fields = dict(data)
+    return _converter.structure(fields, EVENT_TYPES[fields.pop("type")])
@@ -94,6 +94,49 @@ DATABASES = {
 }
 
 
+# Checkpoint of the projected settings, loaded at startup so that only newer
+# events need to be replayed. Written by `manage.py write_checkpoint`.
+
+SETTINGS_CHECKPOINT_PATH = BASE_DIR / "checkpoint.json"
+
+# Snapshot of the current settings shared by all the workers on a host, which
+# they map into memory to read settings without querying the database. Put it
+# somewhere memory-backed, such as /dev/shm. Set to None to disable.
+
+SETTINGS_SNAPSHOT_PATH: Path | None = None
+
+# Journal of writes that have been acknowledged but not yet written to the
+# database. Writes are acknowledged once they are in the journal, and written to
+# the database in batches, of up to SETTINGS_JOURNAL_MAX_BATCH writes or after
+# SETTINGS_JOURNAL_MAX_DELAY seconds. SETTINGS_JOURNAL_FSYNC is "always",
+# "interval" (every SETTINGS_JOURNAL_FSYNC_INTERVAL seconds) or "never". Only
+# one process can use a journal. Set to None to write to the database directly.
+
+SETTINGS_JOURNAL_PATH: Path | None = None
+SETTINGS_JOURNAL_FSYNC = "always"
+SETTINGS_JOURNAL_FSYNC_INTERVAL = 1.0
+SETTINGS_JOURNAL_MAX_BATCH = 100
+SETTINGS_JOURNAL_MAX_DELAY = 0.1
+
+# How long to remember the idempotency key of each committed request, in
+# seconds. Older keys are deleted by `manage.py purge_idempotency_keys`, after
+# which repeating their request applies it again.
+
+SETTINGS_IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Read models kept up to date in the background by `manage.py run_subscriptions`.
+# Each is the import path of a django_back_end.subscriptions.Subscription.
+
+SETTINGS_SUBSCRIPTIONS: list[str] = []
+
+# Where to send spans timing the work done for each request: "none",
+# "file" (appended to SETTINGS_TRACE_PATH as lines of JSON) or "opentelemetry"
+# (which needs the opentelemetry-api package, and a tracer provider set up).
+
+SETTINGS_TRACER = "none"
+SETTINGS_TRACE_PATH = BASE_DIR / "spans.jsonl"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import datetime
+from typing import Hashable
+from typing import Iterable
+
+import attrs
+
+from toy_settings.domain import events
+from toy_settings.domain import projections
+from toy_settings.domain import queries
+
+from .snapshot import SnapshotReader
+
+
+@attrs.frozen
+class SnapshotRepo(queries.Repository):
+    """
+    Read current values from the shared snapshot.
+
+    Anything else (and everything, if no snapshot has been published yet) is
+    read from the fallback repository.
+    """
+
+    reader: SnapshotReader
+    fallback: queries.Repository
+
+    def events_for_key(self, key: str) -> list[events.Event]:
+        return self.fallback.events_for_key(key)
+
+    def history_page(
+        self, key: str, *, before: int | None = None, limit: int
+    ) -> list[tuple[int, events.Event]]:
+        return self.fallback.history_page(key, before=before, limit=limit)
+
+    def events_by_actor(
+        self,
+        by: str,
+        since: datetime.datetime | int | None = None,
+        until: datetime.datetime | int | None = None,
+        *,
+        before: int | None = None,
+        limit: int,
+    ) -> list[tuple[int, events.Event]]:
+        return self.fallback.events_by_actor(
+            by, since, until, before=before, limit=limit
+        )
+
+    def get_setting(self, key: str) -> projections.Setting:
+        # The snapshot doesn't have the next index, which operations need.
+        return self.fallback.get_setting(key)
+
+    def current_value(self, key: str) -> str | None:
+        snapshot = self.reader.snapshot()
+        if snapshot is None:
+            return self.fallback.current_value(key)
+        return snapshot.get(key)
+
+    def current_values(self, keys: Iterable[str]) -> dict[str, str]:
+        snapshot = self.reader.snapshot()
+        if snapshot is None:
+            return self.fallback.current_values(keys)
+        return {key: value for key in keys if (value := snapshot.get(key)) is not None}
+
+    def all_settings(self) -> dict[str, str]:
+        snapshot = self.reader.snapshot()
+        if snapshot is None:
+            return self.fallback.all_settings()
+        return dict(snapshot.items())
+
+    def settings_version(self) -> Hashable:
+        # The snapshot is published after events are committed, so the latest
+        # event could be newer than the snapshot we read settings from.
+        snapshot = self.reader.snapshot()
+        if snapshot is None:
+            return self.fallback.settings_version()
+        return ("snapshot", snapshot.generation)
+
+    def settings_with_prefix(self, prefix: str) -> dict[str, str]:
+        snapshot = self.reader.snapshot()
+        if snapshot is None:
+            return self.fallback.settings_with_prefix(prefix)
+        return {key: value for key, value in snapshot.items() if key.startswith(prefix)}
+
+    def key_stats(self, keys: Iterable[str]) -> dict[str, projections.KeyStats]:
+        return self.fallback.key_stats(keys)
+
+    def request_fingerprint(self, idempotency_key: str) -> str | None:
+        return self.fallback.request_fingerprint(idempotency_key)
+
+    def search(self, query: str, *, limit: int) -> list[tuple[str, str]]:
+        return self.fallback.search(query, limit=limit)
+
+    def diff(
+        self,
+        since: datetime.datetime | int,
+        until: datetime.datetime | int | None = None,
+    ) -> projections.Diff:
+        return self.fallback.diff(since, until)
@@ -0,0 +1,215 @@
+"""
+A read-only snapshot of the settings, shared between processes by mapping a file.
+
+The file starts with a header, followed by an open-addressed hash table of entry
+offsets and then the entries themselves::
+
+    header:  magic (8s) | format version (I) | bucket count (I)
+             | entry count (I) | generation (Q)
+    buckets: entry offset (I) * bucket count, 0 for an empty bucket
+    entries: key hash (I) | key length (I) | value length (I) | key | value
+
+Keys and values are UTF-8 encoded. Keys are hashed with CRC-32, which (unlike
+`hash`) is the same in every process.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Callable
+from typing import Iterator
+from typing import Mapping
+
+import attrs
+
+MAGIC = b"TOYSNAP\0"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIIQ")
+_BUCKET = struct.Struct("<I")
+_ENTRY = struct.Struct("<III")
+
+
+class InvalidSnapshot(Exception):
+    """
+    The file is not a snapshot in a format we can read.
+    """
+
+
+def _bucket_count(entries: int) -> int:
+    # keep the table at most half full, so probe sequences stay short
+    count = 1
+    while count < entries * 2:
+        count *= 2
+    return count
+
+
+def encode(settings: Mapping[str, str], generation: int) -> bytes:
+    bucket_count = _bucket_count(len(settings))
+    buckets = [0] * bucket_count
+    entries = bytearray()
+    entries_start = _HEADER.size + _BUCKET.size * bucket_count
+
+    for key, value in settings.items():
+        encoded_key, encoded_value = key.encode(), value.encode()
+        key_hash = zlib.crc32(encoded_key)
+
+        bucket = key_hash % bucket_count
+        while buckets[bucket]:
+            bucket = (bucket + 1) % bucket_count
+        buckets[bucket] = entries_start + len(entries)
+
+        entries += _ENTRY.pack(key_hash, len(encoded_key), len(encoded_value))
+        entries += encoded_key
+        entries += encoded_value
+
+    return b"".join(
+        [
+            _HEADER.pack(
+                MAGIC, FORMAT_VERSION, bucket_count, len(settings), generation
+            ),
+            struct.pack(f"<{bucket_count}I", *buckets),
+            bytes(entries),
+        ]
+    )
+
+
+@attrs.frozen
+class Snapshot:
+    """
+    A mapped snapshot file.
+
+    Lookups read straight from the mapping: only the value that is found is
+    copied out of it.
+    """
+
+    generation: int
+    _buffer: memoryview
+    _bucket_count: int
+    _entry_count: int
+
+    @classmethod
+    def open(cls, path: Path) -> Snapshot:
+        """
+        Map a snapshot file.
+
+        Raises:
+            FileNotFoundError: There is no snapshot file.
+            InvalidSnapshot: The file is not a snapshot we can read.
+        """
+        with open(path, "rb") as f:
+            try:
+                buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except ValueError as exc:  # the file is empty
+                raise InvalidSnapshot(path) from exc
+
+        if len(buffer) < _HEADER.size:
+            raise InvalidSnapshot(path)
+        magic, version, bucket_count, entry_count, generation = _HEADER.unpack_from(
+            buffer
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise InvalidSnapshot(path)
+
+        return cls(
+            generation=generation,
+            buffer=buffer,
+            bucket_count=bucket_count,
+            entry_count=entry_count,
+        )
+
+    def _entry(self, offset: int) -> tuple[int, memoryview, memoryview]:
+        key_hash, key_length, value_length = _ENTRY.unpack_from(self._buffer, offset)
+        key_start = offset + _ENTRY.size
+        value_start = key_start + key_length
+        return (
+            key_hash,
+            self._buffer[key_start:value_start],
+            self._buffer[value_start : value_start + value_length],
+        )
+
+    def get(self, key: str) -> str | None:
+        encoded_key = key.encode()
+        key_hash = zlib.crc32(encoded_key)
+
+        bucket = key_hash % self._bucket_count
+        while True:
+            (offset,) = _BUCKET.unpack_from(
+                self._buffer, _HEADER.size + _BUCKET.size * bucket
+            )
+            if not offset:
+                return None
+
+            entry_hash, entry_key, value = self._entry(offset)
+            if entry_hash == key_hash and entry_key == encoded_key:
+                return str(value, "utf-8")
+
+            bucket = (bucket + 1) % self._bucket_count
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        offset = _HEADER.size + _BUCKET.size * self._bucket_count
+        for _ in range(self._entry_count):
+            _, key, value = self._entry(offset)
+            yield str(key, "utf-8"), str(value, "utf-8")
+            offset += _ENTRY.size + len(key) + len(value)
+
+
+def publish(path: Path, read_settings: Callable[[], Mapping[str, str]]) -> None:
+    """
+    Replace the snapshot file with the current settings.
+
+    Publishers take turns, so a snapshot of older settings never replaces a
+    newer one. Readers that have already mapped the old file keep using it until
+    they next look for a new one.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f"{path.name}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        try:
+            generation = Snapshot.open(path).generation + 1
+        except (FileNotFoundError, InvalidSnapshot):
+            generation = 1
+
+        data = encode(read_settings(), generation)
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as f:
+            f.write(data)
+        os.replace(f.name, path)
+
+
+@attrs.define
+class SnapshotReader:
+    """
+    Keep the latest snapshot file mapped.
+
+    Checking for a new snapshot only needs a `stat` of the file.
+    """
+
+    path: Path
+    _mapped: tuple[tuple[int, int], Snapshot] | None = attrs.field(
+        default=None, init=False
+    )
+
+    def snapshot(self) -> Snapshot | None:
+        """Get the latest snapshot, if there is a valid one."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        mapped = self._mapped
+        if mapped is None or mapped[0] != identity:
+            try:
+                mapped = self._mapped = (identity, Snapshot.open(self.path))
+            except (FileNotFoundError, InvalidSnapshot):
+                return None
+        return mapped[1]
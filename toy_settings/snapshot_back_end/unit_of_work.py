@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import attrs
+
+from toy_settings.application import unit_of_work
+from toy_settings.domain import events
+from toy_settings.domain import queries
+
+from . import snapshot
+
+
+@attrs.frozen
+class PublishingCommitter(unit_of_work.Committer):
+    """
+    Publish a new snapshot of the settings whenever events are committed.
+
+    The settings are read from `state`, which must not itself read the snapshot.
+    """
+
+    committer: unit_of_work.Committer
+    state: queries.Repository
+    path: Path
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        with self.committer.atomic():
+            yield
+        snapshot.publish(self.path, self.state.all_settings)
+
+    def handle(self, event: events.Event) -> None:
+        self.committer.handle(event)
+
+    def remember(self, idempotency_key: str, fingerprint: str) -> None:
+        self.committer.remember(idempotency_key, fingerprint)
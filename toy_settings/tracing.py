@@ -0,0 +1,204 @@
+"""
+Spans around the work done for a request, to find out where its time goes.
+
+Code at each layer wraps its work in `span(name, **attributes)`. Spans go to
+the tracer installed with `set_tracer`, which by default does nothing with them.
+`FileTracer` writes each span to a file as a line of JSON, to be analysed
+offline with `read`, and `OpenTelemetryTracer` hands spans to OpenTelemetry.
+
+Spans started inside another span, in the same thread, are its children.
+"""
+
+from __future__ import annotations
+
+import abc
+import contextvars
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO
+from typing import Any
+from typing import ContextManager
+from typing import Iterator
+from typing import Mapping
+from typing import Protocol
+from typing import Union
+
+import attrs
+import cattrs.preconf.json
+
+AttributeValue = Union[str, int, float, bool]
+
+_converter = cattrs.preconf.json.make_converter()
+
+
+class Span(Protocol):
+    def set_attribute(self, key: str, value: AttributeValue) -> None: ...
+
+
+class Tracer(abc.ABC):
+    @abc.abstractmethod
+    def span(
+        self, name: str, attributes: Mapping[str, AttributeValue]
+    ) -> ContextManager[Span]:
+        """Time the work done in the context, as a span with this name."""
+        ...
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        pass
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer(Tracer):
+    def span(
+        self, name: str, attributes: Mapping[str, AttributeValue]
+    ) -> ContextManager[Span]:
+        return _NOOP_SPAN
+
+
+@attrs.frozen
+class FinishedSpan:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    # seconds since the epoch
+    start: float
+    duration: float
+    thread: str
+    attributes: dict[str, AttributeValue]
+    # the name of the exception that ended the span, if one did
+    error: str | None = None
+
+
+@attrs.define
+class _RecordingSpan:
+    trace_id: str
+    span_id: str
+    attributes: dict[str, AttributeValue]
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        self.attributes[key] = value
+
+
+_current_span: contextvars.ContextVar[_RecordingSpan | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+@attrs.define
+class FileTracer(Tracer):
+    """
+    Append each span to a file, as a line of JSON, once it has finished.
+
+    Children finish before their parents, so they are written first.
+    """
+
+    path: Path
+    _file: IO[bytes] = attrs.field(init=False)
+    _lock: threading.Lock = attrs.field(init=False, factory=threading.Lock)
+
+    def __attrs_post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+
+    @contextmanager
+    def span(
+        self, name: str, attributes: Mapping[str, AttributeValue]
+    ) -> Iterator[Span]:
+        parent = _current_span.get()
+        span = _RecordingSpan(
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            attributes=dict(attributes),
+        )
+        token = _current_span.set(span)
+        start = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield span
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self._write(
+                FinishedSpan(
+                    name=name,
+                    trace_id=span.trace_id,
+                    span_id=span.span_id,
+                    parent_id=parent.span_id if parent else None,
+                    start=start,
+                    duration=time.perf_counter() - started,
+                    thread=threading.current_thread().name,
+                    attributes=span.attributes,
+                    error=error,
+                )
+            )
+
+    def _write(self, span: FinishedSpan) -> None:
+        line = json.dumps(_converter.unstructure(span), separators=(",", ":"))
+        with self._lock:
+            self._file.write(line.encode() + b"\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read(path: Path) -> list[FinishedSpan]:
+    """Read the spans written by a `FileTracer`, in the order they finished."""
+    with open(path, "rb") as f:
+        return [_converter.structure(json.loads(line), FinishedSpan) for line in f]
+
+
+@attrs.frozen
+class OpenTelemetryTracer(Tracer):  # pragma: no cover (needs opentelemetry-api)
+    """
+    Hand spans to OpenTelemetry's tracer provider, to export however it's set up.
+
+    Needs the `opentelemetry-api` package, which isn't installed by default.
+    """
+
+    instrumenting_module: str = "toy_settings"
+
+    def span(
+        self, name: str, attributes: Mapping[str, AttributeValue]
+    ) -> ContextManager[Span]:
+        from opentelemetry import trace
+
+        tracer = trace.get_tracer(self.instrumenting_module)
+        return tracer.start_as_current_span(name, attributes=attributes)
+
+
+_tracer: Tracer = NoopTracer()
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+    """Send spans to this tracer from now on, and return the previous one."""
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attributes: AttributeValue) -> ContextManager[Span]:
+    """Time the work done in the context, as a span with this name."""
+    return _tracer.span(name, attributes)
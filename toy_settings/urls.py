@@ -10,5 +10,13 @@ urlpatterns = [
     path("change/<str:key>/", views.ChangeSetting.as_view(), name="change"),
     path("unset/<str:key>/", views.UnsetSetting.as_view(), name="unset"),
     path("history/<str:key>/", views.SettingHistory.as_view(), name="history"),
+    path(
+        "history/<str:key>/json/",
+        views.SettingHistoryJson.as_view(),
+        name="history-json",
+    ),
+    path("search/", views.SettingsSearch.as_view(), name="search"),
+    path("actors/<path:by>/", views.ActorEvents.as_view(), name="actor"),
     path("json/", views.SettingsJson.as_view(), name="json"),
+    path("diff/", views.SettingsDiff.as_view(), name="diff"),
 ]
@@ -1,28 +1,74 @@
 from __future__ import annotations
 
+import datetime
 import json
+import uuid
 from typing import Any
+from typing import Iterator
 
+import cattrs.preconf.json
 from django import forms
 from django import http
 from django import urls
 from django.contrib import messages
+from django.core.exceptions import BadRequest
 from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.views import generic
 from tenacity import RetryError
 
 from toy_settings import config
 
+from . import responses
+from . import tracing
 from .application import services
+from .domain import queries
 
 MAX_WAIT_SECONDS = 5
 
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
+SEARCH_RESULTS = 50
+
+_event_converter = cattrs.preconf.json.make_converter()
+
+_all_settings_json = responses.BodyCache()
+
 
 def normalize_key(key: str) -> str:
     return key.strip().replace(" ", "_").replace("-", "_").upper()
 
 
+def parse_bound(bound: str) -> datetime.datetime | int:
+    """
+    Parse an event position or an ISO 8601 timestamp.
+
+    Raises:
+        ValueError: The bound is neither a position nor a timestamp.
+    """
+    if bound.isdigit():
+        return int(bound)
+
+    timestamp = datetime.datetime.fromisoformat(bound)
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+def idempotency_key(request: http.HttpRequest, submitted: str | None) -> str | None:
+    """Get the idempotency key from the form, or from the `Idempotency-Key` header."""
+    return submitted or request.headers.get("Idempotency-Key") or None
+
+
+def idempotency_key_reused(exc: services.IdempotencyKeyReused) -> HttpResponse:
+    return HttpResponse(
+        f"idempotency key {exc.idempotency_key!r} was used for a different request",
+        status=422,
+    )
+
+
 class Settings(generic.TemplateView):
     template_name = "settings.html"
 
@@ -31,7 +77,12 @@ class Settings(generic.TemplateView):
 
         repo = config.get_repository()
         settings = repo.all_settings()
-        context["settings"] = sorted(settings.items())
+        stats = repo.key_stats(settings)
+        # each unset button gets its own idempotency key
+        context["settings"] = [
+            (key, value, stats.get(key), uuid.uuid4().hex)
+            for key, value in sorted(settings.items())
+        ]
 
         return context
 
@@ -39,31 +90,198 @@ class Settings(generic.TemplateView):
 class SettingsJson(generic.View):
     def get(self, request: http.HttpRequest) -> http.HttpResponse:
         repo = config.get_repository()
-        settings = repo.all_settings()
+        if "key" in request.GET:
+            settings = repo.current_values(request.GET.getlist("key"))
+        elif "prefix" in request.GET:
+            settings = repo.settings_with_prefix(request.GET["prefix"])
+        else:
+            return _all_settings_response(request, repo)
         return http.HttpResponse(json.dumps(settings))
 
 
+def _all_settings_response(
+    request: http.HttpRequest, repo: queries.Repository
+) -> http.StreamingHttpResponse:
+    """Serve all settings from the cache, in the best encoding the client takes.
+
+    The settings are only serialized and compressed again when they change.
+    """
+    body = _all_settings_json.get(
+        repo.settings_version(), lambda: json.dumps(repo.all_settings()).encode()
+    )
+    coding, data = body.negotiate(request.headers.get("Accept-Encoding", ""))
+
+    response = http.StreamingHttpResponse(responses.chunks(data))
+    response["Content-Length"] = len(data)
+    if coding is not None:
+        response["Content-Encoding"] = coding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+class SettingsDiff(generic.View):
+    def get(self, request: http.HttpRequest) -> http.HttpResponse:
+        try:
+            since = parse_bound(request.GET["from"])
+            until = parse_bound(request.GET["to"]) if "to" in request.GET else None
+        except (KeyError, ValueError):
+            return http.HttpResponseBadRequest(
+                "'from' (and optionally 'to') must be event positions or timestamps"
+            )
+
+        repo = config.get_repository()
+        diff = repo.diff(since, until)
+        return http.HttpResponse(
+            json.dumps(
+                {"added": diff.added, "changed": diff.changed, "removed": diff.removed}
+            )
+        )
+
+
 class SettingHistory(generic.TemplateView):
     template_name = "setting_history.html"
 
     def get_context_data(self, key: str, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
+        before, limit = _page(self.request)
 
         repo = config.get_repository()
         context["key"] = key
         context["value"] = repo.current_value(key)
-        events = repo.events_for_key(key)
-        context["events"] = sorted(events, key=lambda e: e.timestamp, reverse=True)
+        page = repo.history_page(key, before=before, limit=limit)
+        context["events"] = [event for _, event in page]
+        context["next_page"] = _next_page(self.request, page, limit)
+
+        return context
+
+
+class ActorEvents(generic.TemplateView):
+    template_name = "actor_events.html"
+
+    def get_context_data(self, by: str, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        before, limit = _page(self.request)
+        try:
+            since = _optional_bound(self.request.GET.get("from"))
+            until = _optional_bound(self.request.GET.get("to"))
+        except ValueError:
+            raise BadRequest("'from' and 'to' must be event positions or timestamps")
+
+        repo = config.get_repository()
+        page = repo.events_by_actor(by, since, until, before=before, limit=limit)
+        context["by"] = by
+        context["events"] = [(type(event).__name__, event) for _, event in page]
+        context["next_page"] = _next_page(self.request, page, limit)
 
         return context
 
 
+class SettingsSearch(generic.TemplateView):
+    template_name = "settings_search.html"
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+
+        context["query"] = query
+        context["results"] = config.get_repository().search(query, limit=SEARCH_RESULTS)
+
+        return context
+
+
+def _optional_int(value: str | None) -> int | None:
+    if value is None:
+        return None
+    number = int(value)
+    if number < 1:
+        raise ValueError(value)
+    return number
+
+
+def _optional_bound(value: str | None) -> datetime.datetime | int | None:
+    if value is None:
+        return None
+    return parse_bound(value)
+
+
+def _page(request: http.HttpRequest) -> tuple[int | None, int]:
+    """Get the position to read a page of events before, and its size."""
+    try:
+        before = _optional_int(request.GET.get("before"))
+        limit = min(
+            _optional_int(request.GET.get("limit")) or HISTORY_PAGE_SIZE,
+            MAX_HISTORY_PAGE_SIZE,
+        )
+    except ValueError:
+        raise BadRequest("'before' and 'limit' must be positive whole numbers")
+    return before, limit
+
+
+def _next_page(
+    request: http.HttpRequest, page: list[tuple[int, Any]], limit: int
+) -> str | None:
+    """Link to the next page of events, if this page is full."""
+    if len(page) < limit:
+        return None
+
+    query = request.GET.copy()
+    query["before"], _ = page[-1]
+    query["limit"] = limit
+    return f"?{query.urlencode()}"
+
+
+class SettingHistoryJson(generic.View):
+    def get(self, request: http.HttpRequest, key: str) -> http.StreamingHttpResponse:
+        repo = config.get_repository()
+        return http.StreamingHttpResponse(
+            _stream_history(repo, key), content_type="application/json"
+        )
+
+
+def _stream_history(repo: queries.Repository, key: str) -> Iterator[str]:
+    """Stream a JSON array of the events for a key, newest first.
+
+    The events are read a page at a time, so the whole history is never held in
+    memory at once.
+    """
+    yield "["
+    before = None
+    separator = ""
+    while page := repo.history_page(key, before=before, limit=MAX_HISTORY_PAGE_SIZE):
+        for position, event in page:
+            data = _event_converter.unstructure(event)
+            data.update(position=position, event_type=type(event).__name__)
+            yield separator + json.dumps(data)
+            separator = ","
+        before, _ = page[-1]
+    yield "]"
+
+
 class NewSettingForm(forms.Form):
     key = forms.CharField(required=True)
     value = forms.CharField(required=True)
+    # so that submitting the form again doesn't set the setting again
+    idempotency_key = forms.CharField(required=False, widget=forms.HiddenInput)
+
 
+class TracedFormView(generic.FormView):
+    """A form view that traces posts, and validating the form within them."""
+
+    def post(
+        self, request: http.HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        with tracing.span(f"views.{type(self).__name__}"):
+            form = self.get_form()
+            with tracing.span("views.validate_form") as span:
+                valid = form.is_valid()
+                span.set_attribute("valid", valid)
 
-class SetSetting(generic.FormView):
+            if valid:
+                return self.form_valid(form)
+            return self.form_invalid(form)
+
+
+class SetSetting(TracedFormView):
     template_name = "set_setting.html"
     form_class = NewSettingForm
     success_url = urls.reverse_lazy("settings")
@@ -73,6 +291,7 @@ class SetSetting(generic.FormView):
 
         initial["key"] = self.request.GET.get("key")
         initial["value"] = self.request.GET.get("value")
+        initial["idempotency_key"] = uuid.uuid4().hex
 
         return initial
 
@@ -83,19 +302,26 @@ class SetSetting(generic.FormView):
         value = form.cleaned_data["value"]
 
         try:
-            with toy_settings.retry(max_wait_seconds=MAX_WAIT_SECONDS):
-                toy_settings.set(
+            toy_settings.retry(
+                lambda: toy_settings.set(
                     key,
                     value,
                     timestamp=timezone.now(),
                     by="Some User",
-                )
+                    idempotency_key=idempotency_key(
+                        self.request, form.cleaned_data["idempotency_key"]
+                    ),
+                ),
+                max_wait_seconds=MAX_WAIT_SECONDS,
+            )
         except RetryError:  # pragma: no cover
             messages.error(
                 self.request, "oh no! Something went wrong. Please try again."
             )
         except services.AlreadySet:
             messages.error(self.request, f"{key!r} is already set")
+        except services.IdempotencyKeyReused as exc:
+            return idempotency_key_reused(exc)
         else:
             messages.success(self.request, f"{key!r} set to {value!r}")
 
@@ -105,9 +331,11 @@ class SetSetting(generic.FormView):
 class ChangeSettingForm(forms.Form):
     key = forms.CharField(required=True, disabled=True)
     value = forms.CharField(required=True)
+    # the version the value was loaded at, so concurrent changes aren't lost
+    version = forms.IntegerField(required=False, min_value=0, widget=forms.HiddenInput)
 
 
-class ChangeSetting(generic.FormView):
+class ChangeSetting(TracedFormView):
     template_name = "set_setting.html"
     form_class = ChangeSettingForm
     success_url = urls.reverse_lazy("settings")
@@ -123,10 +351,11 @@ class ChangeSetting(generic.FormView):
         initial = super().get_initial()
 
         repo = config.get_repository()
-        current_value = repo.current_value(self.key)
+        setting = repo.get_setting(self.key)
 
         initial["key"] = self.key
-        initial["value"] = current_value
+        initial["value"] = setting.value
+        initial["version"] = setting.next_index
 
         return initial
 
@@ -135,14 +364,27 @@ class ChangeSetting(generic.FormView):
 
         key = normalize_key(form.cleaned_data["key"])
         value = form.cleaned_data["value"]
+        version = form.cleaned_data["version"]
 
         try:
-            with toy_settings.retry(max_wait_seconds=MAX_WAIT_SECONDS):
+            if version is None:
+                toy_settings.retry(
+                    lambda: toy_settings.change(
+                        key,
+                        value,
+                        timestamp=timezone.now(),
+                        by="Some User",
+                    ),
+                    max_wait_seconds=MAX_WAIT_SECONDS,
+                )
+            else:
+                # Retrying can't help: the change was meant for an older value.
                 toy_settings.change(
                     key,
                     value,
                     timestamp=timezone.now(),
                     by="Some User",
+                    expected_version=version,
                 )
         except RetryError:  # pragma: no cover
             messages.error(
@@ -150,6 +392,11 @@ class ChangeSetting(generic.FormView):
             )
         except services.NotSet:
             messages.error(self.request, f"there is no {key!r} setting to change")
+        except services.VersionMismatch:
+            messages.error(
+                self.request,
+                f"{key!r} has been changed since you loaded it. Please try again.",
+            )
         else:
             messages.success(self.request, f"{key!r} set to {value!r}")
 
@@ -161,22 +408,35 @@ class UnsetSetting(generic.RedirectView):
 
     def post(
         self, request: http.HttpRequest, key: str, *args: Any, **kwargs: Any
+    ) -> http.HttpResponse:
+        with tracing.span("views.UnsetSetting"):
+            return self._unset(request, key, *args, **kwargs)
+
+    def _unset(
+        self, request: http.HttpRequest, key: str, *args: Any, **kwargs: Any
     ) -> http.HttpResponse:
         toy_settings = config.get_services()
 
         try:
-            with toy_settings.retry(max_wait_seconds=MAX_WAIT_SECONDS):
-                toy_settings.unset(
+            toy_settings.retry(
+                lambda: toy_settings.unset(
                     key,
                     timestamp=timezone.now(),
                     by="Some User",
-                )
+                    idempotency_key=idempotency_key(
+                        request, request.POST.get("idempotency_key")
+                    ),
+                ),
+                max_wait_seconds=MAX_WAIT_SECONDS,
+            )
         except RetryError:  # pragma: no cover
             messages.error(
                 self.request, "oh no! Something went wrong. Please try again."
             )
         except services.NotSet:
             messages.error(request, f"there is no {key!r} setting to unset")
+        except services.IdempotencyKeyReused as exc:
+            return idempotency_key_reused(exc)
         else:
             messages.success(request, f"{key!r} unset")
 